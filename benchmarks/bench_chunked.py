@@ -0,0 +1,52 @@
+import argparse
+import resource
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import employee_tracker.storage.storage as storage
+from employee_tracker.domain.employee import Employee
+from bench_load import write_sample_employees
+
+# Benchmark comparing peak memory when building Employees from the whole employees.csv at once against streaming it in chunks
+# Run from the project root with: python benchmarks/bench_chunked.py --rows 2000000
+# Each mode runs in its own process, as peak RSS can only go up. Both keep every Employee, as the tracker does, so the difference is the dataframe overhead
+
+def build(data_dir: str, chunk_size: int):
+    storage.DATA_DIR = Path(data_dir)
+    if chunk_size:
+        employees = []
+        for chunk in storage.read_csv_chunks("employees", chunk_size):
+            employees.extend(Employee.from_frame(chunk))
+    else:
+        employees = Employee.from_frame(storage.read_csv("employees"))
+    # ru_maxrss is in kilobytes on Linux
+    print(len(employees), resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+def peak_rss(data_dir: str, chunk_size: int):
+    result = subprocess.run([sys.executable, __file__, "--child", data_dir, str(chunk_size)], capture_output=True, text=True, check=True)
+    count, peak = result.stdout.split()
+    return int(count), int(peak) / 1024
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--chunk-size", type=int, default=50_000)
+    parser.add_argument("--child", nargs=2)
+    args = parser.parse_args()
+    if args.child:
+        build(args.child[0], int(args.child[1]))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        write_sample_employees(Path(tmp) / "employees.csv", args.rows)
+        _, whole = peak_rss(tmp, 0)
+        _, chunked = peak_rss(tmp, args.chunk_size)
+
+    print(f"rows: {args.rows}")
+    print(f"whole file:          {whole:.0f} MB peak RSS")
+    print(f"chunks of {args.chunk_size}: {chunked:.0f} MB peak RSS")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+import argparse
+import tempfile
+from pathlib import Path
+
+import employee_tracker.storage.storage as storage
+from employee_tracker.domain.employee import Employee
+from employee_tracker.storage.columnar_backend import ColumnarBackend, HAS_PYARROW
+from bench_load import write_sample_employees, time_call
+
+# Benchmark comparing employees stored as csv with the columnar formats, for reading, writing and size on disk
+# Run from the project root with: python benchmarks/bench_columnar.py --rows 1000000
+# Load times include building the Employee objects, which is the same work for every format
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+    formats = ["parquet", "npz"] if HAS_PYARROW else ["npz"]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        storage.DATA_DIR = Path(tmp)
+        write_sample_employees(storage.DATA_DIR / "employees.csv", args.rows)
+        df = storage.read_csv("employees")
+
+        results = {}
+        write_time, _ = time_call(lambda: storage.write_csv("employees", df))
+        read_time, _ = time_call(lambda: storage.read_csv("employees"))
+        load_time, _ = time_call(lambda: Employee.from_frame(storage.read_csv("employees")))
+        results["csv"] = (write_time, read_time, load_time, storage.table_path("employees").stat().st_size)
+        for format in formats:
+            backend = ColumnarBackend(format)
+            write_time, _ = time_call(lambda: backend.write_table("employees", df))
+            read_time, _ = time_call(lambda: backend.read_table("employees"))
+            load_time, _ = time_call(lambda: Employee.from_frame(backend.read_table("employees")))
+            results[format] = (write_time, read_time, load_time, backend.path("employees").stat().st_size)
+
+    print(f"rows: {args.rows}")
+    csv_write, csv_read, csv_load, csv_size = results["csv"]
+    for format, (write_time, read_time, load_time, size) in results.items():
+        print(f"{format:8} write {write_time:.3f}s ({csv_write / write_time:.1f}x)  read {read_time:.3f}s ({csv_read / read_time:.1f}x)"
+              f"  read + build {load_time:.3f}s ({csv_load / load_time:.1f}x)  size {size / 1e6:.1f} MB ({size / csv_size:.0%} of csv)")
+
+if __name__ == "__main__":
+    main()
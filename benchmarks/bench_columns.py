@@ -0,0 +1,45 @@
+import argparse
+import random
+from datetime import date
+
+from employee_tracker.utils.query import Predicate, Query
+from bench_indexes import sample_tracker, scan, best_of
+from bench_load import time_call
+
+# Benchmark for reporting queries answered from the NumPy columns (Tracker.query_columns), against filter_list over every employee and Tracker.query
+# Run from the project root with: PYTHONPATH=src:benchmarks python benchmarks/bench_columns.py --rows 1000000
+# Tracker.query's indexes are built before timing, as the columns are, so only the queries themselves are compared
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    tracker = sample_tracker(args.rows)
+    build_time, _ = time_call(lambda: tracker._table_columns("employees"))
+    print(f"rows: {args.rows}, columns built in {build_time:.2f}s")
+    tracker._table_indexes("employees", "salary", "start_date", "text")
+
+    reports = {
+        "salary band, started before": dict(min_salary=40000, max_salary=80000, max_date=date(2010, 1, 1)),
+        "and role containing": dict(min_salary=40000, max_salary=80000, max_date=date(2010, 1, 1), role_search="Role 1"),
+        "started since, top paid": dict(min_date=date(2020, 1, 1), min_salary=100000),
+    }
+    attributes = {"name_search": ("name", "string"), "role_search": ("role", "string"), "min_salary": ("salary", "min"), "max_salary": ("salary", "max"), "min_date": ("start_date", "min"), "max_date": ("start_date", "max")}
+    for label, filters in reports.items():
+        query = Query("employees", [Predicate(*attributes[name], value) for name, value in filters.items()])
+        assert tracker.query_columns(query).ids == [emp.id for emp in scan(tracker, **filters)]
+        matched = len(tracker.query_columns(query))
+        scan_time = best_of(lambda: scan(tracker, **filters))
+        query_time = best_of(lambda: list(iter(tracker.query(query))))
+        ids_time = best_of(lambda: tracker.query_columns(query).ids)
+        employees_time = best_of(lambda: list(tracker.query_columns(query)))
+        print(f"{label:30} {matched:7} matches: filter_list {scan_time * 1000:7.1f}ms, query {query_time * 1000:7.1f}ms, "
+              f"columns {ids_time * 1000:6.2f}ms as ids ({scan_time / ids_time:.0f}x), {employees_time * 1000:6.2f}ms as employees ({scan_time / employees_time:.0f}x)")
+
+    emps = random.sample(list(tracker.employees.values()), 1000)
+    update_time, _ = time_call(lambda: [setattr(emp, "salary", emp.salary + 1) for emp in emps])
+    print(f"keeping the indexes and columns up to date: {update_time / len(emps) * 1e6:.1f}us per salary change")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+import argparse
+import tempfile
+from pathlib import Path
+
+import employee_tracker.storage.storage as storage
+from bench_load import write_sample_employees, time_call
+
+# Benchmark comparing employees.csv stored plain and with each compression codec, for size on disk and time to save and load
+# Run from the project root with: python benchmarks/bench_compression.py --rows 1000000
+# Loads and saves are timed with pandas and, separately, with the csv module (as used without pandas)
+
+def measure(codec, df, rows):
+    storage.COMPRESSION = codec
+    save_time, _ = time_call(lambda: storage.write_csv("employees", df))
+    load_time, _ = time_call(lambda: storage.read_csv("employees"))
+    size = storage.table_path("employees").stat().st_size
+    storage.USE_PANDAS = False
+    row_save_time, _ = time_call(lambda: storage.write_csv("employees", rows))
+    row_load_time, _ = time_call(lambda: sum(1 for _ in storage.read_csv_rows("employees")))
+    storage.USE_PANDAS = True
+    return size, save_time, load_time, row_save_time, row_load_time
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200_000)
+    args = parser.parse_args()
+    codecs = [None, "gzip"] + (["zstd"] if storage.HAS_ZSTD else [])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        storage.DATA_DIR = Path(tmp)
+        write_sample_employees(storage.DATA_DIR / "employees.csv", args.rows)
+        df = storage.read_csv("employees")
+        rows = list(storage.read_csv_rows("employees"))
+        results = {codec or "plain": measure(codec, df, rows) for codec in codecs}
+
+    print(f"rows: {args.rows}")
+    plain = results["plain"]
+    for name, (size, save_time, load_time, row_save_time, row_load_time) in results.items():
+        print(f"{name:6} {size / 1e6:6.1f} MB ({size / plain[0]:4.0%})  pandas save {save_time:.2f}s load {load_time:.2f}s"
+              f"  csv module save {row_save_time:.2f}s load {row_load_time:.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+import argparse
+import os
+
+from employee_tracker.utils.passwords import hash_password, hash_passwords
+from bench_load import time_call
+
+# Benchmark comparing hashing passwords one at a time, as create_employee does, with hash_passwords, as create_employees does
+# Run from the project root with: python benchmarks/bench_hashing.py --passwords 64
+# hash_passwords spreads the work over a thread pool, so the gain depends on how many cores are free
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--passwords", type=int, default=32)
+    args = parser.parse_args()
+    passwords = [f"password{i}" for i in range(args.passwords)]
+
+    serial, _ = time_call(lambda: [hash_password(password) for password in passwords])
+    print(f"passwords: {args.passwords}, cores: {os.cpu_count()}")
+    print(f"one at a time:       {serial:.2f}s ({args.passwords / serial:.1f}/s)")
+    workers = 2
+    while workers <= os.cpu_count():
+        pooled, _ = time_call(lambda: hash_passwords(passwords, workers=workers))
+        print(f"{workers:3} threads:         {pooled:.2f}s ({args.passwords / pooled:.1f}/s, {serial / pooled:.2f}x)")
+        workers *= 2
+    pooled, _ = time_call(lambda: hash_passwords(passwords))
+    print(f"hash_passwords:      {pooled:.2f}s ({args.passwords / pooled:.1f}/s, {serial / pooled:.2f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+# Benchmark for how long importing employee_tracker.domain.tracker takes in a fresh interpreter, compared with importing pandas too
+# pandas is only imported when a table is first read or written with it, so a headless login check doesn't pay for it
+# Run from the project root with: python benchmarks/bench_import.py --runs 10
+
+def time_import(code: str) -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], check=True)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    baseline = statistics.median(time_import("pass") for _ in range(args.runs))
+    tracker = statistics.median(time_import("import employee_tracker.domain.tracker") for _ in range(args.runs))
+    with_pandas = statistics.median(time_import("import employee_tracker.domain.tracker, pandas") for _ in range(args.runs))
+
+    print(f"runs: {args.runs} (medians, interpreter start-up of {baseline * 1000:.0f}ms taken off)")
+    print(f"tracker:             {(tracker - baseline) * 1000:.0f}ms")
+    print(f"tracker and pandas:  {(with_pandas - baseline) * 1000:.0f}ms")
+
+if __name__ == "__main__":
+    main()
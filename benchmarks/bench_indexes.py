@@ -0,0 +1,76 @@
+import argparse
+import random
+import time
+from datetime import date, timedelta
+
+from employee_tracker.domain.employee import Employee
+from employee_tracker.domain.tracker import Tracker
+from employee_tracker.utils.filtering import filter_list
+from bench_load import time_call
+
+# Benchmark for salary and start date range queries and name searches, comparing filter_list over every employee with the indexes in Tracker.list_employees
+# Also compares the add members window's search, which used to check "name role" of every employee, with Tracker.search_employees
+# Run from the project root with: PYTHONPATH=src:benchmarks python benchmarks/bench_indexes.py --rows 1000000
+# Employees are built directly rather than with create_employee, as hashing a million passwords would take hours
+
+def sample_tracker(rows: int) -> Tracker:
+    tracker = Tracker()
+    first = date(2000, 1, 1)
+    for i in range(rows):
+        emp = Employee._from_trusted(f"emp_{i:08x}", f"Person {i}", f"Role {i % 50}", first + timedelta(days=random.randrange(9000)), random.randrange(20000, 120000), "Somewhere", [])
+        tracker.employees[emp.id] = emp
+        tracker._watch("employees", emp)
+    return tracker
+
+# The filtering list_employees did before the indexes, one filter_list pass per filter given
+def scan(tracker, **filters):
+    found = list(tracker.employees.values())
+    for name, (attribute, kind) in {"name_search": ("name", "string"), "role_search": ("role", "string"), "min_salary": ("salary", "min"), "max_salary": ("salary", "max"), "min_date": ("start_date", "min"), "max_date": ("start_date", "max")}.items():
+        if filters.get(name) is not None:
+            found = filter_list(found, attribute, filters[name], kind)
+    return found
+
+def best_of(func, repeats: int = 5) -> float:
+    return min(time_call(func)[0] for _ in range(repeats))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    tracker = sample_tracker(args.rows)
+    build_time, _ = time_call(lambda: tracker._table_indexes("employees", "salary", "start_date"))
+    text_time, _ = time_call(lambda: tracker._table_indexes("employees", "text"))
+    print(f"rows: {args.rows}, sorted indexes built in {build_time:.2f}s, trigram index in {text_time:.2f}s")
+
+    queries = {
+        "narrow salary band": dict(min_salary=50000, max_salary=50100),
+        "wide salary band": dict(min_salary=40000, max_salary=80000),
+        "salary and start date": dict(min_salary=90000, min_date=date(2020, 1, 1)),
+        "start date range": dict(min_date=date(2010, 1, 1), max_date=date(2010, 1, 31)),
+        "name search": dict(name_search="Person 4321"),
+        "name and salary": dict(name_search="Person 12", min_salary=100000),
+    }
+    for label, filters in queries.items():
+        assert tracker.list_employees(**filters) == scan(tracker, **filters)
+        matched = len(tracker.list_employees(**filters))
+        scan_time = best_of(lambda: scan(tracker, **filters))
+        # list_employees finds nothing until its result is used, so the whole result is built into a list to time it
+        index_time = best_of(lambda: list(iter(tracker.list_employees(**filters))))
+        print(f"{label:22} {matched:7} matches: filter_list {scan_time * 1000:8.1f}ms, indexes {index_time * 1000:7.2f}ms ({scan_time / index_time:.0f}x)")
+
+    search = "person 98765"
+    window_scan = lambda: [emp for emp in tracker.employees.values() if search in f"{emp.name} {emp.role}".lower()]
+    assert tracker.search_employees(search) == window_scan()
+    scan_time = best_of(window_scan)
+    index_time = best_of(lambda: tracker.search_employees(search))
+    print(f"add members search {search!r}: scan {scan_time * 1000:.1f}ms, index {index_time * 1000:.2f}ms ({scan_time / index_time:.0f}x)")
+
+    emps = random.sample(list(tracker.employees.values()), 1000)
+    update_time, _ = time_call(lambda: [setattr(emp, "salary", emp.salary + 1) for emp in emps])
+    print(f"keeping the indexes up to date: {update_time / len(emps) * 1e6:.1f}us per salary change")
+    update_time, _ = time_call(lambda: [setattr(emp, "name", emp.name + " Jr") for emp in emps])
+    print(f"keeping the indexes up to date: {update_time / len(emps) * 1e6:.1f}us per name change")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import argparse
+import base64
+import os
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+import employee_tracker.storage.storage as storage
+from employee_tracker.domain.employee import Employee
+from employee_tracker.domain.tracker import Tracker
+from employee_tracker.storage.storage import read_csv
+
+# Benchmark for loading employees.csv, comparing the original row-by-row from_row loop with the bulk from_frame loader
+# Also times a full Tracker load without the snapshot cache, with a cold cache (parse and write it) and with a warm cache
+# and how long a staged load takes to return with just users, which is when the login window can open
+# Run from the project root with: python benchmarks/bench_load.py --rows 400000
+# Hashes are random bytes in the stored format rather than real PBKDF2 output, as hashing 100k+ passwords would take hours
+
+def write_sample_employees(path: Path, rows: int):
+    first = date(2000, 1, 1)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("id,name,role,start_date,salary,address,password_hash,permissions\n")
+        for i in range(rows):
+            hash = base64.b64encode(os.urandom(48)).decode("utf-8")
+            start = first + timedelta(days=random.randrange(9000))
+            f.write(f'emp_{i:08x},Person {i},Role {i % 50},{start.isoformat()},{random.randrange(20000, 120000)},"{i} Some Street, Town",{hash},payroll hr_read\n')
+
+# The other tables are kept small, as in real data they are
+def write_other_tables(data_dir: Path, rows: int):
+    with open(data_dir / "employees.csv", encoding="utf-8") as f:
+        next(f)
+        users = [line.split(",")[0] + "," + line.rsplit(",", 2)[1] for line in f]
+    (data_dir / "users.csv").write_text("id,password_hash\n" + "\n".join(users) + "\n", encoding="utf-8")
+    (data_dir / "permissions.csv").write_text("name,active\npayroll,False\nhr_read,False\n", encoding="utf-8")
+    members = " ".join(f"emp_{i:08x}" for i in range(min(rows, 100)))
+    (data_dir / "departments.csv").write_text(f"id,name,description,head_of_department,parent_department,members\ndep_00000001,Everyone,All staff,emp_00000000,,{members}\n", encoding="utf-8")
+
+def time_call(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        storage.DATA_DIR = Path(tmp)
+        write_sample_employees(storage.DATA_DIR / "employees.csv", args.rows)
+
+        read_time, df = time_call(lambda: read_csv("employees"))
+        row_time, _ = time_call(lambda: [Employee.from_row(row) for row in df.to_dict(orient="records")])
+        frame_time, _ = time_call(lambda: Employee.from_frame(df))
+
+        write_other_tables(storage.DATA_DIR, args.rows)
+        full_time, _ = time_call(lambda: Tracker.load_from_storage())
+        cold_time, _ = time_call(lambda: Tracker.load_from_storage(cache=True))
+        warm_time, _ = time_call(lambda: Tracker.load_from_storage(cache=True))
+        staged_time, staged = time_call(lambda: Tracker.load_from_storage(staged=True))
+        staged.wait_until_loaded()
+
+    per = 100_000 / args.rows
+    print(f"rows: {args.rows}")
+    print(f"read_csv:            {read_time * per:.3f}s per 100k rows")
+    print(f"from_row loop:       {row_time * per:.3f}s per 100k rows")
+    print(f"from_frame (bulk):   {frame_time * per:.3f}s per 100k rows")
+    print(f"speedup:             {row_time / frame_time:.1f}x")
+    print(f"Tracker load:        {full_time * per:.3f}s per 100k rows")
+    print(f"  cold cache:        {cold_time * per:.3f}s per 100k rows")
+    print(f"  warm cache:        {warm_time * per:.3f}s per 100k rows")
+    print(f"  staged, to login:  {staged_time * per:.3f}s per 100k rows")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+import argparse
+
+from employee_tracker.gui.paging import PAGE_SIZE
+from bench_indexes import sample_tracker, scan, best_of
+
+# Benchmark for the lazy results of list_employees: finding the first page the employee window shows, against building the full list as before
+# Run from the project root with: PYTHONPATH=src:benchmarks python benchmarks/bench_paging.py --rows 1000000
+# The full list is what list_employees returned before, and what the window then drew every row of
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    tracker = sample_tracker(args.rows)
+    tracker._table_indexes("employees", "salary", "start_date", "text")
+    print(f"rows: {args.rows}, page size {PAGE_SIZE}")
+    queries = {
+        "everyone": {},
+        "role search": dict(role_search="Role 7"),
+        "salary band": dict(min_salary=40000, max_salary=80000),
+    }
+    for label, filters in queries.items():
+        results = tracker.list_employees(**filters)
+        assert results.page(PAGE_SIZE).records == scan(tracker, **filters)[:PAGE_SIZE]
+        full_time = best_of(lambda: scan(tracker, **filters))
+        page_time = best_of(lambda: results.page(PAGE_SIZE))
+        next_time = best_of(lambda: results.page(PAGE_SIZE, 10 * PAGE_SIZE))
+        count_time = best_of(lambda: results.count())
+        print(f"{label:12} full list {full_time * 1000:7.1f}ms, first page {page_time * 1000:6.2f}ms ({full_time / page_time:.0f}x), "
+              f"11th page {next_time * 1000:6.2f}ms, count() {count_time * 1000:6.1f}ms")
+
+if __name__ == "__main__":
+    main()
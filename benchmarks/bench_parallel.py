@@ -0,0 +1,45 @@
+import argparse
+import tempfile
+from pathlib import Path
+
+import employee_tracker.storage.storage as storage
+from employee_tracker.domain.tracker import Tracker
+from bench_load import write_sample_employees, write_other_tables, time_call
+
+# Benchmark comparing loading and saving the four tables one after another with doing them all at once on a thread pool
+# Run from the project root with: python benchmarks/bench_parallel.py --rows 400000
+# Only the csv parsing and writing release the GIL, building and validating the objects doesn't, so the gain depends on how much time goes to each
+
+def sequential(self, func, items):
+    return [func(item) for item in items]
+
+def time_load_and_save():
+    load_time, tracker = time_call(lambda: Tracker.load_from_storage())
+    tracker._synced = set()
+    save_time, _ = time_call(tracker.save_to_storage)
+    return load_time, save_time
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        storage.DATA_DIR = Path(tmp)
+        write_sample_employees(storage.DATA_DIR / "employees.csv", args.rows)
+        write_other_tables(storage.DATA_DIR, args.rows)
+
+        parallel = Tracker._for_each_table
+        Tracker._for_each_table = sequential
+        seq_load, seq_save = time_load_and_save()
+        Tracker._for_each_table = parallel
+        par_load, par_save = time_load_and_save()
+
+    print(f"rows: {args.rows}")
+    print(f"load, sequential:    {seq_load:.3f}s")
+    print(f"load, parallel:      {par_load:.3f}s ({seq_load / par_load:.2f}x)")
+    print(f"save, sequential:    {seq_save:.3f}s")
+    print(f"save, parallel:      {par_save:.3f}s ({seq_save / par_save:.2f}x)")
+
+if __name__ == "__main__":
+    main()
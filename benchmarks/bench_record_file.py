@@ -0,0 +1,72 @@
+import argparse
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import employee_tracker.storage.storage as storage
+from employee_tracker.domain.employee import Employee
+from employee_tracker.storage.record_file import LazyTable, RecordFile, write_record_file
+from bench_load import write_sample_employees, time_call
+
+# Benchmark for looking up single employees, comparing loading the whole employees.csv with the memory mapped record file
+# Run from the project root with: python benchmarks/bench_record_file.py --rows 1000000
+# Each mode runs in its own process, so its memory shows what a process serving only lookups needs
+
+def lookups(data_dir: str, mode: str, count: int):
+    storage.DATA_DIR = Path(data_dir)
+    ids = [f"emp_{random.randrange(count):08x}" for _ in range(1000)]
+    start = time.perf_counter()
+    if mode == "csv":
+        employees = {emp.id: emp for emp in Employee.from_frame(storage.read_csv("employees"))}
+    else:
+        employees = LazyTable(RecordFile(storage.DATA_DIR / "employees.rec"), Employee.from_row)
+    ready = time.perf_counter() - start
+    start = time.perf_counter()
+    names = [employees[id].name for id in ids]
+    per_lookup = (time.perf_counter() - start) / len(names)
+    anon, file = rss_kb()
+    print(ready, per_lookup, anon, file)
+
+# Resident memory split into the process's own memory and pages of mapped files, in kilobytes
+# Mapped file pages are shared page cache that the OS can drop at any time, and how many are mapped around each one read depends on the kernel
+# Falls back to ru_maxrss (all counted as the process's own) where /proc isn't available
+def rss_kb():
+    try:
+        with open("/proc/self/status") as f:
+            fields = dict(line.split(":", 1) for line in f)
+        return int(fields["RssAnon"].split()[0]), int(fields["RssFile"].split()[0])
+    except (OSError, KeyError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, 0
+
+def run(data_dir: str, mode: str, count: int):
+    result = subprocess.run([sys.executable, __file__, "--child", data_dir, mode, str(count)], capture_output=True, text=True, check=True)
+    ready, per_lookup, anon, file = result.stdout.split()
+    return float(ready), float(per_lookup), int(anon) / 1024, int(file) / 1024
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--child", nargs=3)
+    args = parser.parse_args()
+    if args.child:
+        lookups(args.child[0], args.child[1], int(args.child[2]))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        storage.DATA_DIR = Path(tmp)
+        write_sample_employees(storage.DATA_DIR / "employees.csv", args.rows)
+        df = storage.read_csv("employees")
+        convert_time, _ = time_call(lambda: write_record_file(storage.DATA_DIR / "employees.rec", {column: df[column].tolist() for column in df.columns}))
+        del df
+        results = {mode: run(tmp, mode, args.rows) for mode in ("csv", "record file")}
+
+    print(f"rows: {args.rows} (record file written in {convert_time:.2f}s)")
+    for mode, (ready, per_lookup, anon, file) in results.items():
+        print(f"{mode:12} ready in {ready:.3f}s, {per_lookup * 1e6:.1f}us per lookup, {anon:.0f} MB own memory + {file:.0f} MB mapped file pages")
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,49 @@
-from employee_tracker.utils.passwords import verify_password
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from employee_tracker.domain.tracker import Tracker
+from employee_tracker.utils.passwords import hash_password, needs_rehash, verify_password
 
 # Login function that calls a utility for verifying passwords
+# If the stored hash is older or cheaper than new hashes (see passwords.needs_rehash), it is replaced with a new one now the password is known
 def login(tracker: Tracker,emp_id: str,password_attempt: str) -> list:
+    return finish_login(tracker, emp_id, check_login(tracker, emp_id, password_attempt))
+
+# The slow part of login. It doesn't change the tracker, so it is safe to run on any thread
+# Returns the employee's permissions, and the upgraded hash of the password if one is needed (otherwise None)
+# Only users is needed to check the password, the employees table (for permissions) is waited for once the password is right
+def check_login(tracker: Tracker, emp_id: str, password_attempt: str) -> tuple:
     if emp_id not in tracker.users:
         raise LookupError("No such user")
-    if verify_password(password_attempt,tracker.users[emp_id].password_hash):
-        return tracker.employees[emp_id].permissions
+    stored_hash = tracker.users[emp_id].password_hash
+    if verify_password(password_attempt,stored_hash):
+        new_hash = hash_password(password_attempt) if needs_rehash(stored_hash) else None
+        tracker.wait_until_loaded()
+        return tracker.employees[emp_id].permissions, new_hash
     else:
         raise PermissionError("Incorrect password")
-    
\ No newline at end of file
+
+# Stores any upgraded hash from check_login, on the thread that owns the tracker, and returns the permissions
+def finish_login(tracker: Tracker, emp_id: str, result: tuple) -> list:
+    permissions, new_hash = result
+    if new_hash is not None:
+        tracker.upgrade_password_hash(emp_id, new_hash)
+    return permissions
+
+# Checking a password is deliberately slow, so this runs check_login on a worker thread and returns a Future for its result
+# The caller (e.g. the Tk event loop) carries on meanwhile, then passes the result to finish_login. PBKDF2 releases the GIL, so many logins at once are checked in parallel
+# The Future raises the same errors as login if it fails
+def login_async(tracker: Tracker, emp_id: str, password_attempt: str) -> Future:
+    return _login_pool().submit(check_login, tracker, emp_id, password_attempt)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+# Started on first use, and shared by every login after that
+def _login_pool() -> ThreadPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix="login")
+        return _pool
@@ -2,8 +2,12 @@ from dataclasses import dataclass
 from employee_tracker.domain.employee import Employee
 from employee_tracker.utils.ids import new_id
 from employee_tracker.utils.ids import check_id
+from employee_tracker.utils.change_tracking import ChangeTracked, read_version
+
+class Department(ChangeTracked):
+    # Version of this record in storage, as for Employee
+    _version = 0
 
-class Department:
     # initialise with name description as strings. Head of department should be an employee ID of an existing employee
     # Parent department does not currently have functionality, but plans are to incorporate this into the permissions structure (someone with the permissions to edit a department should be able to edit that department's children)
     # Members is a list of employee IDs showing who is in the department#
@@ -37,6 +41,9 @@ class Department:
         self._parent_department = parent_department
     #Properties are obfuscated to ensure control over access
     @property
+    def version(self):
+        return self._version
+    @property
     def members(self):
         return self._members
     # Same with setting of properties, this allows for controlling setting properties in certain circumstances
@@ -51,6 +58,7 @@ class Department:
             if not check_id(id,"emp"):
                 raise ValueError("all items in list should be valid employee ids")
         self._members = new_members
+        self._changed()
     def list_employees(self):
         if len(self._members) == 0:
             raise ValueError("No employees in department")
@@ -63,6 +71,7 @@ class Department:
         elif employee.id in self._members:
             raise ValueError(f"Employee ID {employee.id} already in {self.name}, cannot add again")
         self.members.append(employee.id)
+        self._changed()
     def remove_employee(self,employee_id):
         #validates id before removing employee if in members
         if not check_id(employee_id,"emp"):
@@ -72,6 +81,7 @@ class Department:
         else:
             # This message is not currently used, but I added this in to have ease of addition later
             self.members.remove(employee_id)
+            self._changed()
             if len(self.members) == 0:
                 return "Last employee removed, department empty"
     @property
@@ -83,6 +93,7 @@ class Department:
             raise TypeError("name must be a string")
         else:
             self._name = new_name
+            self._changed()
     @property
     def description(self):
         return self._description
@@ -92,12 +103,14 @@ class Department:
             raise TypeError("description must be a string")
         else:
             self._description = new_description
+            self._changed()
     @property
     def head_of_department(self):
         return self._head_of_department
     @head_of_department.setter
     def head_of_department(self,new_head_of_department):
         self._head_of_department = new_head_of_department
+        self._changed()
 
     def change_head_of_department(self,new_head):
          # Similar checks to adding employees (validating type and ID)
@@ -117,6 +130,7 @@ class Department:
     @parent_department.setter
     def parent_department(self,new_parent_department):
         self._parent_department = new_parent_department
+        self._changed()
     def set_parent_department(self,new_dep):
         # More type and ID checks before setting
         if not isinstance(new_dep,Department):
@@ -141,7 +155,8 @@ class Department:
             "description":self.description,
             "head_of_department":self.head_of_department,
             "parent_department":self.parent_department,
-            "members":" ".join(self.members) 
+            "members":" ".join(self.members),
+            "version":self.version
         }
     ### AI declaration - the usage of class methods to solve a problem I was having with loading from storage was suggested by AI
     @classmethod
@@ -152,11 +167,58 @@ class Department:
         mems = row.get("members", "")
         members = mems.split() if mems else []
 
-        return cls(
+        dep = cls(
             id=row["id"],
             name=row["name"],
             description=row["description"],
             head_of_department=row["head_of_department"],
             parent_department=row["parent_department"],
             members=members,
-        )
\ No newline at end of file
+        )
+        dep._version = read_version(row)
+        return dep
+
+    # Builds a Department from values that have already been validated, skipping the checks in __init__
+    @classmethod
+    def _from_trusted(cls, id, name, description, head_of_department, parent_department, members, version=0) -> "Department":
+        dep = cls.__new__(cls)
+        dep.id = id
+        dep._name = name
+        dep._description = description
+        dep._head_of_department = head_of_department
+        dep._members = members
+        dep._parent_department = parent_department
+        dep._version = version
+        return dep
+
+    # Bulk version of from_row. Columns are validated together and any failing rows fall back to from_row for the usual errors
+    @classmethod
+    def from_frame(cls, df) -> list:
+        from employee_tracker.utils.column_checkers import check_id_column, check_string_column, versions_column
+
+        if len(df) == 0:
+            return []
+        valid = check_id_column(df["id"], "dep")
+        for column in ("name", "description", "head_of_department"):
+            valid &= check_string_column(df[column])
+        # parent department can be a string or empty
+        parents = df["parent_department"]
+        valid &= check_string_column(parents) | parents.isna()
+        parents = parents.astype(object).where(parents.notna(), None)
+
+        if "members" in df.columns:
+            mems = df["members"].where(check_string_column(df["members"]), "")
+            members = [m.split() if m else [] for m in mems.tolist()]
+        else:
+            members = [[] for _ in range(len(df))]
+
+        versions, valid = versions_column(df, valid)
+
+        departments = []
+        rows = zip(valid.tolist(), df["id"].tolist(), df["name"].tolist(), df["description"].tolist(), df["head_of_department"].tolist(), parents.tolist(), members, versions)
+        for i, (ok, id, name, description, head, parent, mems, version) in enumerate(rows):
+            if ok:
+                departments.append(cls._from_trusted(id, name, description, head, parent, mems, version))
+            else:
+                departments.append(cls.from_row(df.iloc[i].to_dict()))
+        return departments
@@ -1,12 +1,23 @@
 from dataclasses import dataclass
-from datetime import date
+from datetime import date, datetime
 from employee_tracker.utils.ids import new_id
 from employee_tracker.utils.value_checkers import check_new_value
 from employee_tracker.utils.ids import check_id
 from employee_tracker.utils.passwords import hash_password, is_valid_stored_password_hash
-import pandas as pd
+from employee_tracker.utils.change_tracking import ChangeTracked, read_version
+from employee_tracker.domain.user import User
+
+class Employee(ChangeTracked):
+    # Version of this record in storage, used to spot two instances saving changes to the same employee (see Tracker.save_to_storage)
+    # It only changes when a save writes the record, never when the record is edited, so it isn't a tracked change
+    _version = 0
+    # The password hash isn't held here. It belongs to the employee's User, which is the only copy, in memory and in storage (users.csv)
+    # A new employee makes its own User, which the tracker moves into its users. Employees held by a tracker look theirs up there (see Tracker._watch)
+    _user = None
+    _users = None
+    # Set by the tracker along with _observer, so left out when pickled
+    _owner_attributes = ("_observer", "_users")
 
-class Employee:
     # Class initilisation with type validations. Mostly strings except date for start_date and integer for salary
     # Optional arguments for password and password_hash (which then decides if new password hash should be made)
     # Optional argument for id, to aid in loading from storage
@@ -37,12 +48,14 @@ class Employee:
         self._salary = salary
         self._address = address
         # Any passed hash is checked against the hashing method to validate that it was created by this program
+        # The id and hash have both been checked here, so the User skips its own checks
         if password_hash:
             if is_valid_stored_password_hash(password_hash):
-                self._password_hash = password_hash
-        else:
+                self._user = User._from_trusted(self.id, password_hash)
+        elif password is not None:
             # If only a password is passed, then it is hashed before storing, the password itself is never stored
-            self._password_hash = hash_password(password)
+            self._user = User._from_trusted(self.id, hash_password(password))
+        # With neither (e.g. when loading from storage), the user is found through the tracker
         self._enabled = True
     # These two methods were built with future functionality in mind. They are both tested but as yet not utilised
     def salary_bump(self,uplift_percentage):
@@ -52,6 +65,9 @@ class Employee:
     # Properties are obfuscated to give opportunities to hide if necessary
     # This was originally planned to be part of permissions, but that functionality was moved the GUI level
     @property
+    def version(self):
+        return self._version
+    @property
     def name(self):
         return self._name
     @name.setter
@@ -59,6 +75,7 @@ class Employee:
         #value setters validate as in init
         if check_new_value(new_name,"name",str,self._name):
             self._name = new_name
+            self._changed()
     @property
     def role(self):
         return self._role
@@ -66,6 +83,7 @@ class Employee:
     def role(self,new_role):
         if check_new_value(new_role,"role",str,self._role):
             self._role = new_role
+            self._changed()
     @property
     def salary(self):
         return self._salary
@@ -73,6 +91,7 @@ class Employee:
     def salary(self,new_salary):
         if check_new_value(new_salary,"salary",int,self._salary):
             self._salary = new_salary
+            self._changed()
     @property
     def address(self):
         return self._address
@@ -80,18 +99,21 @@ class Employee:
     def address(self,new_address):
         if check_new_value(new_address,"address",str,self._address):
             self._address = new_address
+            self._changed()
     @property
     def start_date(self):
         return self._start_date
     @start_date.setter
     def start_date(self,new_start_date):
         self._start_date = new_start_date
+        self._changed()
     @property
     def enabled(self):
         return self._enabled
     @enabled.setter
     def enabled(self,new_enabled):
         self._enabled = new_enabled
+        self._changed()
     @property
     def permissions(self):
         return self._permissions
@@ -99,6 +121,7 @@ class Employee:
     @permissions.setter
     def permissions(self,new_permissions):
         self._permissions = new_permissions
+        self._changed()
     def add_permission(self,permission):
         # Permission class is imported to aid in validation
         from employee_tracker.domain.permission import Permission
@@ -113,13 +136,20 @@ class Employee:
                     raise ValueError(f"{self.name} already has the permission {permission.name}, cannot add again")
                 else:
                     self.permissions.append(permission.name)
+                    self._changed()
+    @property
+    def user(self):
+        if self._users is not None:
+            return self._users(self.id)
+        return self._user
     @property
     def password_hash(self):
-        return self._password_hash
+        user = self.user
+        return user.password_hash if user is not None else None
     @password_hash.setter
     def password_hash(self,new_password):
-        # New password setting calls hash_password
-        self._password_hash = hash_password(new_password)
+        # New password setting calls hash_password, once. Only the user holds the hash, so the employee itself hasn't changed
+        self.user.password_hash = hash_password(new_password)
     def remove_permission(self,permission):
         # Again, Permissions is used for validation
         from employee_tracker.domain.permission import Permission
@@ -129,6 +159,7 @@ class Employee:
             raise ValueError(f"{self.name} does not have the permission {permission.name} to remove")
         else:
             self.permissions.remove(permission.name)
+            self._changed()
     def wipe_permissions(self): 
         # This is a quick function to remove all permissions at once rather than one by one
         if self.permissions == None:
@@ -146,29 +177,84 @@ class Employee:
             "start_date":self.start_date,
             "salary":self.salary,
             "address":self.address,
-            "password_hash":self.password_hash,
             #Permissions are joined by a space, to avoid being broken up in a csv
-            "permissions":" ".join(self.permissions) 
+            "permissions":" ".join(self.permissions),
+            "version":self.version
         }
     #Class method to load from storage, so it can be called before the object exists
+    # Rows saved before the hash moved to users may still have a password_hash, which is ignored
     ### AI Declaration - The usage of class methods was a result of a suggestion from an LLM
     @classmethod
     def from_row(cls, row: dict) -> "Employee":
         start_date = row["start_date"]
-        if isinstance(start_date, pd.Timestamp):
+        # pandas Timestamps are datetimes, so this covers them without needing pandas imported
+        if isinstance(start_date, datetime):
             start_date = start_date.date()
+        # Dates stored as text (e.g. in the journal) are in ISO format
+        elif isinstance(start_date, str):
+            start_date = date.fromisoformat(start_date)
 
         #Permissions are re-organised into a list
         perms = row.get("permissions", "")
         permissions = perms.split() if perms else []
 
-        return cls(
+        emp = cls(
             id=row["id"],
             name=row["name"],
             role=row["role"],
             start_date=start_date,
             salary=int(row["salary"]),
             address=row["address"],
-            password_hash=row["password_hash"],
             permissions=permissions,
-        )
\ No newline at end of file
+        )
+        emp._version = read_version(row)
+        return emp
+
+    # Builds an Employee from values that have already been validated, skipping the checks in __init__
+    # Only to be used by the bulk loader below, where validation has already happened column by column
+    @classmethod
+    def _from_trusted(cls, id, name, role, start_date, salary, address, permissions, version=0) -> "Employee":
+        emp = cls.__new__(cls)
+        emp.id = id
+        emp._name = name
+        emp._role = role
+        emp._start_date = start_date
+        emp._permissions = permissions
+        emp._salary = salary
+        emp._address = address
+        emp._enabled = True
+        emp._version = version
+        return emp
+
+    # Bulk version of from_row, taking a whole dataframe (as returned by read_csv)
+    # Every column is validated in one go, then objects are built without re-running the per-row checks
+    # Any rows that fail are passed through from_row, so that the same errors are raised as before
+    @classmethod
+    def from_frame(cls, df) -> list:
+        from employee_tracker.utils.column_checkers import check_id_column, check_string_column, check_int_column, check_date_column, versions_column
+
+        if len(df) == 0:
+            return []
+        salaries, valid = check_int_column(df["salary"])
+        start_dates, valid_dates = check_date_column(df["start_date"])
+        valid &= valid_dates
+        valid &= check_id_column(df["id"], "emp")
+        for column in ("name", "role", "address"):
+            valid &= check_string_column(df[column])
+
+        if "permissions" in df.columns:
+            perms = df["permissions"].where(check_string_column(df["permissions"]), "")
+            permissions = [p.split() if p else [] for p in perms.tolist()]
+        else:
+            permissions = [[] for _ in range(len(df))]
+
+        versions, valid = versions_column(df, valid)
+
+        employees = []
+        rows = zip(valid.tolist(), df["id"].tolist(), df["name"].tolist(), df["role"].tolist(), start_dates.tolist(), salaries.tolist(), df["address"].tolist(), permissions, versions)
+        for i, (ok, id, name, role, start_date, salary, address, perms, version) in enumerate(rows):
+            if ok:
+                employees.append(cls._from_trusted(id, name, role, start_date, salary, address, perms, version))
+            else:
+                employees.append(cls.from_row(df.iloc[i].to_dict()))
+        return employees
@@ -1,10 +1,11 @@
 from employee_tracker.domain.department import Department
 from employee_tracker.utils.ids import check_id
+from employee_tracker.utils.change_tracking import ChangeTracked
 
 
 # Currently this class is under-utilised. Permission names are hard coded in the GUI level
 # The intention of keeping this class is that there may be new ones added in future
-class Permission:
+class Permission(ChangeTracked):
     def __init__(self,name,active = False):
         if not isinstance(name,str):
             raise TypeError("Name must be a string")
@@ -22,6 +23,7 @@ class Permission:
         elif new_name == self.name:
             raise ValueError(f"name is already {new_name}")
         self._name = new_name
+        self._changed()
     # "Active" was originally meant to be used as part of permission validation at class-level
     # However, permissions were then moved to be within a list at the upper "tracker" level
     # As such Active is current not used, but kept here to be part of future plans
@@ -33,6 +35,7 @@ class Permission:
         if not isinstance(activate,bool):
             raise TypeError("active must be a boolean value")
         self._active = activate
+        self._changed()
     
     # Quick storage preparation
     def to_row(self):
@@ -51,3 +54,8 @@ class Permission:
             name=row["name"],
             active=active
         )
+
+    # Permissions are few, so the bulk loader just builds each row in turn
+    @classmethod
+    def from_frame(cls, df) -> list:
+        return [cls.from_row(row) for row in df.to_dict(orient="records")]
@@ -3,21 +3,226 @@ from employee_tracker.domain.department import Department
 from employee_tracker.domain.permission import Permission
 from employee_tracker.domain.user import User
 from employee_tracker.utils.ids import check_id
-from employee_tracker.utils.filtering import filter_list
-from employee_tracker.storage.storage import create_dataframe, read_csv, write_csv
-from employee_tracker.utils.passwords import hash_password
-from typing import Dict
+from employee_tracker.utils.indexes import SortedIndex, TableIndexes, TrigramIndex
+from employee_tracker.utils.query import Predicate, Query, QueryResult, RecordView, plan_query, useful_indexes
+from employee_tracker.storage.storage import create_dataframe, create_rows, read_csv, read_csv_chunks, read_csv_rows, write_csv, table_path
+import employee_tracker.storage.storage as storage_module
+from employee_tracker.storage.storage import fingerprint as storage_fingerprint, fingerprint_matches
+from employee_tracker.storage import snapshot_cache
+from employee_tracker.utils.passwords import hash_password, hash_passwords, is_valid_stored_password_hash
+from employee_tracker.utils.change_tracking import read_version
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Dict, Set
+import threading
+
+# The four tables the tracker holds, in the order they are saved
+TABLES = ("employees", "departments", "permissions", "users")
+
+# Raised by a save when records changed here were also changed or deleted by another instance since they were loaded
+# Every other change is still saved. conflicts maps each table to {key: row in storage}, with None for rows deleted there
+# The conflicting records stay unsaved until Tracker.resolve_conflicts decides which version to keep
+class SaveConflictError(Exception):
+    def __init__(self, conflicts: dict):
+        self.conflicts = conflicts
+        count = sum(len(rows) for rows in conflicts.values())
+        super().__init__(f"{count} record(s) were changed by someone else since they were loaded")
 
 class Tracker:
-    def __init__(self):
-        #No Arguments are passed in, but properties are made with clear expectations of what they will contain
+    # A storage backend (see storage/backend.py) can be passed in, otherwise the csv functions in storage.py are used
+    def __init__(self, backend=None):
+        # Properties are made with clear expectations of what they will contain
+        self.backend = backend
         self.employees: Dict[str,Employee] = {}
         self.departments: Dict[str,Department] = {}
         self.permissions: Dict[str,Permission] = {}
         self.users: Dict[str,User] = {}
+        # Change tracking - keys of records that have been created, changed or deleted since the last save or load, per table
+        # Tables in _synced are known to match what is in storage, so a save can skip them if nothing in them is dirty
+        self._dirty: Dict[str,Set[str]] = {table: set() for table in TABLES}
+        self._synced: Set[str] = set()
+        # Versions of records deleted since the last save, so a save can check nobody else changed them first
+        self._deleted_versions: Dict[str,Dict[str,int]] = {table: {} for table in TABLES}
+        # Rows from the last save that clashed with another instance's changes, per table (see SaveConflictError)
+        self._conflicts: Dict[str,dict] = {}
+        # One observer per table, shared by every object in that table, which domain setters call when something changes
+        self._observers = {table: partial(self._note_change, table) for table in TABLES}
+        # Functions called with (table, key) after every change, e.g. the journal
+        self._listeners = []
+        self.journal = None
+        self._compaction = None
+        # Whether loads go through the binary snapshot cache (see storage/snapshot_cache.py)
+        self.use_cache = False
+        # If set, csvs are read this many rows at a time and each chunk is built into objects before the next is read
+        self.chunk_size = None
+        # Fingerprints (see storage.fingerprint) of each csv as last loaded or saved, so reloads can skip tables that haven't changed
+        self._fingerprints = {}
+        # How many times each table has been written to storage by this tracker. A tracker made by read_tables keeps the counts
+        # its source had when the read started, so merge_tables can tell a read that a save has since overtaken
+        self._writes = {table: 0 for table in TABLES}
+        self._read_at_writes = None
+        # A staged load (see load_from_storage) finishes loading on this thread. Anything that fails is kept to be raised when waited on
+        self._loading = None
+        self._load_error = None
+        # Indexes per table (see utils/indexes.py), built the first time a query can use them and then kept up to date with every change
+        self._indexes: Dict[str,TableIndexes] = {}
+        # Columnar copies of tables for reporting queries (see query_columns), built on first use and kept up to date like the indexes
+        self._columns: Dict[str,"TableColumns"] = {}
+
+    # Called by domain objects (via ChangeTracked._changed) whenever one of their setters succeeds
+    def _note_change(self, table, obj):
+        key = obj.name if table == "permissions" else obj.id
+        self._record(table, key)
+
+    # Every create, change and delete ends up here. The key is marked unsaved and any listeners are told
+    def _record(self, table, key):
+        self._dirty[table].add(key)
+        self._reindex(table, key)
+        for listener in self._listeners:
+            listener(table, key)
+
+    def add_listener(self, listener):
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        self._listeners.remove(listener)
+
+    # Starts tracking changes to an object held in one of the tables
+    # Employees are also pointed at users for their password hash (see Employee.user)
+    def _watch(self, table, obj):
+        obj._observer = self._observers[table]
+        if table == "employees":
+            obj._users = self._user_for
+
+    # Looked up each time rather than stored on the employee, so employees find the right user even after users is reloaded or merged
+    def _user_for(self, emp_id):
+        return self.users.get(emp_id)
+
+    # The indexes each table can have, made fresh for each build
+    # "text" is searched by name_search and role_search (or description_search), and by search_employees
+    @staticmethod
+    def _new_indexes(table):
+        if table == "employees":
+            return TableIndexes({"salary": SortedIndex("salary"), "start_date": SortedIndex("start_date"), "text": TrigramIndex(("name", "role"))})
+        if table == "departments":
+            return TableIndexes({"text": TrigramIndex(("name", "description"))})
+        return None
+
+    # Builds the named indexes of a table if they aren't already. Returns None if the table can't be indexed
+    # Lazy tables would have to read every record to build them, so they aren't indexed
+    def _table_indexes(self, table, *names):
+        if self._is_lazy(table):
+            return None
+        indexes = self._indexes.get(table)
+        if indexes is None:
+            indexes = self._new_indexes(table)
+            if indexes is None:
+                return None
+            self._indexes[table] = indexes
+        try:
+            indexes.build(getattr(self, table), names)
+        # Values that can't be compared (e.g. a start_date set to text) can't be sorted, so queries check every record instead
+        except TypeError:
+            return None
+        return indexes
+
+    # Brings any indexes up to date with one record, after it is added, changed or removed
+    # Every change made here goes through _record. Rows brought in from storage call this themselves
+    # The columns are dropped rather than updated if the record can't be held in them, or they have built up too many dead rows to keep
+    def _reindex(self, table, key):
+        indexes = self._indexes.get(table)
+        if indexes is not None:
+            try:
+                indexes.update(key, getattr(self, table).get(key))
+            except TypeError:
+                del self._indexes[table]
+        columns = self._columns.get(table)
+        if columns is not None:
+            try:
+                keep = columns.update(key, getattr(self, table).get(key))
+            except TypeError:
+                keep = False
+            if not keep:
+                del self._columns[table]
+
+    # The columns each table can have copied into NumPy arrays (see utils/columns.py)
+    # NumPy is optional and slow to import, so it is only imported the first time columns are made. Returns None without it
+    @staticmethod
+    def _new_columns(table):
+        if table != "employees":
+            return None
+        try:
+            from employee_tracker.utils.columns import TableColumns
+        except ImportError:
+            return None
+        return TableColumns({"salary": "int64", "start_date": "date", "role": "dictionary", "name": "dictionary"})
+
+    # Builds a table's columns if they aren't already. Returns None if the table has none, is lazy, has values the columns can't hold, or NumPy isn't installed
+    def _table_columns(self, table):
+        if self._is_lazy(table):
+            return None
+        columns = self._columns.get(table)
+        if columns is None:
+            columns = self._new_columns(table)
+            if columns is None:
+                return None
+            try:
+                columns.build(getattr(self, table))
+            except TypeError:
+                return None
+            self._columns[table] = columns
+        return columns
+
+    # Queries can only go to storage when storage holds exactly what is in memory
+    def _can_push_down(self, table) -> bool:
+        return getattr(self.backend, "supports_queries", False) and table in self._synced and not self._dirty[table]
+
+    # Switches to a different backend. Nothing is known to be in the new backend yet, so the next save writes every table
+    def use_backend(self, backend):
+        self.wait_until_loaded()
+        self._wait_for_compaction()
+        self.backend = backend
+        self._synced = set()
+
+    # Tables that have changes not yet written to storage
+    def unsaved_tables(self) -> list:
+        return [table for table in TABLES if self._dirty[table] or table not in self._synced]
+
+    def has_unsaved_changes(self) -> bool:
+        return bool(self.unsaved_tables())
 
     # Method to call Employee constructor, types aren't enforced here as that happens in the constructor
     def create_employee(self,name,role, start_date,salary,address,permissions = None,password=None,password_hash=None,id=None):
+        self._check_permissions(permissions)
+        emp = Employee(name=name,role=role,start_date=start_date,salary=salary,address=address,permissions=permissions,password=password,id=id,password_hash=password_hash)
+        self._add_employee(emp)
+        return emp
+
+    # Creates many employees (and their users) at once, from a list of dicts of create_employee's arguments
+    # Hashing a password is deliberately slow, so all the passwords are hashed together across every core (see hash_passwords)
+    # Every employee is checked and built before any is added, so if one is invalid none of them are
+    def create_employees(self, employees: list) -> list:
+        for position, kwargs in enumerate(employees):
+            self._check_permissions(kwargs.get("permissions"))
+            if kwargs.get("password_hash") and not is_valid_stored_password_hash(kwargs["password_hash"]):
+                raise ValueError(f"employee {position} has an invalid password_hash")
+            if not kwargs.get("password_hash") and kwargs.get("password") is None:
+                raise ValueError(f"employee {position} needs a password or a valid password_hash")
+        hashes = iter(hash_passwords([kwargs.get("password") for kwargs in employees if not kwargs.get("password_hash")]))
+        built = []
+        for position, kwargs in enumerate(employees):
+            if not kwargs.get("password_hash"):
+                kwargs = {**kwargs, "password": None, "password_hash": next(hashes)}
+            emp = Employee(**kwargs)
+            # _add_employee would refuse it, after the ones before it had been added
+            if emp._user is None:
+                raise ValueError(f"employee {position} needs a password or a valid password_hash")
+            built.append(emp)
+        for emp in built:
+            self._add_employee(emp)
+        return built
+
+    def _check_permissions(self, permissions):
         if permissions != None:
             if not isinstance(permissions,list):
                 raise TypeError("permissions must be a list of permission names")
@@ -25,21 +230,82 @@ class Tracker:
                 for permission in permissions:
                     if not permission in self.permissions:
                         raise TypeError("permissions in list must be valid permission names")
-        emp = Employee(name=name,role=role,start_date=start_date,salary=salary,address=address,permissions=permissions,password=password,id=id,password_hash=password_hash)
+
+    def _add_employee(self, emp):
+        # A user profile is created for logging in. The new employee's User is moved into users, which holds the only copy of the hash from then on
+        user, emp._user = emp._user, None
+        if user is None:
+            raise ValueError("a new employee needs a password or a valid password_hash")
         self.employees[emp.id] = emp
-        # A user profile is created for logging in
-        user = User(emp.id,emp.password_hash)
+        self._watch("employees", emp)
+        self._record("employees", emp.id)
         self.users[emp.id] = user
-        return emp
+        self._watch("users", user)
+        self._record("users", user.id)
     
     # This method had planned functionality for filtering searches that hasn't been implemented in the GUI yet, though it is tested and working
     def list_employees(self,name_search=None,role_search=None,min_date=None,max_date=None,min_salary=None,max_salary=None,permissions=None):
-        employee_list = list(self.employees.values())
-        for key,value in {name_search:["name","string"],role_search:["role","string"],min_date:["start_date","min"],max_date:["start_date","max"],min_salary:["salary","min"],max_salary:["salary","max"]}.items():
-            if key !=None:
-                # The filtering is done in a utilty function
-                employee_list = filter_list(employee_list,value[0],key,value[1])   
-        return employee_list
+        # If the backend can run queries and nothing in employees is unsaved, the filtering is pushed down to storage
+        filters = dict(name_search=name_search,role_search=role_search,min_date=min_date,max_date=max_date,min_salary=min_salary,max_salary=max_salary)
+        predicates = [Predicate(attribute,kind,value) for value,attribute,kind in ((name_search,"name","string"),(role_search,"role","string"),(min_date,"start_date","min"),(max_date,"start_date","max"),(min_salary,"salary","min"),(max_salary,"salary","max")) if value is not None]
+        if self._can_push_down("employees") and predicates:
+            return QueryResult(Query("employees",predicates),partial(self._prepare_pushed_down,filters))
+        return self.query(Query("employees",predicates))
+
+    # Runs a Query (see utils/query.py) against one of the tables, e.g.
+    # tracker.query(Query("employees", [Predicate("salary", "min", 50000)], sort="-salary", limit=10)) for the ten best paid employees earning 50000 or more
+    # Returns a QueryResult, which finds the records only as they are used, e.g. tracker.query(query).page(50) only finds the first 50
+    # As with a dict, don't add or delete records while iterating over a result. Take a list() of it first
+    def query(self,query):
+        self._query_indexes(query)
+        return QueryResult(query,self._prepare)
+
+    # The plan, table and indexes a QueryResult runs its query with, worked out each time it is used so it sees the table as it is then
+    def _prepare(self,query):
+        indexes = self._query_indexes(query)
+        records = getattr(self,query.table)
+        return plan_query(query,indexes,len(records)),records,indexes
+
+    # Like _prepare, but the records are the employees the backend found for list_employees' filters, so no predicates are checked here
+    # Each use asks the backend again. Once employees has unsaved changes the backend is out of date, so the query is run here instead
+    def _prepare_pushed_down(self,filters,query):
+        if not self._can_push_down("employees"):
+            return self._prepare(query)
+        found = {emp_id: self.employees[emp_id] for emp_id in self.backend.query_employee_ids(**filters) if emp_id in self.employees}
+        return plan_query(Query("employees")),found,None
+
+    # Runs a Query against a columnar copy of the table instead, for reports over large parts of it, e.g. everyone in a salary band who started before a date
+    # Salary, start date, role and name are checked for every employee at once with NumPy. Other predicates are then checked on the employees left
+    # Returns a RecordView, whose ids can be used without looking up any records. Tables without columns (or without NumPy installed) are queried as normal
+    def query_columns(self,query):
+        columns = self._table_columns(query.table) if query.table in TABLES else None
+        if columns is None:
+            records = self.query(query)
+            return RecordView([record.name if query.table == "permissions" else record.id for record in records],getattr(self,query.table))
+        return columns.run(query,getattr(self,query.table))
+
+    # How query() would find a query's records, without finding them
+    def plan(self,query):
+        return plan_query(query,self._query_indexes(query),len(getattr(self,query.table)))
+
+    # Builds any of the table's indexes that could help with a query, and returns them. Indexes that can't be built are left out
+    def _query_indexes(self,query):
+        if query.table not in TABLES:
+            raise ValueError(f"{query.table} is not a table")
+        candidates = self._indexes.get(query.table) or self._new_indexes(query.table)
+        if candidates is None or self._is_lazy(query.table):
+            return None
+        for name in useful_indexes(query,candidates.indexes):
+            self._table_indexes(query.table,name)
+        return self._indexes.get(query.table)
+
+    # Employees whose name and role, as "name role", contain the search, ignoring case, in table order. Used by the add members window
+    def search_employees(self,search):
+        search = search.lower()
+        indexes = self._table_indexes("employees","text") if TrigramIndex.can_search(search) else None
+        if indexes is None:
+            return [emp for emp in self.employees.values() if search in f"{emp.name} {emp.role}".lower()]
+        return [self.employees[key] for key in indexes.in_table_order(indexes["text"].search(search),self.employees)]
     
     # Altering parameters within an employee, with error handling for employee not found and attempting to change a field that doesn't exist
     def update_employee(self,emp_id,new_data):
@@ -65,13 +331,20 @@ class Tracker:
             raise TypeError("Invalid ID")
         if emp_id not in self.employees.keys():
             raise ValueError("Employee not found, cannot delete")
-        del self.employees[emp_id]
+        emp = self.employees.pop(emp_id)
+        emp._observer = None
+        self._deleted_versions["employees"].setdefault(emp_id, emp.version)
+        self._record("employees", emp_id)
 
-    # Updating password (with password hashing) before passing to employee and associated user
+    # Updating password (with password hashing) on the employee's user, which is where employees read their hash from
     def update_employee_password(self,emp_id,new_password):
-        hash = hash_password(new_password)
-        self.employees[emp_id].password_hash = hash
-        self.users[emp_id].password_hash = hash
+        if emp_id not in self.users:
+            raise KeyError(f"Employee {emp_id} not found")
+        self.users[emp_id].password_hash = hash_password(new_password)
+
+    # Replaces a hash that has just been checked at login with a stronger one of the same password (see auth.login)
+    def upgrade_password_hash(self, emp_id, new_hash):
+        self.users[emp_id].password_hash = new_hash
 
     # Method to call department constructor, some error handling here, but most is inside Department
     def create_department(self,name,description,head_of_department,parent_department=None,members=None):
@@ -91,15 +364,14 @@ class Tracker:
         dep = Department(name,description,head_of_department,parent_department,members)
         # Department is added to a list under its ID
         self.departments[dep.id] = dep
+        self._watch("departments", dep)
+        self._record("departments", dep.id)
         return dep
     
     # As with employees, the tested filtering functionality here has not yet been implemented in the GUI
     def list_departments(self,name_search=None,description_search=None,head_of_department_search=None,parent_department_search=None):
-        department_list = list(self.departments.values())
-        for key,value in {name_search:["name","string"],description_search:["description","string"],head_of_department_search:["head_of_department","string"],parent_department_search:["parent_department","string"]}.items():
-            if key !=None:
-                department_list = filter_list(department_list,value[0],key,value[1]) 
-        return department_list
+        predicates = [Predicate(attribute,"string",value) for value,attribute in ((name_search,"name"),(description_search,"description"),(head_of_department_search,"head_of_department"),(parent_department_search,"parent_department")) if value is not None]
+        return self.query(Query("departments",predicates))
     
     # Similar to update employee, this updates legitimate properties of valid IDs
     def update_department(self,dep_id,new_data):
@@ -124,7 +396,10 @@ class Tracker:
             raise TypeError("Invalid ID")
         if dep_id not in self.departments.keys():
             raise ValueError("Department not found, cannot delete")
-        del self.departments[dep_id]
+        dep = self.departments.pop(dep_id)
+        dep._observer = None
+        self._deleted_versions["departments"].setdefault(dep_id, dep.version)
+        self._record("departments", dep_id)
     
     # Method to add employees to a department, with validation of IDs and ensuring that assets exist
     def add_employee_to_department(self,dep_id,emp_id):
@@ -137,87 +412,524 @@ class Tracker:
         if emp_id not in self.employees.keys():
             raise KeyError("Check Employee ID, not found")
         self.departments[dep_id].members.append(emp_id)
+        self._record("departments", dep_id)
 
     # Permissions are currently hard coded, this method is part of a plan to have them be assignable and editable
     def create_permission(self,name,active = False):
         perm = Permission(name,active)
         self.permissions[perm.name] = perm
+        self._watch("permissions", perm)
+        self._record("permissions", perm.name)
         return perm
     
     # This method checks the existence of each class before calling utility functions on each
+    # Only tables with unsaved changes are rewritten, so saving after a single edit doesn't rewrite the whole company
+    # If a journal is attached it is rotated first, and the rotated file removed once the CSVs hold everything in it
     def save_to_storage(self):
-        if self.employees:
-            # First employees are prepared for storage
-            emp_df = create_dataframe(self.employees.values())
-            # Then stored in a csv
-            write_csv("employees", emp_df)
-            # This is repeated for departments, permissions and users
-        if self.departments:
-            dep_df = create_dataframe(self.departments.values())
-            write_csv("departments", dep_df)
-        if self.permissions:
-            perm_df = create_dataframe(self.permissions.values())
-            write_csv("permissions", perm_df)
-        if self.users:
-            perm_df = create_dataframe(self.users.values())
-            write_csv("users", perm_df)
+        self.wait_until_loaded()
+        self._wait_for_compaction()
+        rotated = self.journal.rotate() if self.journal else None
+        captured = self._capture_unsaved()
+        self._finish_compaction(captured, rotated, complete=not self.unsaved_tables())
+        # The csvs just written match memory exactly, so their snapshots are refreshed now rather than on the next load
+        # Tables still unsaved weren't written (e.g. a merge that would have left the csv empty), and a table without a fingerprint also holds
+        # rows other instances wrote, so neither matches memory and their snapshots are left to be rebuilt on the next load
+        if self.use_cache and self.backend is None:
+            unsaved = self.unsaved_tables()
+            written = [table for table in captured if table not in unsaved and self._fingerprints.get(table) is not None]
+            self._for_each_table(lambda table: snapshot_cache.save_table(table, self._fingerprints[table], list(getattr(self, table).values())), written)
+
+    # Prepares every table with unsaved changes for storage, and marks them as saved
+    # Backends that support row writes only get the changed rows and the keys of deleted records
+    # The csvs get the same, along with the versions of deleted records, and merge them into the file (see _write_captured_table)
+    # Otherwise the whole table is built into a dataframe. Empty tables can't be (create_dataframe refuses them), so they stay unsaved
+    def _capture_unsaved(self) -> dict:
+        captured = {}
+        row_writes = self.backend is None or getattr(self.backend, "supports_rows", False)
+        for table in self.unsaved_tables():
+            records = getattr(self, table)
+            if row_writes and table in self._synced:
+                dirty = self._dirty[table]
+                rows = [records[key].to_row() for key in dirty if key in records]
+                deleted = [key for key in dirty if key not in records]
+                if self._in_csv(table):
+                    captured[table] = ("merge", rows, [(key, self._deleted_versions[table].get(key, 0)) for key in deleted])
+                else:
+                    captured[table] = ("rows", rows, deleted)
+            elif records:
+                captured[table] = ("table", self._table_frame(records.values()))
+            else:
+                continue
+            self._dirty[table].clear()
+            self._synced.add(table)
+        return captured
+
+    # Stores captured tables, all at once. If writing fails the tables are marked unsaved again so nothing is lost
+    # Returns the conflicts found while merging, per table (see _merge_into_csv)
+    def _write_captured(self, captured) -> dict:
+        try:
+            results = self._for_each_table(self._write_captured_table, captured.items())
+        except Exception:
+            for unsaved, data in captured.items():
+                if data[0] == "merge":
+                    self._dirty[unsaved].update(row[self._key_column(unsaved)] for row in data[1])
+                    self._dirty[unsaved].update(key for key, _ in data[2])
+                else:
+                    self._synced.discard(unsaved)
+            raise
+        return {table: conflicts for table, conflicts in zip(captured, results) if conflicts}
+
+    def _write_captured_table(self, item):
+        table, data = item
+        try:
+            if data[0] == "rows":
+                self.backend.write_rows(table, data[1], data[2])
+            elif data[0] == "merge":
+                return self._merge_into_csv(table, data[1], data[2])
+            elif self._in_csv(table):
+                with storage_module.table_lock(table):
+                    self._write_table(table, data[1])
+                    self._fingerprints[table] = self._fingerprint(table)
+            else:
+                self._write_table(table, data[1])
+            return {}
+        finally:
+            self._writes[table] += 1
+
+    @staticmethod
+    def _key_column(table) -> str:
+        return "name" if table == "permissions" else "id"
+
+    # Another instance may have saved since this one loaded, so changed rows are merged into what is in the csv now, rather than overwriting it
+    # The lock is only held to read, merge and write the one file, so other instances are held up as little as possible
+    # Rows changed by both are left as they are in the csv and returned as conflicts. They stay unsaved here until resolve_conflicts
+    def _merge_into_csv(self, table, rows, deleted) -> dict:
+        key = self._key_column(table)
+        with storage_module.table_lock(table):
+            # If the file is as this instance last left it, nobody else has written to it
+            ours = fingerprint_matches(table, self._fingerprints.get(table))
+            try:
+                existing = list(read_csv_rows(table))
+            except FileNotFoundError:
+                existing = []
+            merged, conflicts = storage_module.merge_rows(existing, key, rows, deleted)
+            # Like whole-table saves, an empty table can't be written, so its deletions stay unsaved
+            if not merged:
+                self._dirty[table].update(deleted_key for deleted_key, _ in deleted)
+                return self._keep_conflicts(table, conflicts)
+            write_csv(table, merged)
+            # Rows other instances wrote aren't in memory yet, so the old fingerprint is dropped for a reload or merge to pick them up
+            self._fingerprints[table] = self._fingerprint(table) if ours else None
+        records = getattr(self, table)
+        for row in rows:
+            record = records.get(row[key])
+            if "version" in row and row[key] not in conflicts and record is not None and record.version == row["version"]:
+                record._version = row["version"] + 1
+        for deleted_key, _ in deleted:
+            if deleted_key not in conflicts:
+                self._deleted_versions[table].pop(deleted_key, None)
+        return self._keep_conflicts(table, conflicts)
+
+    # Conflicting records are marked unsaved again, and kept for resolve_conflicts
+    def _keep_conflicts(self, table, conflicts) -> dict:
+        self._dirty[table].update(conflicts)
+        if conflicts:
+            self._conflicts.setdefault(table, {}).update(conflicts)
+        return conflicts
+
+    # Settles the conflicts from the last save. Either the records here are kept, to be written over the other instance's on the next save,
+    # or the rows from storage replace them and the changes made here are dropped
+    def resolve_conflicts(self, keep_mine: bool):
+        for table, conflicts in self._conflicts.items():
+            records = getattr(self, table)
+            builder = {"employees": Employee, "departments": Department, "permissions": Permission, "users": User}[table]
+            for key, stored in conflicts.items():
+                version = read_version(stored) if stored is not None else 0
+                if keep_mine:
+                    # Basing the record on the stored version means the next save writes over it
+                    if key in records:
+                        records[key]._version = version
+                    else:
+                        self._deleted_versions[table][key] = version
+                    continue
+                old = records.pop(key, None)
+                if old is not None:
+                    old._observer = None
+                if stored is not None:
+                    record = builder.from_row(stored)
+                    records[key] = record
+                    self._watch(table, record)
+                self._reindex(table, key)
+                self._deleted_versions[table].pop(key, None)
+                self._dirty[table].discard(key)
+        self._conflicts = {}
+
+    # The tables are separate files, so they are read and written on a thread pool rather than one after another
+    # pandas releases the GIL while parsing and writing csvs, so this gives a real speedup
+    # Backends are only used this way if they say they are safe to use from several threads at once
+    # Results come back in the order given, and if anything fails the first error (in that order) is raised once all are done
+    def _for_each_table(self, func, items):
+        items = list(items)
+        if len(items) < 2 or not (self.backend is None or getattr(self.backend, "supports_parallel", False)):
+            return [func(item) for item in items]
+        with ThreadPoolExecutor(max_workers=len(items)) as pool:
+            futures = [pool.submit(func, item) for item in items]
+        return [future.result() for future in futures]
+
+    # Journal support - every change is appended to the journal as it happens, so nothing is lost if the app closes without saving
+    def attach_journal(self, journal):
+        self.journal = journal
+        self.add_listener(self._journal_change)
+
+    def _journal_change(self, table, key):
+        record = getattr(self, table).get(key)
+        self.journal.append(table, key, record.to_row() if record is not None else None)
+        if self.journal.needs_compaction():
+            self.compact_journal()
+
+    # Folds the journal into new CSVs, without holding up the change that triggered it
+    def compact_journal(self):
+        if self.is_saving():
+            return
+        self.save_in_background()
+
+    # Saves like save_to_storage, but only the rows are captured here, on the calling thread, so they are consistent
+    # The slow part, writing the files, is done on a background thread, which is returned
+    # on_done is called from that thread once it finishes, with None or the exception that stopped the save
+    # Snapshot caches aren't refreshed, as the objects may have changed again by the time the files are written
+    def save_in_background(self, on_done=None) -> threading.Thread:
+        self.wait_until_loaded()
+        self._wait_for_compaction()
+        rotated = self.journal.rotate() if self.journal else None
+        captured = self._capture_unsaved()
+        self._compaction = threading.Thread(target=self._finish_compaction, args=(captured, rotated, not self.unsaved_tables(), on_done), daemon=True)
+        self._compaction.start()
+        return self._compaction
+
+    # True while a background save or journal compaction is still writing
+    def is_saving(self) -> bool:
+        return self._compaction is not None and self._compaction.is_alive()
+
+    def wait_for_save(self):
+        self._wait_for_compaction()
+
+    # The rotated journal is only removed if every change in it made it into the csvs (empty tables can't be written, and conflicts aren't)
+    def _finish_compaction(self, captured, rotated, complete, on_done=None):
+        try:
+            conflicts = self._write_captured(captured)
+            if rotated and complete and not conflicts:
+                self.journal.discard(rotated)
+            if conflicts:
+                raise SaveConflictError(conflicts)
+        except Exception as e:
+            if on_done is None:
+                raise
+            on_done(e)
+            return
+        if on_done is not None:
+            on_done(None)
+
+    def _wait_for_compaction(self):
+        if self._compaction is not None:
+            self._compaction.join()
+            self._compaction = None
+
+    # Applies journal entries on top of what was loaded from the CSVs. Replayed records are unsaved until the next save
+    # Only entries for the given tables are applied
+    def _replay_journal(self, journal, tables=TABLES):
+        row_builders = {"employees": Employee.from_row, "departments": Department.from_row, "permissions": Permission.from_row, "users": User.from_row}
+        for table, key, row in journal.entries():
+            if table not in tables:
+                continue
+            records = getattr(self, table)
+            if row is None:
+                records.pop(key, None)
+            else:
+                records[key] = row_builders[table](row)
+                self._watch(table, records[key])
+            self._dirty[table].add(key)
+            self._reindex(table, key)
+
+    # Without pandas, csvs are read and written with the csv module (see storage.USE_PANDAS)
+    def _csv_without_pandas(self) -> bool:
+        return self.backend is None and not storage_module.USE_PANDAS
+
+    def _table_frame(self, records):
+        if self._csv_without_pandas():
+            return create_rows(records)
+        return create_dataframe(records)
+
+    # Builds a table's objects from storage. When streaming, each chunk is built then dropped before the next is read
+    # The csv module already streams, so without pandas each row is built as it is read
+    def _build_records(self, table, builder):
+        if self._csv_without_pandas():
+            return [builder.from_row(row) for row in read_csv_rows(table)]
+        if self.backend is not None or not self.chunk_size:
+            return builder.from_frame(self._read_table(table))
+        records = []
+        for chunk in read_csv_chunks(table, self.chunk_size):
+            records.extend(builder.from_frame(chunk))
+        return records
+
+    # Tables kept in the csvs: every table without a backend, and any a backend leaves there (see StorageBackend.csv_tables)
+    def _in_csv(self, table) -> bool:
+        return self.backend is None or table in getattr(self.backend, "csv_tables", ())
+
+    def _is_lazy(self, table) -> bool:
+        return self.backend is not None and table in getattr(self.backend, "lazy_tables", ())
+
+    # The csv functions are used unless a backend has been set
+    def _read_table(self, table):
+        if self.backend is None:
+            return read_csv(table)
+        return self.backend.read_table(table)
+
+    def _write_table(self, table, df):
+        if self.backend is None:
+            write_csv(table, df)
+        else:
+            self.backend.write_table(table, df)
+
+    # Marks every table as matching storage and starts tracking changes to every record, used after loading
+    # Can be limited to some tables, as when only some are reloaded
+    def _mark_synced(self, tables=TABLES):
+        for table in tables:
+            # Lazy tables watch each record as it is read (see _load_records). They may have been read by another tracker, so are bound to this one
+            if self._is_lazy(table):
+                getattr(self, table).bind(self._lazy_builder(table), self._observers[table], partial(self._watch, table))
+            else:
+                for obj in getattr(self, table).values():
+                    self._watch(table, obj)
+            self._dirty[table].clear()
+            # The table may have been replaced, so its indexes and columns are built again when next needed
+            self._indexes.pop(table, None)
+            self._columns.pop(table, None)
+        self._synced.update(tables)
 
     # This method creates a new temporary tracker with information from saved csvs, then overwrites the active tracker with those details 
-    def reload_from_storage(self):
-        loaded = Tracker.load_from_storage()
-        self.employees = loaded.employees
-        self.departments = loaded.departments
-        self.permissions = loaded.permissions
-        self.users = loaded.users
+    # With a journal attached, the journal is replayed on top, so changes that haven't been saved to the csvs are kept
+    # Only tables that have changed on disk, or have unsaved changes to throw away, are reloaded. Returns the tables that were
+    def reload_from_storage(self) -> list:
+        self.wait_until_loaded()
+        self._wait_for_compaction()
+        changed = [table for table in TABLES if self._needs_reload(table)]
+        if not changed:
+            return []
+        loaded = self.read_tables(changed)
+        if self.journal:
+            self.journal.close()
+            loaded._replay_journal(self.journal, changed)
+        for table in changed:
+            setattr(self, table, getattr(loaded, table))
+            self._fingerprints[table] = loaded._fingerprints.get(table)
+        self._mark_synced(changed)
+        for table in changed:
+            self._dirty[table] = loaded._dirty[table]
+        return changed
+
+    # Merging changes made by other instances sharing the data folder (see gui/file_watcher.py)
+    # Finding and reading changed tables is split from merging them, so the reading can be done on another thread
+
+    # Loaded tables whose csv no longer matches what was last loaded or saved here. Always empty for other backends
+    def tables_changed_on_disk(self) -> list:
+        if self.backend is not None:
+            return []
+        return [table for table in TABLES if table in self._synced and not fingerprint_matches(table, self._fingerprints.get(table))]
+
+    # Reads tables into a new tracker without touching this one, ready for merge_tables
+    def read_tables(self, tables) -> "Tracker":
+        loaded = Tracker(backend=self.backend)
+        loaded.use_cache = self.use_cache
+        loaded.chunk_size = self.chunk_size
+        loaded._read_at_writes = dict(self._writes)
+        loaded._load_tables(tuple(tables))
+        return loaded
+
+    # Brings rows read from storage into the live tables. Rows with unsaved changes here are left alone, so local edits win
+    # Merged rows aren't changes made here, so they aren't journaled or marked unsaved
+    # A table this tracker has written since the read started is skipped, as the read may be older than what was saved
+    # (the file watcher reads on another thread). Its fingerprint is left as it was, so the next check reads it again
+    # Returns {table: {"added": [...], "updated": [...], "removed": [...]}} with the keys of the rows that changed
+    def merge_tables(self, loaded, tables) -> dict:
+        changes = {}
+        for table in tables:
+            if loaded._read_at_writes is not None and loaded._read_at_writes[table] != self._writes[table]:
+                continue
+            current = getattr(self, table)
+            incoming = getattr(loaded, table)
+            dirty = self._dirty[table]
+            added, updated, removed = [], [], []
+            for key, record in incoming.items():
+                if key in dirty:
+                    continue
+                old = current.get(key)
+                if old is None:
+                    added.append(key)
+                elif old.to_row() != record.to_row():
+                    updated.append(key)
+                    old._observer = None
+                else:
+                    continue
+                current[key] = record
+                self._watch(table, record)
+                self._reindex(table, key)
+            for key in [key for key in current if key not in incoming and key not in dirty]:
+                current.pop(key)._observer = None
+                self._reindex(table, key)
+                removed.append(key)
+            self._fingerprints[table] = loaded._fingerprints.get(table)
+            if added or updated or removed:
+                changes[table] = {"added": added, "updated": updated, "removed": removed}
+        return changes
+
+    def merge_from_storage(self) -> dict:
+        tables = self.tables_changed_on_disk()
+        if not tables:
+            return {}
+        return self.merge_tables(self.read_tables(tables), tables)
+
+    # Tables in other backends have no fingerprints, so they are always reloaded
+    def _needs_reload(self, table) -> bool:
+        if self.backend is not None or self._dirty[table] or table not in self._synced:
+            return True
+        return not fingerprint_matches(table, self._fingerprints.get(table))
+
+    # The fingerprint of a table's csv, or None if there isn't one to take
+    def _fingerprint(self, table):
+        if not self._in_csv(table):
+            return None
+        try:
+            return storage_fingerprint(table)
+        except FileNotFoundError:
+            return None
 
     # To be used on initial startup, this class method can be called before a tracker exists in order to use presaved data
     ### AI DECLARATION - Usage of class methods was as a result of suggestions from an LLM 
+    # If a journal is passed, any changes recorded in it since the last save are replayed on top and the journal is attached
+    # With cache on, tables whose csv hasn't changed since the last load come straight from the binary snapshot cache
+    # With staged on, only users is loaded before returning, so login can start straight away whatever the size of the data
+    # The other tables carry on loading in the background; call wait_until_loaded before using them
+    # With chunk_size set, csvs are streamed in chunks of that many rows, which keeps peak memory down for very large files
     @classmethod
-    def load_from_storage(cls):
-        tracker = cls()
+    def load_from_storage(cls, journal=None, backend=None, cache=False, staged=False, chunk_size=None):
+        tracker = cls(backend=backend)
+        tracker.use_cache = cache
+        tracker.chunk_size = chunk_size
+
+        if not staged:
+            tracker._load_tables(TABLES)
+            tracker._finish_loading(journal)
+            return tracker
+
+        # Missing csvs are found now rather than in the background, so load_or_create_sample can still make sample data
+        if backend is None:
+            for table in TABLES:
+                if not table_path(table).exists():
+                    raise FileNotFoundError(f"no {table} file found, please check data folder")
+        tracker._load_tables(("users",))
+        # Journaled changes to users are replayed now, so login checks passwords as they were last changed, not as they were last saved
+        tracker._finish_loading(journal, ("users",), attach=False)
+        tracker._loading = threading.Thread(target=tracker._load_in_background, args=(journal,), daemon=True)
+        tracker._loading.start()
+        return tracker
 
-        # Each class is loaded, then each employee record is built into an Employee, before storing in tracker
+    # Each table is loaded, then the whole table is validated and built into objects in one go, before storing in tracker
+    # The tables are loaded at the same time
+    def _load_tables(self, tables):
         try:
-            emp_df = read_csv("employees")
-            for row in emp_df.to_dict(orient="records"):
-                emp = Employee.from_row(row)
-                tracker.employees[emp.id] = emp
-        except FileNotFoundError:
+            loaded = self._for_each_table(self._load_records, tables)
+        except FileNotFoundError as e:
             # Error handling for when csv does not exist
-            raise FileNotFoundError("no employees file found, please check data folder")
-        
-        try:
-            dep_df = read_csv("departments")
-            for row in dep_df.to_dict(orient="records"):
-                dep=Department.from_row(row)
-                tracker.departments[dep.id] = dep
-        except FileNotFoundError:
-            raise FileNotFoundError("no departments file found, please check data folder")
+            raise FileNotFoundError(f"no {e.args[0]} file found, please check data folder")
+        for table, records in zip(tables, loaded):
+            if self._is_lazy(table):
+                setattr(self, table, records)
+                continue
+            key = "name" if table == "permissions" else "id"
+            getattr(self, table).update((getattr(record, key), record) for record in records)
+
+    # Once tables are in, changes to them start being tracked and any journal is replayed on top
+    # The journal is attached once every table is in, so changes start being journaled then
+    def _finish_loading(self, journal, tables=TABLES, attach=True):
+        self._mark_synced(tables)
+        if journal is not None:
+            self._replay_journal(journal, tables)
+            if attach:
+                self.attach_journal(journal)
 
+    def _load_in_background(self, journal):
         try:
-            usr_df = read_csv("users")
-            for row in usr_df.to_dict(orient="records"):
-                usr=User.from_row(row)
-                tracker.users[usr.id] = usr
-        except FileNotFoundError:
-            raise FileNotFoundError("no users file found, please check data folder")
+            tables = tuple(table for table in TABLES if table != "users")
+            self._load_tables(tables)
+            self._finish_loading(journal, tables)
+        except Exception as e:
+            self._load_error = e
 
+    # Blocks until a staged load has finished, raising whatever made it fail. Returns straight away otherwise
+    def wait_until_loaded(self):
+        if self._loading is not None:
+            self._loading.join()
+            self._loading = None
+        if self._load_error is not None:
+            raise self._load_error
 
+    def is_loaded(self) -> bool:
+        return self._loading is None or not self._loading.is_alive()
+
+    # Lazy employees are built as they are read, so they are pointed at users then
+    def _lazy_builder(self, table):
+        if table != "employees":
+            return {"departments": Department, "permissions": Permission, "users": User}[table].from_row
+        return self._build_employee
+
+    def _build_employee(self, row):
+        emp = Employee.from_row(row)
+        emp._users = self._user_for
+        return emp
+
+    # Reads one table from storage and builds its objects, going through the snapshot cache when it is turned on
+    # Tables the backend can serve lazily aren't read at all, a view of the table is returned instead (see StorageBackend.lazy_table)
+    # A missing table is reported by its name, so _load_tables can say which file is missing
+    # Only reading the table itself can report it missing, so nothing else (e.g. the cache) can make load_or_create_sample write sample data over it
+    def _load_records(self, table):
+        builder = {"employees": Employee, "departments": Department, "permissions": Permission, "users": User}[table]
+        if self._is_lazy(table):
+            try:
+                return self.backend.lazy_table(table, self._lazy_builder(table), self._observers[table])
+            except FileNotFoundError:
+                raise FileNotFoundError(table)
+        use_cache = self.use_cache and self.backend is None
+        if use_cache:
+            cached = snapshot_cache.load_table(table)
+            if cached is not None:
+                self._fingerprints[table], records = cached
+                return records
+        # The fingerprint is taken before reading, so if the file changes mid-read it just looks changed next time
+        fingerprint = self._fingerprint(table)
+        self._fingerprints[table] = fingerprint
         try:
-            perm_df = read_csv("permissions")
-            for row in perm_df.to_dict(orient="records"):
-                perm = Permission.from_row(row)
-                tracker.permissions[perm.name] = perm
+            records = self._build_records(table, builder)
         except FileNotFoundError:
-            raise FileNotFoundError("no permissions file found, please check data folder")
-        return tracker
+            raise FileNotFoundError(table)
+        if use_cache and fingerprint is not None:
+            snapshot_cache.save_table(table, fingerprint, records)
+        return records
     
     # This is a method that was added to be called before the previous one. In order to minimise errors, if any csv doesn't exist, a utility function is called to create and prepopulate it
     @classmethod
-    def load_or_create_sample(cls):
+    def load_or_create_sample(cls, journal=None, backend=None, cache=False, staged=False, chunk_size=None):
         try:
-            return cls.load_from_storage()
+            return cls.load_from_storage(journal=journal, backend=backend, cache=cache, staged=staged, chunk_size=chunk_size)
         except FileNotFoundError:
             # When file not found, generate_sample_data called
             from employee_tracker.utils.generate_sample_data import generate_sample_data
-            return generate_sample_data()
\ No newline at end of file
+            tracker = generate_sample_data()
+            # The sample data is written to the csvs, so it is saved again to any other backend
+            if backend is not None:
+                tracker.use_backend(backend)
+                tracker.save_to_storage()
+            tracker.use_cache = cache
+            tracker.chunk_size = chunk_size
+            if journal is not None:
+                tracker.attach_journal(journal)
+            return tracker
\ No newline at end of file
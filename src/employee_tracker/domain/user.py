@@ -1,10 +1,10 @@
 from employee_tracker.utils.passwords import is_valid_stored_password_hash
 from employee_tracker.utils.ids import check_id
+from employee_tracker.utils.change_tracking import ChangeTracked
 
 # This class is used as part of the login process. In future updates this might be removed.
-# The initial intention was to have this load before any other data, and other data not be loaded before login
-# In practice, all data is loaded simultaneously in order to simplify load process
-class User:
+# The app loads users before any other data (see Tracker.load_from_storage with staged=True), so login can start while the rest loads
+class User(ChangeTracked):
     def __init__(self,id,password_hash):
         if not is_valid_stored_password_hash(password_hash):
             raise ValueError("not a valid password hash")
@@ -27,6 +27,7 @@ class User:
         if not is_valid_stored_password_hash(new_password_hash):
             raise ValueError("not a valid password hash")
         self._password_hash = new_password_hash
+        self._changed()
 
     # method to prepare for storage
     def to_row(self):
@@ -43,4 +44,27 @@ class User:
             id=row["id"],
             password_hash=row["password_hash"],
         )
-    
\ No newline at end of file
+
+    # Builds a User without re-validating, for use by the bulk loader once columns have been checked
+    @classmethod
+    def _from_trusted(cls, id, password_hash) -> "User":
+        usr = cls.__new__(cls)
+        usr._id = id
+        usr._password_hash = password_hash
+        return usr
+
+    # Bulk version of from_row. IDs and hashes are checked a column at a time, failing rows go through from_row to raise the usual errors
+    @classmethod
+    def from_frame(cls, df) -> list:
+        from employee_tracker.utils.column_checkers import check_id_column, check_password_hash_column
+
+        if len(df) == 0:
+            return []
+        valid = check_id_column(df["id"], "emp") & check_password_hash_column(df["password_hash"])
+        users = []
+        for i, (ok, id, password_hash) in enumerate(zip(valid.tolist(), df["id"].tolist(), df["password_hash"].tolist())):
+            if ok:
+                users.append(cls._from_trusted(id, password_hash))
+            else:
+                users.append(cls.from_row(df.iloc[i].to_dict()))
+        return users
@@ -84,13 +84,9 @@ class AddMembersWindow(tk.Toplevel):
         self.emp_listbox.delete(0, tk.END)
         self.emp_ids = []
 
-        # Utilising the list method in tracker
-        for emp in self.tracker.list_employees():
-            # simplified search function (this would eventually be replaced by the more complex search function within list_employees)
-            search_bucket = f"{emp.name} {emp.role}".lower()
-            # skip employees that don't fix the pattern
-            if search and search not in search_bucket:
-                continue
+        # Utilising the list and search methods in tracker. The search matches "name role" ignoring case, and is answered from an index so typing stays quick
+        employees = self.tracker.search_employees(search) if search else self.tracker.list_employees()
+        for emp in employees:
             # don't show employees already in the department
             if emp.id in current_members:
                 continue
@@ -0,0 +1,84 @@
+import queue
+import time
+
+from employee_tracker.domain.tracker import SaveConflictError
+
+# Saves the tracker in the background a short while after changes stop, so work is kept without anyone pressing Save
+# Each change restarts the countdown (debouncing), but a save is never put off for longer than max_delay after the first unsaved change
+# Rows are captured on the Tk thread when the countdown ends, then written on a background thread (see Tracker.save_in_background)
+# Tk can only be used from its own thread, so results come back through a queue that the Tk thread checks with after()
+class Autosave:
+    def __init__(self, root, tracker, delay: float = 5.0, max_delay: float = 30.0, on_status=None):
+        self.root = root
+        self.tracker = tracker
+        self.delay = delay
+        self.max_delay = max_delay
+        # Called on the Tk thread with a short message whenever a save starts, finishes or fails
+        self.on_status = on_status
+        self._pending = None
+        # Set at the first unsaved change and not moved by later ones, so constant editing still gets saved
+        self._deadline = None
+        self._results = queue.Queue()
+        self._stopped = False
+        tracker.add_listener(self._changed)
+
+    # Tracker listener, called after every change
+    def _changed(self, table, key):
+        if self._deadline is None:
+            self._deadline = self.root.after(int(self.max_delay * 1000), self.save_now)
+        self._schedule(self.delay)
+
+    def _schedule(self, wait: float):
+        if self._pending is not None:
+            self.root.after_cancel(self._pending)
+        self._pending = self.root.after(int(wait * 1000), self.save_now)
+
+    # Starts a background save straight away. If one is still writing, this one waits until it is done
+    def save_now(self):
+        for timer in (self._pending, self._deadline):
+            if timer is not None:
+                self.root.after_cancel(timer)
+        self._pending = None
+        self._deadline = None
+        if self._stopped:
+            return
+        if self.tracker.is_saving():
+            self._schedule(self.delay)
+            return
+        if not self.tracker.has_unsaved_changes():
+            return
+        self._status("Saving...")
+        try:
+            self.tracker.save_in_background(on_done=self._results.put)
+        except Exception as err:
+            self._status(f"Autosave failed: {err}")
+            return
+        self._poll()
+
+    # Checks for the result of the save on the Tk thread, without blocking the mainloop
+    def _poll(self):
+        try:
+            err = self._results.get_nowait()
+        except queue.Empty:
+            self.root.after(100, self._poll)
+            return
+        if err is None:
+            self._status(f"Saved at {time.strftime('%H:%M:%S')}")
+        elif isinstance(err, SaveConflictError):
+            # Trying again would clash again, so this waits for the user to choose whose changes to keep
+            self._status(f"Autosave: {err}. Press Save to choose which to keep")
+        else:
+            self._status(f"Autosave failed: {err}")
+            # The tables that failed are unsaved again, so try again later
+            self._schedule(self.delay)
+
+    def _status(self, message: str):
+        if self.on_status is not None:
+            self.on_status(message)
+
+    # Stops autosaving, waiting for any save that is still writing. Used when the app closes, when the root may already be gone
+    # Unsaved changes are still in the journal, so nothing is lost by not saving here
+    def stop(self):
+        self._stopped = True
+        self.tracker.remove_listener(self._changed)
+        self.tracker.wait_for_save()
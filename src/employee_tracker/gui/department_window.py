@@ -6,6 +6,8 @@ from employee_tracker.domain.tracker import Tracker
 from employee_tracker.utils.ids import check_id
 from employee_tracker.gui.add_members_window import AddMembersWindow
 from employee_tracker.gui.style import centre_window
+from employee_tracker.gui.file_watcher import apply_row_changes
+from employee_tracker.gui.paging import PAGE_SIZE, show_more_rows
 
 ### AI DECLARATION - ChatGPT was used in the creation of GUI elements, given the creator's lack of experience in front-end
 
@@ -34,6 +36,9 @@ def parse_department_form(name: str, description: str, head_of_department: str,
 
 # ttk window creation passing in tracker, user and permissions
 class DepartmentWindow(tk.Toplevel):
+    # The tracker tables this window shows (members are listed by employee name), so it is only refreshed when one of them is reloaded
+    tables = ("departments", "employees")
+
     def __init__(self,parent:tk.Tk,tracker, permissions, logged_in_user):
         super().__init__(parent)
         self.tracker = tracker
@@ -72,6 +77,9 @@ class DepartmentWindow(tk.Toplevel):
         self.listbox = tk.Listbox(left, width=35, height=14, exportselection=False)
         self.listbox.grid(row=0, column=0, sticky="nsew")
         self.listbox.bind("<<ListboxSelect>>", self.on_select)
+        # Only a page of departments is shown to begin with, more are added on the end by this button
+        self.more_button = ttk.Button(left, text="Show more", command=self.show_more)
+        self.more_button.grid(row=1, column=0, sticky="ew", pady=(8, 0))
 
         # Centre: form
         centre = ttk.LabelFrame(content, text="Details", padding=10)
@@ -197,12 +205,24 @@ class DepartmentWindow(tk.Toplevel):
         self.set_mode_create()
 
     # When the list changes (new addition or edit/delete), the list is refreshed to stay current
+    # The first page is found from a lazy result, so a large company isn't all found and drawn at once
+    # As many rows as were shown before are shown again, so a selected row further down the list stays in it
     def refresh_list(self):
+        shown = max(len(self.department_ids), PAGE_SIZE)
         self.listbox.delete(0, tk.END)
         self.department_ids = []
-        for dep in self.tracker.list_departments():
-            self.department_ids.append(dep.id)
-            self.listbox.insert(tk.END, f"{dep.id} {dep.name} ({dep.description})")
+        self.results = self.tracker.list_departments()
+        self.has_more = show_more_rows(self.listbox, self.department_ids, self.results, self._list_label, shown)
+        self.more_button.state(["!disabled"] if self.has_more else ["disabled"])
+
+    # The next page, carrying on from the rows already shown
+    def show_more(self):
+        self.has_more = show_more_rows(self.listbox, self.department_ids, self.results, self._list_label, PAGE_SIZE)
+        self.more_button.state(["!disabled"] if self.has_more else ["disabled"])
+
+    @staticmethod
+    def _list_label(dep):
+        return f"{dep.id} {dep.name} ({dep.description})"
 
     # Similar to the above, but for the list of employees in a department
     def refresh_members(self, dep):
@@ -405,6 +425,24 @@ class DepartmentWindow(tk.Toplevel):
         self.refresh_list()
         self.deselect_department()
 
+    # Row level changes merged in from another instance (see gui/file_watcher.py). Only the changed rows are redrawn
+    # The selected department stays selected, unless it was deleted, and its members are redrawn if they might have changed
+    def rows_changed(self, changes):
+        change = changes.get("departments")
+        selected = self.selected_department_id
+        if change is not None:
+            # New departments go on the end of the list, so while there are more to show they are left for show_more to find
+            if self.has_more:
+                change = {**change, "added": []}
+            apply_row_changes(self.listbox, self.department_ids, change, self.tracker.departments, self._list_label)
+            if selected in change["removed"]:
+                self.deselect_department()
+                return
+            if selected in self.department_ids:
+                self.listbox.selection_set(self.department_ids.index(selected))
+        if selected is not None and ("employees" in changes or (change is not None and selected in change["updated"])):
+            self._refresh_selected_department_members()
+
 # For use when window is opened independently
 if __name__ == "__main__":
     tracker = Tracker()
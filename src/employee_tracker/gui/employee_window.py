@@ -5,6 +5,8 @@ from tkinter import messagebox, ttk
 from employee_tracker.domain.tracker import Tracker
 from employee_tracker.gui.new_password import PasswordDialog
 from employee_tracker.gui.style import centre_window
+from employee_tracker.gui.file_watcher import apply_row_changes
+from employee_tracker.gui.paging import PAGE_SIZE, show_more_rows
 
 ### AI DECLARATION - ChatGPT was used in the creation of GUI elements, given the creator's lack of experience in front-end
 
@@ -35,6 +37,9 @@ def parse_employee_form(name: str, role: str, start_date_str: str, salary_str: s
 
 # Employee window creation with a ttk style
 class EmployeeWindow(tk.Toplevel):
+    # The tracker tables this window shows, so it is only refreshed when one of them is reloaded
+    tables = ("employees",)
+
     def __init__(self,parent:tk.Tk,tracker,permissions=None, logged_in_user = None):
         super().__init__(parent)
         self.tracker = tracker
@@ -67,6 +72,9 @@ class EmployeeWindow(tk.Toplevel):
         self.listbox = tk.Listbox(left, width=35, height=14, exportselection=False)
         self.listbox.grid(row=0, column=0, sticky="nsew")
         self.listbox.bind("<<ListboxSelect>>", self.on_select)
+        # Only a page of employees is shown to begin with, more are added on the end by this button
+        self.more_button = ttk.Button(left, text="Show more", command=self.show_more)
+        self.more_button.grid(row=1, column=0, sticky="ew", pady=(8, 0))
 
         # Right: form
         right = ttk.LabelFrame(content, text="Details", padding=10)
@@ -245,12 +253,24 @@ class EmployeeWindow(tk.Toplevel):
         self.set_mode_create()
 
     # Refresh method for when changes are made
+    # The first page is found from a lazy result, so a large company isn't all found and drawn at once
+    # As many rows as were shown before are shown again, so a selected row further down the list stays in it
     def refresh_list(self):
+        shown = max(len(self.employee_ids), PAGE_SIZE)
         self.listbox.delete(0, tk.END)
         self.employee_ids = []
-        for emp in self.tracker.list_employees():
-            self.employee_ids.append(emp.id)
-            self.listbox.insert(tk.END, f"{emp.id} {emp.name} ({emp.role})")
+        self.results = self.tracker.list_employees()
+        self.has_more = show_more_rows(self.listbox, self.employee_ids, self.results, self._list_label, shown)
+        self.more_button.state(["!disabled"] if self.has_more else ["disabled"])
+
+    # The next page, carrying on from the rows already shown
+    def show_more(self):
+        self.has_more = show_more_rows(self.listbox, self.employee_ids, self.results, self._list_label, PAGE_SIZE)
+        self.more_button.state(["!disabled"] if self.has_more else ["disabled"])
+
+    @staticmethod
+    def _list_label(emp):
+        return f"{emp.id} {emp.name} ({emp.role})"
 
     # A method to open the update password method, checks that either it_admin permission is present, or that the user is editing themself
     def update_password(self):
@@ -274,8 +294,8 @@ class EmployeeWindow(tk.Toplevel):
         if password is None:
             return
         
-        # uses employee method to update hash 
-        self.tracker.employees[emp_id].password_hash = password
+        # hashes the password and stores it on the employee's user, which login checks against
+        self.tracker.update_employee_password(emp_id, password)
         messagebox.showinfo("Updated","Password updated")
 
     # Creating new employee, checks that permissions exist
@@ -408,6 +428,22 @@ class EmployeeWindow(tk.Toplevel):
         self.refresh_list()
         self.deselect_employee()
 
+    # Row level changes merged in from another instance (see gui/file_watcher.py). Only the changed rows are redrawn
+    # The selected employee stays selected, unless it was deleted
+    def rows_changed(self, changes):
+        change = changes.get("employees")
+        if change is None:
+            return
+        selected = self.selected_employee_id
+        # New employees go on the end of the list, so while there are more to show they are left for show_more to find
+        if self.has_more:
+            change = {**change, "added": []}
+        apply_row_changes(self.listbox, self.employee_ids, change, self.tracker.employees, self._list_label)
+        if selected in change["removed"]:
+            self.deselect_employee()
+        elif selected in self.employee_ids:
+            self.listbox.selection_set(self.employee_ids.index(selected))
+
 # for use when loaded independently
 if __name__ == "__main__":
     tracker = Tracker()
@@ -0,0 +1,69 @@
+import queue
+import threading
+
+# Watches the csvs for changes made by other instances of the app sharing the same data folder, and merges them in
+# The standard library has no portable way to be told about file changes, so the files are checked every interval seconds
+# Each check is a stat of the four csvs (see Tracker.tables_changed_on_disk), so it is cheap enough to run on the Tk thread
+# Changed tables are read on a background thread, then merged on the Tk thread, where the tracker is used
+class FileWatcher:
+    def __init__(self, root, tracker, interval: float = 2.0, on_change=None):
+        self.root = root
+        self.tracker = tracker
+        self.interval = interval
+        # Called on the Tk thread with the changes returned by Tracker.merge_tables, whenever rows change
+        self.on_change = on_change
+        self._results = queue.Queue()
+        self._reading = False
+        self._stopped = False
+        self.root.after(int(interval * 1000), self._check)
+
+    def _check(self):
+        if self._stopped:
+            return
+        self._merge_finished_read()
+        # The tracker's own saves change the files too, so nothing is checked while one is being written
+        if not self._reading and self.tracker.is_loaded() and not self.tracker.is_saving():
+            tables = self.tracker.tables_changed_on_disk()
+            if tables:
+                self._reading = True
+                threading.Thread(target=self._read, args=(tables,), daemon=True).start()
+        self.root.after(int(self.interval * 1000), self._check)
+
+    def _read(self, tables):
+        try:
+            self._results.put((tables, self.tracker.read_tables(tables)))
+        except Exception as err:
+            self._results.put((tables, err))
+
+    # A table that couldn't be read is left as it is. Its fingerprint hasn't changed, so it is tried again next check
+    def _merge_finished_read(self):
+        try:
+            tables, loaded = self._results.get_nowait()
+        except queue.Empty:
+            return
+        self._reading = False
+        if isinstance(loaded, Exception):
+            return
+        changes = self.tracker.merge_tables(loaded, tables)
+        if changes and self.on_change is not None:
+            self.on_change(changes)
+
+    def stop(self):
+        self._stopped = True
+
+# Updates a listbox showing one row per record in place, for one table's changes from Tracker.merge_tables
+# ids holds the key of each row in the listbox, in order, and label gives the text for a record
+def apply_row_changes(listbox, ids: list, change: dict, records: dict, label):
+    for key in change["removed"]:
+        if key in ids:
+            index = ids.index(key)
+            listbox.delete(index)
+            ids.pop(index)
+    for key in change["updated"]:
+        if key in ids:
+            index = ids.index(key)
+            listbox.delete(index)
+            listbox.insert(index, label(records[key]))
+    for key in change["added"]:
+        ids.append(key)
+        listbox.insert("end", label(records[key]))
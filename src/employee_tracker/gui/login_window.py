@@ -2,7 +2,7 @@ import tkinter as tk
 from tkinter import messagebox, ttk
 
 
-from employee_tracker.auth.login import login
+from employee_tracker.auth.login import finish_login, login_async
 from employee_tracker.gui.style import centre_window
 
 # GUI to utilise login functionality
@@ -13,6 +13,8 @@ class LoginWindow(tk.Toplevel):
         self.title("Login")
         self.tracker = tracker
         self.on_success = on_success
+        # The login being checked in the background, if there is one
+        self._pending = None
 
         self.resizable(False,False)
 
@@ -44,9 +46,15 @@ class LoginWindow(tk.Toplevel):
         btns.columnconfigure(0, weight=1)
         btns.columnconfigure(1, weight=1)
 
-        ttk.Button(btns, text="Login", style="Primary.TButton", command=self.do_login).grid(row=0, column=0, sticky="ew")
+        self.login_button = ttk.Button(btns, text="Login", style="Primary.TButton", command=self.do_login)
+        self.login_button.grid(row=0, column=0, sticky="ew")
         ttk.Button(btns, text="Quit", command=self.quit_app).grid(row=0, column=1, sticky="ew", padx=(10, 0))
 
+        # Shown while a password is being checked
+        self.busy_bar = ttk.Progressbar(container, mode="indeterminate")
+        self.busy_bar.grid(row=3, column=0, sticky="ew", pady=(10, 0))
+        self.busy_bar.grid_remove()
+
         # Loads above parent as a dependent, grabs focus. If the user closes the login window then the full app closes
         ### AI Declaration - this was added as a suggestion from an LLM
         self.transient(parent)
@@ -57,15 +65,29 @@ class LoginWindow(tk.Toplevel):
         self.bind("<Return>", lambda e: self.do_login())
         self.bind("<Escape>", lambda e: self.quit_app())
 
-        centre_window(self, 360, 240)
+        centre_window(self, 360, 270)
         emp_entry.focus_set()
 
     def do_login(self):
+        # Return presses while a login is being checked are ignored
+        if self._pending is not None:
+            return
         emp_id = self.emp_id_var.get().strip()
         pw = self.password_var.get()
-        # calls login function with inputted information
+        # calls login function with inputted information. The password is checked on a worker thread, so the window doesn't freeze
+        self._set_busy(True)
+        self._pending = login_async(self.tracker, emp_id, pw)
+        self._finish_login(emp_id)
+
+    # Checks for the result with after(), so it is handled on the Tk thread
+    def _finish_login(self, emp_id):
+        if not self._pending.done():
+            self.after(50, self._finish_login, emp_id)
+            return
+        future, self._pending = self._pending, None
+        self._set_busy(False)
         try:
-            permissions = login(self.tracker, emp_id, pw)
+            permissions = finish_login(self.tracker, emp_id, future.result())
         # Errors are either employee doesn't exist, or password is wrong
         except LookupError as e:
             messagebox.showerror("Login failed", str(e), parent=self)
@@ -73,10 +95,26 @@ class LoginWindow(tk.Toplevel):
         except PermissionError as e:
             messagebox.showerror("Login failed", str(e), parent=self)
             return
+        # Anything else is most likely the background load failing (e.g. a damaged csv), which check_login raises when it waits for it
+        except Exception as e:
+            messagebox.showerror("Login failed", f"The data couldn't be loaded: {e}", parent=self)
+            return
         
         self.on_success(permissions,emp_id)
         self.destroy()
 
+    def _set_busy(self, busy: bool):
+        if busy:
+            self.login_button.state(["disabled"])
+            self.busy_bar.grid()
+            self.busy_bar.start(15)
+            self.config(cursor="watch")
+        else:
+            self.login_button.state(["!disabled"])
+            self.busy_bar.stop()
+            self.busy_bar.grid_remove()
+            self.config(cursor="")
+
     # Quit app
     def quit_app(self):
         self.master.destroy()
\ No newline at end of file
@@ -1,17 +1,25 @@
+import argparse
+import time
 import tkinter as tk
 from tkinter import ttk
 from tkinter import messagebox
 
-from employee_tracker.domain.tracker import Tracker
+from employee_tracker.domain.tracker import Tracker, SaveConflictError
+from employee_tracker.storage.journal import Journal
+from employee_tracker.storage import storage
+from employee_tracker.utils import passwords
 from employee_tracker.gui.employee_window import EmployeeWindow
 from employee_tracker.gui.department_window import DepartmentWindow
 from employee_tracker.gui.login_window import LoginWindow
+from employee_tracker.gui.autosave import Autosave
+from employee_tracker.gui.file_watcher import FileWatcher
 from employee_tracker.gui.style import apply_style, centre_window
 
 # Top level window
 ### AI DECLARATION - ChatGPT was used in the creation of GUI elements, given the creator's lack of experience in front-end
+# With watch on, changes saved by other instances sharing the data folder are merged in as they happen
 class MainWindow:
-    def __init__(self,tracker:Tracker):
+    def __init__(self,tracker:Tracker,watch:bool=False):
         self.tracker = tracker
         self.active_emp_id = None
         self.active_permissions = []
@@ -57,6 +65,12 @@ class MainWindow:
         self.btn_load.grid(row=0, column=0, sticky="ew")
         self.btn_save.grid(row=0, column=1, sticky="ew", padx=(10, 0))
 
+        # Changes are saved automatically in the background, the last result is shown here
+        self.save_status_var = tk.StringVar(value="")
+        ttk.Label(storage, textvariable=self.save_status_var).grid(row=1, column=0, columnspan=2, sticky="w", pady=(8, 0))
+        self.autosave = Autosave(self.root, self.tracker, on_status=self.save_status_var.set)
+        self.watcher = FileWatcher(self.root, self.tracker, on_change=self.on_rows_changed) if watch else None
+
         session = ttk.Frame(container)
         session.grid(row=4, column=0, sticky="ew", pady=(18, 0))
         session.columnconfigure(0, weight=1)
@@ -102,38 +116,88 @@ class MainWindow:
         perms = ", ".join(self.active_permissions) if self. active_permissions else "none"
         self.status_var.set(f"signed in as {emp_id} - Permissions: {perms}")
 
+    # The app starts with only users loaded, so windows that need the rest wait for it to finish loading first
+    # Returns False (after showing the error) if loading failed
+    def _wait_for_data(self) -> bool:
+        loading = not self.tracker.is_loaded()
+        if loading:
+            status = self.status_var.get()
+            self.status_var.set("Loading data...")
+            self.root.config(cursor="watch")
+            self.root.update_idletasks()
+        try:
+            self.tracker.wait_until_loaded()
+            return True
+        except Exception as err:
+            messagebox.showerror("Load Error", err)
+            return False
+        finally:
+            if loading:
+                self.root.config(cursor="")
+                self.status_var.set(status)
+
     # opening employees as a child window, ensuring part of the same app
     def open_employees(self):
+        if not self._wait_for_data():
+            return
         win = EmployeeWindow(self.root,self.tracker,self.active_permissions,self.logged_in_user)
         self._track_child(win)
 
     # opening departments as a child window, ensuring part of the same app
     def open_departments(self):
+        if not self._wait_for_data():
+            return
         win = DepartmentWindow(self.root,self.tracker,self.active_permissions,self.logged_in_user)
         self._track_child(win)
 
-    # Calls load function within tracker. Also updates all child windows with new information
+    # Calls load function within tracker. Also updates child windows showing any of the tables that were reloaded
     def load(self):
         try:
-            self.tracker.reload_from_storage()
+            changed = self.tracker.reload_from_storage()
             for w in list(self._child_windows):
-                if hasattr(w, "refresh"):
+                if hasattr(w, "refresh") and set(getattr(w, "tables", changed)) & set(changed):
                     w.refresh()
-            messagebox.showinfo("Loaded", "Data loaded successfully")
+            if changed:
+                messagebox.showinfo("Loaded", f"Data loaded successfully ({', '.join(changed)})")
+            else:
+                messagebox.showinfo("Loaded", "Nothing has changed since the last load or save")
         except Exception as err:
             messagebox.showerror("Load Error", err)
 
+    # Passes changes merged in by the file watcher on to the child windows that show those tables
+    def on_rows_changed(self, changes):
+        for w in list(self._child_windows):
+            if hasattr(w, "rows_changed") and set(getattr(w, "tables", changes)) & set(changes):
+                w.rows_changed(changes)
+        self.save_status_var.set(f"Updated {', '.join(changes)} from another workstation at {time.strftime('%H:%M:%S')}")
+
     # calls save method of tracker
+    # If another workstation saved changes to the same records, the user picks whose to keep. Everything else is saved either way
     def save(self):
         try:
             self.tracker.save_to_storage()
             messagebox.showinfo("Saved", "Data saved successfully")
+        except SaveConflictError as err:
+            self._resolve_conflicts(err)
         except Exception as err:
             messagebox.showerror("Save Error", err)
+
+    def _resolve_conflicts(self, err):
+        keep_mine = messagebox.askyesno("Save Conflict", f"{err}.\n\nKeep your changes and overwrite theirs?\nChoosing No replaces your changes with theirs.")
+        self.tracker.resolve_conflicts(keep_mine)
+        if keep_mine:
+            self.save()
+            return
+        for w in list(self._child_windows):
+            if hasattr(w, "refresh") and set(getattr(w, "tables", err.conflicts)) & set(err.conflicts):
+                w.refresh()
     
-    # tk run
+    # tk run. Once the window closes, any autosave still writing is allowed to finish
     def run(self):
         self.root.mainloop()
+        if self.watcher is not None:
+            self.watcher.stop()
+        self.autosave.stop()
     
     # Part of ensuring loaded changes are viewed by child windows
      ### AI Declaration - track_child was added as a suggestion from an LLM. Helping to create a seamless app where data can be loaded to everywhere
@@ -144,10 +208,24 @@ class MainWindow:
     def _untrack_child(self, win):
         self._child_windows = [w for w in self._child_windows if w is not win]
 
-def run_app():
+# Pass watch=True (or --watch on the command line) when several workstations share one data folder
+# compression ("gzip" or "zstd", or --compression) saves the csvs compressed, see storage.COMPRESSION
+# hash_seconds (or --hash-seconds) times password hashing on this machine and sets the cost of new hashes so checking one takes about that long
+def run_app(watch: bool = False, compression=None, hash_seconds=None):
+    storage.set_compression(compression)
+    if hash_seconds is not None:
+        passwords.set_iterations(passwords.calibrate(hash_seconds))
     # uses load_or_create to account for missing data
-    tracker = Tracker.load_or_create_sample()
-    MainWindow(tracker).run()
+    # Changes are journaled as they are made, so work isn't lost if the app closes before Save is pressed
+    # Unchanged tables are loaded from the binary snapshot cache rather than re-parsing the csvs
+    # Only users is loaded before the login window opens, the rest loads in the background
+    tracker = Tracker.load_or_create_sample(journal=Journal(), cache=True, staged=True)
+    MainWindow(tracker, watch=watch).run()
 
 if __name__ == "__main__":
-    run_app()
\ No newline at end of file
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--watch", action="store_true", help="merge in changes saved by other instances sharing the data folder")
+    parser.add_argument("--compression", choices=("gzip", "zstd"), help="save the csvs compressed")
+    parser.add_argument("--hash-seconds", type=float, help="calibrate password hashing to take about this many seconds per login")
+    args = parser.parse_args()
+    run_app(watch=args.watch, compression=args.compression, hash_seconds=args.hash_seconds)
\ No newline at end of file
@@ -0,0 +1,14 @@
+# Fills a listbox from query results (see utils/query.py) a page at a time, so a window only finds and draws the rows it shows
+# More rows are added to the end when asked for (the "Show more" buttons), so the listbox always shows the start of the results
+PAGE_SIZE = 200
+
+# Adds up to size more results after the rows already shown. ids holds the key of each row shown, as for apply_row_changes
+# Rows are only ever taken from the start of the results, so the rows already shown are skipped by counting them
+# results can be a QueryResult, which only finds the records asked for, or a plain list. Returns whether there are more to show
+def show_more_rows(listbox, ids: list, results, label, size: int = PAGE_SIZE) -> bool:
+    # iter() so list() doesn't ask a QueryResult for its len(), which would count every result
+    rows = list(iter(results[len(ids):len(ids) + size + 1]))
+    for record in rows[:size]:
+        ids.append(record.id)
+        listbox.insert("end", label(record))
+    return len(rows) > size
@@ -0,0 +1,38 @@
+# Interface for storage backends the Tracker can use instead of the default csv functions in storage.py
+# A backend must be able to read and write whole tables as dataframes shaped like the csvs
+# (one row per record, with employee permissions and department members joined by spaces)
+# Backends that can do more say so with the flags below, and the Tracker will use those abilities when they are there
+class StorageBackend:
+    # True if write_rows is implemented, so a save only needs to send the rows that changed
+    supports_rows = False
+    # True if query_employee_ids is implemented, so list_employees can push its filters down to storage
+    supports_queries = False
+    # True if different tables can be read and written at the same time from several threads
+    supports_parallel = False
+    # Tables that lazy_table can serve, which the Tracker then reads record by record as they are used, rather than loading them
+    lazy_tables = ()
+    # Tables the backend leaves in the csvs, as storage.py keeps them. The Tracker saves these itself, merging changed rows
+    # into the csv under its lock with version checks, as it does with no backend, so instances sharing them don't lose each other's rows
+    csv_tables = ()
+
+    # Returns a dataframe for the table, raising FileNotFoundError if the table has never been saved
+    def read_table(self, table: str):
+        raise NotImplementedError
+
+    # Replaces everything stored for the table with the dataframe
+    def write_table(self, table: str, dataframe):
+        raise NotImplementedError
+
+    # Inserts or updates the given rows (dicts from to_row) and removes the records with the given keys
+    def write_rows(self, table: str, rows: list, deleted_keys: list):
+        raise NotImplementedError
+
+    # Returns a dict-like view of the table that builds each record with build(row) when it is first used
+    # observer is called with any of those records that change, as the Tracker's observers are for loaded records
+    # The view has a bind(build, observer, watch) method, to hand it to another owner (see LazyTable.bind)
+    def lazy_table(self, table: str, build, observer=None):
+        raise NotImplementedError
+
+    # Returns the ids of employees matching the same filters as Tracker.list_employees, in the order they were created
+    def query_employee_ids(self, name_search=None, role_search=None, min_date=None, max_date=None, min_salary=None, max_salary=None) -> list:
+        raise NotImplementedError
@@ -0,0 +1,186 @@
+import argparse
+import importlib.util
+import itertools
+import os
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from employee_tracker.storage import storage
+from employee_tracker.storage.backend import StorageBackend
+
+# Columnar storage, one file per table, as an alternative to the csvs for large data
+# Parquet (via pyarrow) is used when pyarrow is installed, otherwise NumPy's .npz format, which only needs numpy (already required by pandas)
+# Columns are typed, so salaries and dates are stored as numbers rather than text and don't need parsing when loaded
+# Columns with few distinct values are dictionary encoded - each distinct value is stored once, with a small integer code per row
+# Employee permissions and department members are encoded as their joined strings, as most records share one of a few combinations
+FORMATS = ("parquet", "npz")
+HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
+INT_COLUMNS = {"salary", "version"}
+DATE_COLUMNS = {"start_date"}
+BOOL_COLUMNS = {"active"}
+DICTIONARY_COLUMNS = {"employees": {"role", "permissions"}, "departments": {"members", "parent_department"}}
+
+class ColumnarBackend(StorageBackend):
+    # Each table is its own file, so they can be read and written at the same time
+    supports_parallel = True
+
+    def __init__(self, format: str = None, directory=None):
+        if format is None:
+            format = "parquet" if HAS_PYARROW else "npz"
+        if format not in FORMATS:
+            raise ValueError(f"unknown format {format}, expected one of {', '.join(FORMATS)}")
+        if format == "parquet" and not HAS_PYARROW:
+            raise ImportError("the parquet format needs pyarrow installed")
+        self.format = format
+        self.directory = Path(directory) if directory is not None else None
+
+    # Resolved on each use, like storage.table_path, so tests that move DATA_DIR also move these files
+    def path(self, table: str) -> Path:
+        return (self.directory or storage.DATA_DIR) / f"{table}.{self.format}"
+
+    def read_table(self, table: str):
+        path = self.path(table)
+        if not path.exists():
+            raise FileNotFoundError(f"no {self.format} file found at {path}")
+        if self.format == "parquet":
+            return self._read_parquet(path)
+        return self._read_npz(path)
+
+    # Written to a temporary file and moved into place, as write_csv does, so a failed save never leaves half a file
+    def write_table(self, table: str, dataframe):
+        path = self.path(table)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, temp = tempfile.mkstemp(dir=path.parent, prefix=f".{table}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                if self.format == "parquet":
+                    self._write_parquet(f, table, dataframe)
+                else:
+                    self._write_npz(f, table, dataframe)
+            storage.replace_file(temp, path)
+        except BaseException:
+            os.remove(temp)
+            raise
+
+    def _write_parquet(self, f, table, dataframe):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        arrays = {}
+        for column in dataframe.columns:
+            values = dataframe[column]
+            if column in INT_COLUMNS:
+                arrays[column] = pa.array(values.to_numpy(dtype="int64"))
+            elif column in DATE_COLUMNS:
+                arrays[column] = pa.array(_day_numbers(values))
+            elif column in BOOL_COLUMNS:
+                arrays[column] = pa.array(values.to_numpy(dtype=bool))
+            elif column in DICTIONARY_COLUMNS.get(table, ()):
+                arrays[column] = pa.array(_strings(values), type=pa.string()).dictionary_encode()
+            else:
+                arrays[column] = pa.array(_strings(values), type=pa.string())
+        pq.write_table(pa.table(arrays), f)
+
+    def _read_parquet(self, path):
+        import pyarrow.parquet as pq
+
+        df = pq.read_table(path).to_pandas(date_as_object=False)
+        for column in df.columns:
+            if isinstance(df[column].dtype, pd.CategoricalDtype):
+                df[column] = df[column].astype(str)
+        return df
+
+    # npz can't hold Python objects without pickle, and numpy's own string arrays pad every value to the longest one
+    # So each string column is stored as all its values joined into one UTF-8 array, "<column>.text", plus where each ends, "<column>.ends"
+    # Dictionary encoded columns are stored as their distinct values in the same way, plus "<column>.codes"
+    def _write_npz(self, f, table, dataframe):
+        arrays = {}
+        for column in dataframe.columns:
+            values = dataframe[column]
+            if column in INT_COLUMNS:
+                arrays[column] = values.to_numpy(dtype="int64")
+            elif column in DATE_COLUMNS:
+                arrays[column] = _day_numbers(values)
+            elif column in BOOL_COLUMNS:
+                arrays[column] = values.to_numpy(dtype=bool)
+            elif column in DICTIONARY_COLUMNS.get(table, ()):
+                codes, uniques = pd.factorize(pd.Series(_strings(values), dtype=object))
+                arrays[f"{column}.codes"] = codes.astype("int32")
+                arrays.update(_pack_strings(column, list(uniques)))
+            else:
+                arrays.update(_pack_strings(column, _strings(values)))
+        # The column order is kept so tables read back shaped as they were written
+        arrays["columns"] = np.array(list(dataframe.columns), dtype=str)
+        np.savez_compressed(f, **arrays)
+
+    def _read_npz(self, path):
+        with np.load(path, allow_pickle=False) as data:
+            columns = {}
+            for column in data["columns"].tolist():
+                if f"{column}.codes" in data:
+                    values = np.asarray(_unpack_strings(data, column), dtype=object)
+                    columns[column] = values[data[f"{column}.codes"]]
+                elif f"{column}.text" in data:
+                    columns[column] = _unpack_strings(data, column)
+                elif column in DATE_COLUMNS:
+                    columns[column] = data[column].astype("datetime64[ns]")
+                else:
+                    columns[column] = data[column]
+        return pd.DataFrame(columns)
+
+# Missing values (e.g. a department with no parent) are stored as empty strings, as they are in the csvs
+def _strings(values: pd.Series) -> list:
+    return [value if isinstance(value, str) else "" if pd.isna(value) else str(value) for value in values.tolist()]
+
+# Offsets are counted in characters, so the text is decoded once and sliced, rather than decoding every value
+def _pack_strings(column: str, strings: list) -> dict:
+    return {
+        f"{column}.text": np.frombuffer("".join(strings).encode("utf-8"), dtype=np.uint8),
+        f"{column}.ends": np.fromiter(itertools.accumulate(map(len, strings)), dtype=np.int64, count=len(strings)),
+    }
+
+def _unpack_strings(data, column: str) -> list:
+    text = data[f"{column}.text"].tobytes().decode("utf-8")
+    ends = data[f"{column}.ends"].tolist()
+    return list(map(text.__getitem__, map(slice, [0] + ends[:-1], ends)))
+
+# Dates as numpy days since 1970, which is how both formats store them
+# Dates from to_row are datetime.date objects, and dates read from csvs are pandas timestamps
+def _day_numbers(values: pd.Series) -> np.ndarray:
+    return pd.to_datetime(values).to_numpy(dtype="datetime64[D]")
+
+# Copies every table from one storage to another. None means the csvs in storage.py
+# e.g. convert(None, ColumnarBackend("parquet")) turns the csvs into parquet files, and convert(ColumnarBackend("parquet"), None) goes back
+# Tables that haven't been saved in the source are skipped. Returns the tables that were copied
+def convert(source, target, tables=("employees", "departments", "permissions", "users")) -> list:
+    copied = []
+    for table in tables:
+        try:
+            df = storage.read_csv(table) if source is None else source.read_table(table)
+        except FileNotFoundError:
+            continue
+        if target is None:
+            storage.write_csv(table, df)
+        else:
+            target.write_table(table, df)
+        copied.append(table)
+    return copied
+
+def _storage_for(format: str):
+    return None if format == "csv" else ColumnarBackend(format)
+
+# Run with: python -m employee_tracker.storage.columnar_backend csv parquet
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert the tracker's data between storage formats")
+    parser.add_argument("source", choices=("csv",) + FORMATS)
+    parser.add_argument("target", choices=("csv",) + FORMATS)
+    args = parser.parse_args(argv)
+    copied = convert(_storage_for(args.source), _storage_for(args.target))
+    print(f"Converted {', '.join(copied) or 'nothing'} from {args.source} to {args.target}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import getpass
+import json
+import os
+import re
+import socket
+from pathlib import Path
+
+from employee_tracker.storage import storage
+
+# Append-only journal of changes made since the last full save of the CSVs
+# Each line is one JSON object: the table, the record's key, and the record's full row (or null when it was deleted)
+# Writing one line per change is cheap and, with sync on, durable as soon as append returns
+# When the tracker compacts, the current journal is rotated out, the CSVs are rewritten, and only then is the rotated file removed
+# That way a crash at any point leaves either the journal or the new CSVs holding every change
+# Without a path each instance gets its own journal (see instance_path), as a save rotates away and discards the journal it was given
+class Journal:
+    def __init__(self, path=None, sync: bool = True, compact_every: int = 1000):
+        self.path = Path(path) if path is not None else instance_path()
+        self.sync = sync
+        # Number of entries after which the tracker should fold the journal into new CSVs
+        self.compact_every = compact_every
+        self.entries_since_compaction = 0
+        self._file = None
+
+    # Rotated journals are named after the journal with .1, .2 etc on the end, and are replayed in that order before the current one
+    def rotated_paths(self) -> list:
+        paths = []
+        for p in self.path.parent.glob(self.path.name + ".*"):
+            suffix = p.name[len(self.path.name) + 1:]
+            if suffix.isdigit():
+                paths.append((int(suffix), p))
+        return [p for _, p in sorted(paths)]
+
+    # Writes a single change. Dates (and anything else json doesn't know) are stored as strings
+    def append(self, table: str, key: str, row):
+        if self._file is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, "a", encoding="utf-8")
+        self._file.write(json.dumps({"table": table, "key": key, "row": row}, default=str) + "\n")
+        self._file.flush()
+        if self.sync:
+            os.fsync(self._file.fileno())
+        self.entries_since_compaction += 1
+
+    def needs_compaction(self) -> bool:
+        return self.entries_since_compaction >= self.compact_every
+
+    # Reads back every change, oldest first. A line cut short by a crash mid-write is skipped
+    def entries(self):
+        for path in self.rotated_paths() + [self.path]:
+            if not path.exists():
+                continue
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    yield entry["table"], entry["key"], entry["row"]
+
+    # Moves the current journal aside so new changes go to a fresh file while a snapshot is written
+    # Returns the rotated path (to be passed to discard once the snapshot is safely on disk), or None if there was nothing to rotate
+    def rotate(self):
+        self.close()
+        self.entries_since_compaction = 0
+        if not self.path.exists():
+            return None
+        rotated = self.rotated_paths()
+        number = int(rotated[-1].name.rsplit(".", 1)[1]) + 1 if rotated else 1
+        target = self.path.with_name(f"{self.path.name}.{number}")
+        os.replace(self.path, target)
+        return target
+
+    # Removes a rotated journal, and any older ones, once the changes in them are in the CSVs
+    def discard(self, rotated):
+        number = int(rotated.name.rsplit(".", 1)[1])
+        for path in self.rotated_paths():
+            if int(path.name.rsplit(".", 1)[1]) <= number:
+                path.unlink()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+# The journal for this workstation and user in the data folder, e.g. journal-pc1-sam.log
+# Several instances share one data folder (see gui/file_watcher.py), and each has to replay and discard only its own changes
+# It is keyed by host and user rather than process, so the same one is found again after a crash or restart
+def instance_path() -> Path:
+    try:
+        user = getpass.getuser()
+    except (KeyError, OSError):
+        user = "user"
+    name = re.sub(r"[^A-Za-z0-9_.-]", "_", f"{socket.gethostname()}-{user}")
+    return storage.DATA_DIR / f"journal-{name}.log"
@@ -0,0 +1,326 @@
+import bisect
+import json
+import mmap
+import os
+import struct
+import tempfile
+import weakref
+from collections.abc import MutableMapping
+from datetime import date, datetime
+from pathlib import Path
+
+from employee_tracker.storage import storage
+from employee_tracker.storage.backend import StorageBackend
+
+# Employees stored as a binary file of fixed-width records, so one employee can be read without parsing the rest
+# The file is memory mapped, so only the pages that are actually read are loaded, and a lookup touches a handful of pages
+#
+# Layout: a header page, then every record in the order they were saved, then an index of (id, record number) sorted by id
+# The header is JSON, giving each field's struct code, the record count and where the index starts
+# Strings are stored as UTF-8, padded with NUL bytes to the longest value in that column when the file was written
+# Dates are stored as days since 1970-01-01, and salaries and versions as 64 bit integers
+#
+# Reading only needs the standard library. Writing uses numpy (installed with pandas) to build and sort the records
+MAGIC = b"EMPREC1\n"
+HEADER_SIZE = 4096
+FIELDS = ("id", "name", "role", "start_date", "salary", "address", "permissions", "version")
+NUMBER_FIELDS = {"start_date": "i", "salary": "q", "version": "q"}
+EPOCH = date(1970, 1, 1).toordinal()
+
+class RecordFile:
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                raise ValueError(f"{self.path} is empty")
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        # Lookups jump around the file, so the OS is told not to read ahead, which would load many pages for every one used
+        if hasattr(mmap, "MADV_RANDOM"):
+            self._map.madvise(mmap.MADV_RANDOM)
+        if self._map[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{self.path} is not an employee record file")
+        header = json.loads(self._map[len(MAGIC):HEADER_SIZE].decode("utf-8"))
+        self._layout = header["fields"]
+        self.fields = [name for name, _ in self._layout]
+        self._record = struct.Struct("<" + "".join(code for _, code in header["fields"]))
+        self._id_width = struct.calcsize(header["fields"][0][1])
+        self._index_entry = struct.Struct(f"<{self._id_width}sQ")
+        self._index_offset = header["index_offset"]
+        self.count = header["count"]
+
+    def __len__(self) -> int:
+        return self.count
+
+    def close(self):
+        self._map.close()
+
+    # Reads record number i as a dict shaped like Employee.to_row
+    def row(self, i: int) -> dict:
+        values = self._record.unpack_from(self._map, HEADER_SIZE + i * self._record.size)
+        row = {}
+        for name, value in zip(self.fields, values):
+            if name == "start_date":
+                value = date.fromordinal(value + EPOCH)
+            elif isinstance(value, bytes):
+                value = value.rstrip(b"\0").decode("utf-8")
+            row[name] = value
+        return row
+
+    # The id of record number i, without unpacking the rest of the record
+    def id_at(self, i: int) -> str:
+        start = HEADER_SIZE + i * self._record.size
+        return self._map[start:start + self._id_width].rstrip(b"\0").decode("utf-8")
+
+    def ids(self):
+        for i in range(self.count):
+            yield self.id_at(i)
+
+    # Binary search of the sorted index, returning the record number for the id, or None if it isn't in the file
+    def find(self, id: str):
+        key = id.encode("utf-8")
+        if len(key) > self._id_width:
+            return None
+        key = key.ljust(self._id_width, b"\0")
+        i = bisect.bisect_left(_IndexKeys(self), key)
+        if i < self.count:
+            found, record = self._index_entry.unpack_from(self._map, self._index_offset + i * self._index_entry.size)
+            if found == key:
+                return record
+        return None
+
+    def get_row(self, id: str):
+        i = self.find(id)
+        return None if i is None else self.row(i)
+
+    # Every record as numpy arrays, one per field, for building whole tables
+    # They are copied out of the map, so the file can be closed (or replaced) while they are still in use
+    def columns(self) -> dict:
+        import numpy as np
+        dtype = np.dtype([(name, f"S{code[:-1]}" if code.endswith("s") else f"<{code}") for name, code in self._layout])
+        records = np.frombuffer(self._map, dtype=dtype, count=self.count, offset=HEADER_SIZE)
+        return {name: records[name].copy() for name in self.fields}
+
+# Lets bisect search the index in the file as if it were a list of ids
+class _IndexKeys:
+    def __init__(self, file: RecordFile):
+        self.file = file
+    def __len__(self):
+        return self.file.count
+    def __getitem__(self, i):
+        entry = self.file._index_entry
+        return entry.unpack_from(self.file._map, self.file._index_offset + i * entry.size)[0]
+
+# Rows are dicts shaped like Employee.to_row. Dates may be dates, datetimes (pandas timestamps) or ISO strings, as from the csvs
+def _date_days(value) -> int:
+    if isinstance(value, datetime):
+        value = value.date()
+    elif isinstance(value, str):
+        value = date.fromisoformat(value)
+    return value.toordinal() - EPOCH
+
+def _encoded_column(values) -> list:
+    return [("" if value is None else str(value)).encode("utf-8") for value in values]
+
+# Writes the rows as a new record file, replacing any file already at path
+# columns maps each field to a list of values, so callers with whole columns (e.g. a dataframe) don't need to build rows
+def write_record_file(path, columns: dict):
+    import numpy as np
+
+    count = len(columns["id"])
+    arrays = {}
+    for name in FIELDS:
+        values = columns.get(name, [0] * count if name == "version" else [""] * count)
+        if name == "start_date":
+            arrays[name] = np.fromiter((_date_days(value) for value in values), dtype="<i4", count=count)
+        elif name in NUMBER_FIELDS:
+            arrays[name] = np.asarray(values, dtype="<i8")
+        else:
+            encoded = _encoded_column(values)
+            arrays[name] = np.array(encoded, dtype=f"S{max(map(len, encoded), default=1) or 1}")
+    _write_arrays(Path(path), arrays, count)
+
+def _write_arrays(path: Path, arrays: dict, count: int):
+    import numpy as np
+
+    fields = [[name, f"{arrays[name].dtype.itemsize}s" if name not in NUMBER_FIELDS else NUMBER_FIELDS[name]] for name in FIELDS]
+    records = np.empty(count, dtype=np.dtype([(name, arrays[name].dtype) for name in FIELDS]))
+    for name in FIELDS:
+        records[name] = arrays[name]
+    order = np.argsort(records["id"], kind="stable")
+    index = np.empty(count, dtype=np.dtype([("id", records.dtype["id"]), ("record", "<u8")]))
+    index["id"] = records["id"][order]
+    index["record"] = order
+    index_offset = HEADER_SIZE + records.nbytes
+    header = MAGIC + json.dumps({"fields": fields, "count": count, "index_offset": index_offset}).encode("utf-8")
+    if len(header) > HEADER_SIZE:
+        raise ValueError("record file header is too large")
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(header.ljust(HEADER_SIZE, b" "))
+            f.write(records.tobytes())
+            f.write(index.tobytes())
+        storage.replace_file(temp, path)
+    except BaseException:
+        os.remove(temp)
+        raise
+
+# Applies changed rows and deletions to an existing record file, writing a new file in its place
+# Records stay in their place when updated, and new ones go on the end, so the order they were created in is kept
+# Columns are widened if a new value is longer than any before it
+def update_record_file(path, rows: list, deleted_keys: list):
+    import numpy as np
+
+    file = RecordFile(path)
+    try:
+        columns = file.columns()
+        positions = {key: file.find(key) for key in [row["id"] for row in rows] + list(deleted_keys)}
+    finally:
+        file.close()
+    for name in FIELDS:
+        column = columns.get(name)
+        if column is None:
+            column = np.zeros(len(columns["id"]), dtype="<i8") if name == "version" else np.array([b""] * len(columns["id"]), dtype="S1")
+        if name == "start_date":
+            values = np.array([_date_days(row[name]) for row in rows], dtype="<i4")
+        elif name in NUMBER_FIELDS:
+            values = np.array([row.get(name, 0) for row in rows], dtype="<i8")
+        else:
+            encoded = _encoded_column(row.get(name, "") for row in rows)
+            width = max([column.dtype.itemsize] + [len(value) for value in encoded])
+            column = column.astype(f"S{width}")
+            values = np.array(encoded, dtype=f"S{width}")
+        for row, value in zip(rows, values):
+            if positions[row["id"]] is not None:
+                column[positions[row["id"]]] = value
+        extra = [value for row, value in zip(rows, values) if positions[row["id"]] is None]
+        columns[name] = np.concatenate([column, np.array(extra, dtype=column.dtype)])
+    removed = [positions[key] for key in deleted_keys if positions[key] is not None]
+    keep = np.ones(len(columns["id"]), dtype=bool)
+    keep[removed] = False
+    _write_arrays(Path(path), {name: columns[name][keep] for name in FIELDS}, int(keep.sum()))
+
+# A dict-like view of a record file, building each record into an object only when it is asked for
+# Objects that have been read are kept only while something else holds them, so memory use follows what is being used, not the file size
+# Records that are added, replaced or changed are held here until the table is next loaded, as the file doesn't have them yet
+# Deleted keys are remembered, so they disappear from the view without the file changing
+class LazyTable(MutableMapping):
+    def __init__(self, file: RecordFile, build, observer=None):
+        self.file = file
+        self._build = build
+        self._observer = observer
+        self._loaded = weakref.WeakValueDictionary()
+        self._held = {}
+        self._deleted = set()
+
+    def __getitem__(self, key):
+        if key in self._held:
+            return self._held[key]
+        if key in self._deleted:
+            raise KeyError(key)
+        record = self._loaded.get(key)
+        if record is None:
+            row = self.file.get_row(key)
+            if row is None:
+                raise KeyError(key)
+            record = self._build(row)
+            record._observer = self._changed
+            self._loaded[key] = record
+        return record
+
+    # Hands the view to a different owner, e.g. when a tracker takes over tables another one read (see Tracker.reload_from_storage)
+    # Records already read are dropped, so they are built again for the new owner, and held records are passed to watch
+    def bind(self, build, observer, watch):
+        self._build = build
+        self._observer = observer
+        self._loaded = weakref.WeakValueDictionary()
+        for record in self._held.values():
+            watch(record)
+
+    # Observer for records read from the file. A changed record is held, so the change isn't lost when nothing else holds it
+    def _changed(self, record):
+        self._held[record.id] = record
+        if self._observer is not None:
+            self._observer(record)
+
+    def __setitem__(self, key, record):
+        self._held[key] = record
+        self._loaded.pop(key, None)
+        self._deleted.discard(key)
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self._held.pop(key, None)
+        self._loaded.pop(key, None)
+        if self.file.find(key) is not None:
+            self._deleted.add(key)
+
+    def __contains__(self, key):
+        if key in self._held:
+            return True
+        return key not in self._deleted and isinstance(key, str) and self.file.find(key) is not None
+
+    def __iter__(self):
+        for key in self.file.ids():
+            if key not in self._deleted:
+                yield key
+        for key in list(self._held):
+            if self.file.find(key) is None:
+                yield key
+
+    def __len__(self):
+        added = sum(1 for key in self._held if self.file.find(key) is None)
+        return self.file.count - len(self._deleted) + added
+
+# Keeps employees in a record file (data/employees.rec) and every other table in the csvs, as usual
+# With this backend the tracker's employees table is a LazyTable, so loading only opens the file
+class RecordFileBackend(StorageBackend):
+    supports_rows = True
+    lazy_tables = ("employees",)
+    csv_tables = ("departments", "permissions", "users")
+
+    def __init__(self, path=None):
+        self._path = Path(path) if path is not None else None
+
+    # Resolved on each use, like storage.table_path, so tests that move DATA_DIR also move the file
+    @property
+    def path(self) -> Path:
+        return self._path or storage.DATA_DIR / "employees.rec"
+
+    def read_table(self, table: str):
+        if table != "employees":
+            return storage.read_csv(table)
+        file = self._open()
+        try:
+            columns = file.columns()
+            df = storage._pandas().DataFrame({
+                name: ([value.decode("utf-8") for value in column.tolist()] if column.dtype.kind == "S" else column)
+                for name, column in columns.items()
+            })
+        finally:
+            file.close()
+        df["start_date"] = df["start_date"].to_numpy().astype("datetime64[D]")
+        return df
+
+    def write_table(self, table: str, dataframe):
+        if table != "employees":
+            storage.write_csv(table, dataframe)
+            return
+        write_record_file(self.path, {column: dataframe[column].tolist() for column in dataframe.columns})
+
+    # Only employees. Changed rows of the csv tables are merged into them by the Tracker (see csv_tables)
+    def write_rows(self, table: str, rows: list, deleted_keys: list):
+        if table != "employees":
+            raise ValueError(f"{table} is kept in a csv, which the tracker merges rows into itself")
+        update_record_file(self.path, rows, deleted_keys)
+
+    def lazy_table(self, table: str, build, observer=None) -> LazyTable:
+        return LazyTable(self._open(), build, observer)
+
+    def _open(self) -> RecordFile:
+        if not self.path.exists():
+            raise FileNotFoundError(f"no record file found at {self.path}")
+        return RecordFile(self.path)
@@ -0,0 +1,51 @@
+import logging
+import os
+import pickle
+import tempfile
+
+from employee_tracker.storage import storage
+
+# Binary cache of loaded tables, so startup doesn't have to parse and validate every csv each time
+# Each table gets its own pickle in data/.cache, holding the fingerprint of the csv it was built from, then the built objects
+# A cached table is only used if its csv still matches the fingerprint, otherwise it is rebuilt from the csv
+# The cache is only ever written by this program from data it has already validated, so it is trusted in the same way as the code
+# Bump CACHE_VERSION whenever the domain classes change shape, so old caches are ignored
+CACHE_VERSION = 2
+
+logger = logging.getLogger(__name__)
+
+def cache_path(table: str):
+    return storage.DATA_DIR / ".cache" / f"{table}.pickle"
+
+# Returns the fingerprint the cache was built from and the cached records for a table, or None if there is no usable cache
+# The header is read first, so a stale cache costs almost nothing to reject
+# The fingerprint has just been checked against the csv, so it stands in for the csv's own without reading the whole file to hash it
+def load_table(table: str):
+    try:
+        with open(cache_path(table), "rb") as f:
+            version, fingerprint = pickle.load(f)
+            if version != CACHE_VERSION or not storage.fingerprint_matches(table, fingerprint):
+                return None
+            return fingerprint, pickle.load(f)
+    except (OSError, EOFError, ValueError, TypeError, AttributeError, ImportError, pickle.UnpicklingError):
+        return None
+
+# Writes the cache via a temporary file of its own, so a half-written cache is never read, and instances writing at once don't clash
+# The cache only saves time, so failing to write it is logged and otherwise ignored, and never stops a load or save
+def save_table(table: str, fingerprint, records: list):
+    path = cache_path(table)
+    temp = None
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, temp = tempfile.mkstemp(dir=path.parent, prefix=f".{table}.", suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump((CACHE_VERSION, fingerprint), f, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(records, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp, path)
+    except Exception as e:
+        logger.warning("couldn't write the %s snapshot cache: %s", table, e)
+        if temp is not None:
+            try:
+                os.remove(temp)
+            except OSError:
+                pass
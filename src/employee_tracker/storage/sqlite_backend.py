@@ -0,0 +1,186 @@
+import sqlite3
+from contextlib import closing
+from datetime import date, datetime
+from pathlib import Path
+
+import pandas as pd
+
+from employee_tracker.storage import storage
+from employee_tracker.storage.backend import StorageBackend
+
+# SQLite storage, using a single local database file in WAL mode
+# This goes back to the original plan of storing data in SQL. Tables are normalised, so employee permissions and
+# department members get a row each, rather than being joined into one string as they are in the csvs
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS employees (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    role TEXT NOT NULL,
+    start_date TEXT NOT NULL,
+    salary INTEGER NOT NULL,
+    address TEXT NOT NULL,
+    -- No longer used, hashes are only kept in users. Kept so older databases still match, and cleared as their rows are saved
+    password_hash TEXT
+);
+CREATE TABLE IF NOT EXISTS employee_permissions (
+    employee_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    permission TEXT NOT NULL,
+    PRIMARY KEY (employee_id, position)
+);
+CREATE TABLE IF NOT EXISTS departments (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    description TEXT NOT NULL,
+    head_of_department TEXT NOT NULL,
+    parent_department TEXT
+);
+CREATE TABLE IF NOT EXISTS department_members (
+    department_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    employee_id TEXT NOT NULL,
+    PRIMARY KEY (department_id, position)
+);
+CREATE TABLE IF NOT EXISTS users (
+    id TEXT PRIMARY KEY,
+    password_hash TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS permissions (
+    name TEXT PRIMARY KEY,
+    active INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_employees_name ON employees (name);
+CREATE INDEX IF NOT EXISTS idx_employees_role ON employees (role);
+CREATE INDEX IF NOT EXISTS idx_employees_salary ON employees (salary);
+CREATE INDEX IF NOT EXISTS idx_employees_start_date ON employees (start_date);
+CREATE INDEX IF NOT EXISTS idx_department_members_employee ON department_members (employee_id);
+"""
+
+# The column that identifies a record in each table
+KEYS = {"employees": "id", "departments": "id", "users": "id", "permissions": "name"}
+
+# Dates are stored as ISO text so they sort and compare correctly in SQL
+def _iso_date(value) -> str:
+    if isinstance(value, datetime):
+        value = value.date()
+    if isinstance(value, date):
+        return value.isoformat()
+    return str(value)
+
+class SQLiteBackend(StorageBackend):
+    supports_rows = True
+    supports_queries = True
+
+    def __init__(self, path=None):
+        self.path = Path(path) if path is not None else storage.DATA_DIR / "tracker.db"
+
+    # A connection is opened per operation, so the backend can be used from the journal's background thread as well
+    def _connect(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        return conn
+
+    def read_table(self, table: str):
+        if not self.path.exists():
+            raise FileNotFoundError(f"no database found at {self.path}")
+        with closing(self._connect()) as conn:
+            if table == "employees":
+                df = pd.read_sql_query(
+                    "SELECT id, name, role, start_date, salary, address,"
+                    " (SELECT group_concat(permission, ' ') FROM (SELECT permission FROM employee_permissions WHERE employee_id = e.id ORDER BY position)) AS permissions"
+                    " FROM employees e ORDER BY rowid", conn)
+                df["start_date"] = pd.to_datetime(df["start_date"], format="ISO8601")
+                df["permissions"] = df["permissions"].fillna("")
+            elif table == "departments":
+                df = pd.read_sql_query(
+                    "SELECT id, name, description, head_of_department, parent_department,"
+                    " (SELECT group_concat(employee_id, ' ') FROM (SELECT employee_id FROM department_members WHERE department_id = d.id ORDER BY position)) AS members"
+                    " FROM departments d ORDER BY rowid", conn)
+                df["members"] = df["members"].fillna("")
+            elif table == "users":
+                df = pd.read_sql_query("SELECT id, password_hash FROM users ORDER BY rowid", conn)
+            elif table == "permissions":
+                df = pd.read_sql_query("SELECT name, active FROM permissions ORDER BY rowid", conn)
+                df["active"] = df["active"].astype(bool)
+            else:
+                raise ValueError(f"unknown table {table}")
+        return df
+
+    def write_table(self, table: str, dataframe):
+        with closing(self._connect()) as conn, conn:
+            for sql in self._clear_statements(table):
+                conn.execute(sql)
+            self._upsert(conn, table, dataframe.to_dict(orient="records"))
+
+    def write_rows(self, table: str, rows: list, deleted_keys: list):
+        with closing(self._connect()) as conn, conn:
+            self._delete(conn, table, deleted_keys)
+            self._upsert(conn, table, rows)
+
+    def query_employee_ids(self, name_search=None, role_search=None, min_date=None, max_date=None, min_salary=None, max_salary=None) -> list:
+        # instr is used rather than LIKE, to keep the same case-sensitive matching as filter_list
+        clauses = []
+        params = []
+        for value, clause in ((name_search, "instr(name, ?) > 0"), (role_search, "instr(role, ?) > 0"), (min_salary, "salary >= ?"), (max_salary, "salary <= ?")):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        for value, clause in ((min_date, "start_date >= ?"), (max_date, "start_date <= ?")):
+            if value is not None:
+                clauses.append(clause)
+                params.append(_iso_date(value))
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        with closing(self._connect()) as conn:
+            return [row[0] for row in conn.execute(f"SELECT id FROM employees{where} ORDER BY rowid", params)]
+
+    def _clear_statements(self, table):
+        statements = [f"DELETE FROM {table}"]
+        if table == "employees":
+            statements.append("DELETE FROM employee_permissions")
+        elif table == "departments":
+            statements.append("DELETE FROM department_members")
+        return statements
+
+    def _delete(self, conn, table, keys):
+        keys = [(key,) for key in keys]
+        conn.executemany(f"DELETE FROM {table} WHERE {KEYS[table]} = ?", keys)
+        if table == "employees":
+            conn.executemany("DELETE FROM employee_permissions WHERE employee_id = ?", keys)
+        elif table == "departments":
+            conn.executemany("DELETE FROM department_members WHERE department_id = ?", keys)
+
+    # Upserts keep a record's rowid, so records stay in the order they were created
+    def _upsert(self, conn, table, rows):
+        if table == "employees":
+            conn.executemany(
+                "INSERT INTO employees (id, name, role, start_date, salary, address) VALUES (?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT(id) DO UPDATE SET name=excluded.name, role=excluded.role, start_date=excluded.start_date,"
+                " salary=excluded.salary, address=excluded.address, password_hash=NULL",
+                [(r["id"], r["name"], r["role"], _iso_date(r["start_date"]), int(r["salary"]), r["address"]) for r in rows])
+            self._replace_children(conn, "employee_permissions", "employee_id", "permission", rows, "permissions")
+        elif table == "departments":
+            conn.executemany(
+                "INSERT INTO departments (id, name, description, head_of_department, parent_department) VALUES (?, ?, ?, ?, ?)"
+                " ON CONFLICT(id) DO UPDATE SET name=excluded.name, description=excluded.description,"
+                " head_of_department=excluded.head_of_department, parent_department=excluded.parent_department",
+                [(r["id"], r["name"], r["description"], r["head_of_department"], r["parent_department"] or None) for r in rows])
+            self._replace_children(conn, "department_members", "department_id", "employee_id", rows, "members")
+        elif table == "users":
+            conn.executemany(
+                "INSERT INTO users (id, password_hash) VALUES (?, ?) ON CONFLICT(id) DO UPDATE SET password_hash=excluded.password_hash",
+                [(r["id"], r["password_hash"]) for r in rows])
+        elif table == "permissions":
+            conn.executemany(
+                "INSERT INTO permissions (name, active) VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET active=excluded.active",
+                [(r["name"], int(bool(r["active"]))) for r in rows])
+        else:
+            raise ValueError(f"unknown table {table}")
+
+    # Space joined lists from to_row are split back out into one row each
+    def _replace_children(self, conn, child_table, parent_column, value_column, rows, field):
+        conn.executemany(f"DELETE FROM {child_table} WHERE {parent_column} = ?", [(r["id"],) for r in rows])
+        conn.executemany(
+            f"INSERT INTO {child_table} ({parent_column}, position, {value_column}) VALUES (?, ?, ?)",
+            [(r["id"], position, value) for r in rows for position, value in enumerate((r.get(field) or "").split())])
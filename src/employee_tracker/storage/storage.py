@@ -1,8 +1,48 @@
-import pandas as pd
+import csv
+import gzip
+import hashlib
+import importlib.util
+import io
+import os
+import tempfile
+from contextlib import contextmanager
 from pathlib import Path
 
+from employee_tracker.utils.change_tracking import read_version
+
+# fcntl is only on Unix. Elsewhere writes aren't locked against other processes
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
 DATA_DIR = Path(__file__).resolve().parent.parent / "data"
 
+# pandas is an optional accelerator. It takes hundreds of milliseconds to import, so it is only imported when first used
+# If it isn't installed, or this is turned off, the tracker reads and writes csvs with the csv module instead
+USE_PANDAS = importlib.util.find_spec("pandas") is not None
+
+def _pandas():
+    import pandas
+    return pandas
+
+# Optional compression of the csvs. None writes plain csvs, "gzip" uses the standard library and "zstd" needs the zstandard package
+# Files are compressed and decompressed as they are streamed, so a whole table is never held uncompressed in memory
+# Reading finds whichever version of a table is there, so changing this converts each table the next time it is saved
+COMPRESSION = None
+SUFFIXES = {None: ".csv", "gzip": ".csv.gz", "zstd": ".csv.zst"}
+# Middle of the road levels. The highest ones are several times slower to write for a few percent smaller files
+COMPRESSION_LEVELS = {"gzip": 6, "zstd": 3}
+HAS_ZSTD = importlib.util.find_spec("zstandard") is not None
+
+def set_compression(codec):
+    global COMPRESSION
+    if codec not in SUFFIXES:
+        raise ValueError(f"unknown compression {codec}, expected one of gzip, zstd or None")
+    if codec == "zstd" and not HAS_ZSTD:
+        raise ImportError("zstd compression needs the zstandard package installed")
+    COMPRESSION = codec
+
 # takes lists of classes, invokes "to_row" methods, and then builds a pandas dataframe
 ### AI DECLARATION - ChatGPT was used to cement learnings from lectures on saving to CSV
 # Initial intention was to save to a SQL database for more secure storage, but this was abandoned for reasons of time pressure
@@ -13,18 +53,198 @@ def create_dataframe(dataset):
     for item in dataset:
         rows.append(item.to_row())
     
-    return pd.DataFrame(rows)
+    return _pandas().DataFrame(rows)
+
+# Same as create_dataframe, but leaves the rows as a list of dicts for writing with the csv module
+def create_rows(dataset) -> list:
+    if len(dataset) == 0:
+        raise ValueError("No data to save, please check")
+    return [item.to_row() for item in dataset]
  
+# Where each table's csv lives. That is the file for the current compression if there is one, otherwise any other version of the table
+# If there is no version at all, it is where the table would be saved
+def table_path(file_type: str) -> Path:
+    preferred = _path_for(file_type, COMPRESSION)
+    if preferred.exists():
+        return preferred
+    for codec in SUFFIXES:
+        if _path_for(file_type, codec).exists():
+            return _path_for(file_type, codec)
+    return preferred
+
+def _path_for(file_type: str, codec) -> Path:
+    return DATA_DIR / f"{file_type}{SUFFIXES[codec]}"
+
+def _codec(path: Path):
+    for codec, suffix in SUFFIXES.items():
+        if codec is not None and path.name.endswith(suffix):
+            return codec
+    return None
+
+# Opens a csv as text for the csv module, compressing or decompressing as it goes
+def _open_text(path, mode: str, codec):
+    if codec is None:
+        return open(path, mode, newline="", encoding="utf-8")
+    if codec == "gzip":
+        return gzip.open(path, mode + "t", compresslevel=COMPRESSION_LEVELS["gzip"], newline="", encoding="utf-8")
+    import zstandard
+    raw = open(path, mode + "b")
+    if mode == "r":
+        stream = zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)
+    else:
+        stream = zstandard.ZstdCompressor(level=COMPRESSION_LEVELS["zstd"]).stream_writer(raw, closefd=True)
+    return io.TextIOWrapper(stream, newline="", encoding="utf-8")
+
+# pandas does its own (streamed) compression, it just needs telling which, and for writing how hard to compress
+def _pandas_compression(codec):
+    return {"method": codec, "level" if codec == "zstd" else "compresslevel": COMPRESSION_LEVELS[codec]}
+
+# A fingerprint identifies the exact contents of a table's file, as (size, modified time, content hash)
+# Raises FileNotFoundError if the file doesn't exist
+def fingerprint(file_type: str) -> tuple:
+    file_path = table_path(file_type)
+    stat = file_path.stat()
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return (stat.st_size, stat.st_mtime_ns, digest.hexdigest())
+
+# Checks a stored fingerprint against the file. If size and modified time are unchanged the file is taken to be unchanged
+# Otherwise the contents are hashed, so a file that was only touched or copied still matches
+def fingerprint_matches(file_type: str, expected) -> bool:
+    try:
+        stat = table_path(file_type).stat()
+    except FileNotFoundError:
+        return False
+    if expected is None or stat.st_size != expected[0]:
+        return False
+    if stat.st_mtime_ns == expected[1]:
+        return True
+    return fingerprint(file_type)[2] == expected[2]
+
+# The umask can only be read by setting it, so it is read once on import, before any saves are running on other threads
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+# Moves a finished temporary file over path. mkstemp makes files only their owner can read or write, so the temporary file first gets
+# the mode of the file it replaces (or the mode a new file would get), so others sharing the data folder can still use it
+def replace_file(temp, path):
+    try:
+        mode = os.stat(path).st_mode & 0o7777
+    except FileNotFoundError:
+        mode = 0o666 & ~_UMASK
+    os.chmod(temp, mode)
+    os.replace(temp, path)
+
+# The csv is written to a temporary file in the same folder, then renamed over the old one
+# The rename is atomic, so a crash mid-save leaves the previous csv in place rather than a half-written one
+# Takes either a dataframe or a list of rows from create_rows, which are written in the same format as pandas would
+# Tables are written with the current compression. Any version of the table with other compression is then removed, as it is out of date
 def write_csv(file_type: str, dataframe):
-    file_path = DATA_DIR / f"{file_type}.csv"
-    dataframe.to_csv(file_path, index=False)
+    codec = COMPRESSION
+    file_path = _path_for(file_type, codec)
+    fd, temp = tempfile.mkstemp(dir=file_path.parent, prefix=f".{file_type}.", suffix=".tmp")
+    os.close(fd)
+    try:
+        if isinstance(dataframe, list):
+            _write_rows(temp, dataframe, codec)
+        else:
+            # Only passed when compressing, as the temporary file has no suffix for pandas to infer it from
+            dataframe.to_csv(temp, index=False, **({"compression": _pandas_compression(codec)} if codec else {}))
+        replace_file(temp, file_path)
+    except BaseException:
+        os.remove(temp)
+        raise
+    for other in SUFFIXES:
+        if other != codec:
+            _path_for(file_type, other).unlink(missing_ok=True)
 
-def read_csv(file_type: str) -> pd.DataFrame:
-    file_path = DATA_DIR / f"{file_type}.csv"
+def _read_kwargs(file_type: str) -> dict:
     kwargs = {"keep_default_na": False}
     # ensures that loaded dates are the proper type
     if file_type == "employees":
         kwargs["parse_dates"] = ["start_date"]
+    return kwargs
+
+def read_csv(file_type: str) -> "pandas.DataFrame":
+    file_path = table_path(file_type)
+    return _pandas().read_csv(file_path, compression=_codec(file_path), **_read_kwargs(file_type))
+
+# Streams a csv as dataframes of at most chunksize rows, so a very large file never has to be held in memory all at once
+def read_csv_chunks(file_type: str, chunksize: int):
+    if chunksize < 1:
+        raise ValueError("chunksize must be at least 1")
+    file_path = table_path(file_type)
+    with _pandas().read_csv(file_path, chunksize=chunksize, compression=_codec(file_path), **_read_kwargs(file_type)) as reader:
+        yield from reader
+
+# The csv module reads everything as text. Dates are left as ISO text, which from_row accepts, and bools are converted here
+ROW_CONVERTERS = {"permissions": {"active": lambda value: value == "True"}}
+# Columns that are no longer saved but may still be in older files. They are dropped as rows are read, so merged saves don't write them back
+# Employees' password hashes are only kept in users
+RETIRED_COLUMNS = {"employees": ("password_hash",)}
+
+# Streams a csv one row at a time as dicts, ready for from_row. Needs no pandas
+def read_csv_rows(file_type: str):
+    converters = ROW_CONVERTERS.get(file_type, {})
+    retired = RETIRED_COLUMNS.get(file_type, ())
+    file_path = table_path(file_type)
+    with _open_text(file_path, "r", _codec(file_path)) as f:
+        for row in csv.DictReader(f):
+            for column, convert in converters.items():
+                if column in row:
+                    row[column] = convert(row[column])
+            for column in retired:
+                row.pop(column, None)
+            yield row
+
+# None is written as an empty cell and everything else as text, matching DataFrame.to_csv
+def _write_rows(path, rows: list, codec=None):
+    with _open_text(path, "w", codec) as f:
+        # Rows merged from an older file may be missing newer columns (see merge_rows), so every column seen is written
+        fieldnames = list(dict.fromkeys(column for row in rows for column in row))
+        writer = csv.DictWriter(f, fieldnames=fieldnames, restval="", lineterminator=os.linesep)
+        writer.writeheader()
+        writer.writerows(rows)
+
+# Advisory lock held while a table is read, merged and written, so two instances saving at once take turns
+# Each table has its own lock file next to it, so saves of different tables don't wait for each other
+@contextmanager
+def table_lock(file_type: str):
+    if fcntl is None:
+        yield
+        return
+    DATA_DIR.mkdir(parents=True, exist_ok=True)
+    with open(DATA_DIR / f".{file_type}.lock", "a") as lock:
+        fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
 
-    return pd.read_csv(file_path, **kwargs)
-    
\ No newline at end of file
+# Applies one instance's changed rows and deletions to the rows currently in storage, leaving every other row as it is
+# Rows with a version (see utils.change_tracking.read_version) are only written if storage still has the version they were based on
+# They are then written with the next version. Otherwise the row is a conflict, and storage keeps its own row
+# deleted is a list of (key, version) pairs, checked in the same way. Tables without versions always have version 0, so they never conflict
+# Returns the merged rows and a dict of conflicts, mapping each conflicting key to the row in storage (None if it was deleted there)
+def merge_rows(existing: list, key: str, rows: list, deleted: list):
+    merged = {row[key]: row for row in existing}
+    conflicts = {}
+    for row in rows:
+        current = merged.get(row[key])
+        if "version" in row:
+            if (current is None and row["version"] > 0) or (current is not None and read_version(current) != row["version"]):
+                conflicts[row[key]] = current
+                continue
+            row = {**row, "version": row["version"] + 1}
+        merged[row[key]] = row
+    for deleted_key, version in deleted:
+        current = merged.get(deleted_key)
+        if current is None:
+            continue
+        if read_version(current) != version:
+            conflicts[deleted_key] = current
+            continue
+        del merged[deleted_key]
+    return list(merged.values()), conflicts
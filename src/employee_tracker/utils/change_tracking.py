@@ -0,0 +1,34 @@
+# Base class for domain objects that need to tell their owner (normally the Tracker) when they have been changed
+# The owner sets _observer on each object it holds, and setters call _changed() after any successful update
+# Objects that are not held by a tracker have no observer, so changing them costs nothing extra
+# Versions are stored with Employee and Department rows. Rows saved before versions existed have none, so count as version 0
+# Raises ValueError for anything that isn't a whole number of at least 0
+def read_version(row: dict) -> int:
+    value = row.get("version", 0)
+    if value is None or value == "":
+        return 0
+    if isinstance(value, str):
+        value = value.strip()
+        if not value.isdigit():
+            raise ValueError("version must be a whole number of at least 0")
+        return int(value)
+    version = int(value)
+    if version != value or version < 0:
+        raise ValueError("version must be a whole number of at least 0")
+    return version
+
+class ChangeTracked:
+    _observer = None
+    # Attributes that belong to whoever holds the object rather than the object itself
+    _owner_attributes = ("_observer",)
+
+    def _changed(self):
+        if self._observer is not None:
+            self._observer(self)
+
+    # The observer belongs to whoever holds the object, so it is left out when the object is pickled (e.g. by the snapshot cache)
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for name in self._owner_attributes:
+            state.pop(name, None)
+        return state
@@ -0,0 +1,62 @@
+import re
+
+import pandas as pd
+
+from employee_tracker.utils.passwords import HASH_PATTERN
+
+# Column-wide versions of the per-value checks used by the domain classes
+# Each function takes a whole pandas Series and returns a boolean Series marking which rows pass
+# These are used by the bulk loaders so that validation happens once per column rather than once per row
+
+# Marks which values are strings. When pandas can infer the whole column as strings (the usual case for CSVs) no per-value check is needed
+def check_string_column(column: pd.Series) -> pd.Series:
+    if pd.api.types.infer_dtype(column, skipna=False) == "string":
+        return pd.Series(True, index=column.index)
+    return column.map(lambda x: isinstance(x, str)).astype(bool)
+
+# IDs and hashes are checked by joining the whole column into one newline separated string and running a single regex over it
+# This keeps the work in C. Only if that fails is each value matched separately, to find which rows are bad
+# Patterns passed in must not be able to match a newline themselves
+def fullmatch_column(column: pd.Series, pattern: str) -> pd.Series:
+    is_str = check_string_column(column)
+    if is_str.all():
+        joined = "\n".join(column.tolist()) + "\n"
+        if re.fullmatch(f"(?:{pattern}\n)*", joined):
+            return pd.Series(True, index=column.index)
+    return is_str & column.astype(str).str.fullmatch(pattern)
+
+# Vectorised equivalent of utils.ids.check_id - a prefix, an underscore and an 8 digit hex number
+def check_id_column(column: pd.Series, prefix: str) -> pd.Series:
+    return fullmatch_column(column, rf"{re.escape(prefix)}_[0-9a-fA-F]{{8}}")
+
+# Vectorised equivalent of is_valid_stored_password_hash
+# Either the current format, or the old one, where a 16 byte salt + 32 byte key base64 encodes to exactly 64 characters with no padding
+def check_password_hash_column(column: pd.Series) -> pd.Series:
+    return fullmatch_column(column, rf"(?:{HASH_PATTERN.pattern}|[A-Za-z0-9+/]{{64}})")
+
+# Salaries are cast to int when loading, so anything numeric and whole is accepted
+# Returns the cast column along with the mask of rows that passed
+def check_int_column(column: pd.Series):
+    if pd.api.types.is_integer_dtype(column) and not pd.api.types.is_bool_dtype(column):
+        return column.astype("int64"), pd.Series(True, index=column.index)
+    numbers = pd.to_numeric(column, errors="coerce")
+    valid = numbers.notna() & (numbers == numbers.round())
+    return numbers.where(valid, 0).astype("int64"), valid
+
+# Dates are parsed as a column, anything that cannot be parsed is marked invalid
+# Returns a column of datetime.date objects along with the mask of rows that passed
+def check_date_column(column: pd.Series):
+    if pd.api.types.is_datetime64_any_dtype(column):
+        dates = column
+    else:
+        dates = pd.to_datetime(column, errors="coerce", format="mixed")
+    valid = dates.notna()
+    return dates.dt.date, valid
+
+# Record versions (see utils.change_tracking.read_version). Tables saved before versions existed have no column, so every row is version 0
+# Returns the versions as a list, along with the valid mask updated to also require a whole version of at least 0
+def versions_column(df: pd.DataFrame, valid: pd.Series):
+    if "version" not in df.columns:
+        return [0] * len(df), valid
+    versions, ok = check_int_column(df["version"].replace("", 0))
+    return versions.tolist(), valid & ok & (versions >= 0)
@@ -0,0 +1,190 @@
+from datetime import date, datetime
+
+import numpy as np
+
+from employee_tracker.utils.query import Query, RecordView
+
+# A copy of some of a table's attributes as NumPy arrays, one row per record in table order, for reporting queries over the whole table
+# Each predicate is worked out for every row at once as a boolean mask, and the masks are combined with &, so the per-record work happens in C
+# Kinds of column:
+#   "int64" and "date" (datetime64[D]) hold the values themselves
+#   "dictionary" holds a code per row into a list of the distinct values. A "contains" search checks each distinct value once, then picks rows by code
+# Kept up to date a record at a time by update(), as TableIndexes is (see Tracker._reindex)
+# Deleted records are marked dead rather than moved, and new records go on the end, so rows stay in table order
+COLUMN_KINDS = ("int64", "date", "dictionary")
+DTYPES = {"int64": np.int64, "date": "datetime64[D]", "dictionary": np.int32}
+
+# Rebuilt from scratch once there are this many times more rows (counting dead ones) or distinct values than live records
+# Changed names otherwise leave old values in their dictionary, and deleted records leave dead rows
+REBUILD_RATIO = 2
+
+class TableColumns:
+    def __init__(self, kinds: dict):
+        for kind in kinds.values():
+            if kind not in COLUMN_KINDS:
+                raise ValueError(f"unknown column kind {kind}, expected one of {', '.join(COLUMN_KINDS)}")
+        self.kinds = kinds
+        self.build({})
+
+    def __len__(self):
+        return len(self._rows)
+
+    # Reads every record's attributes into new arrays. Raises TypeError if a value can't be held in its column (e.g. a salary that isn't an int)
+    def build(self, records: dict):
+        size = len(records)
+        self._rows = {key: row for row, key in enumerate(records)}
+        self._size = size
+        self._keys = np.empty(max(size, 16), dtype=object)
+        self._keys[:size] = list(records)
+        self._alive = np.zeros(len(self._keys), dtype=bool)
+        self._alive[:size] = True
+        self._columns = {}
+        self._values = {}
+        self._codes = {}
+        for attribute, kind in self.kinds.items():
+            column = np.zeros(len(self._keys), dtype=DTYPES[kind])
+            values = [getattr(record, attribute) for record in records.values()]
+            if kind == "dictionary":
+                self._values[attribute] = []
+                self._codes[attribute] = {}
+                values = [self._code(attribute, value) for value in values]
+            else:
+                for value in values:
+                    _check_value(kind, value)
+            try:
+                column[:size] = values
+            except (OverflowError, ValueError) as err:
+                raise TypeError(f"{attribute} values can't be held as {kind}") from err
+            self._columns[attribute] = column
+
+    # The code for a value in a dictionary column, adding it if it's new
+    def _code(self, attribute, value) -> int:
+        if not isinstance(value, str):
+            raise TypeError(f"{attribute} must be a string to be held in a dictionary column")
+        codes = self._codes[attribute]
+        if value not in codes:
+            codes[value] = len(self._values[attribute])
+            self._values[attribute].append(value)
+        return codes[value]
+
+    # Called after a record is added, changed or removed, with None if it has been removed
+    # Returns False when the arrays have built up enough waste (see REBUILD_RATIO) that they should be built again
+    def update(self, key, record) -> bool:
+        row = self._rows.get(key)
+        if record is None:
+            if row is not None:
+                self._alive[row] = False
+                del self._rows[key]
+            return not self._wasteful()
+        values = {}
+        for attribute, kind in self.kinds.items():
+            value = getattr(record, attribute)
+            values[attribute] = self._code(attribute, value) if kind == "dictionary" else _check_value(kind, value)
+        if row is None:
+            row = self._append(key)
+        for attribute, value in values.items():
+            try:
+                self._columns[attribute][row] = value
+            except (OverflowError, ValueError) as err:
+                raise TypeError(f"{attribute} value can't be held as {self.kinds[attribute]}") from err
+        return not self._wasteful()
+
+    # Adds a row on the end, doubling the arrays when they are full so adding stays cheap on average
+    def _append(self, key) -> int:
+        if self._size == len(self._keys):
+            capacity = 2 * len(self._keys)
+            self._keys = _grown(self._keys, capacity)
+            self._alive = _grown(self._alive, capacity)
+            for attribute, column in self._columns.items():
+                self._columns[attribute] = _grown(column, capacity)
+        row = self._size
+        self._size += 1
+        self._keys[row] = key
+        self._alive[row] = True
+        self._rows[key] = row
+        return row
+
+    def _wasteful(self) -> bool:
+        limit = REBUILD_RATIO * len(self._rows) + 1000
+        return self._size > limit or any(len(values) > limit for values in self._values.values())
+
+    # The rows passing every predicate on a column, as a boolean mask. Predicates on other attributes are returned to be checked some other way
+    def mask(self, predicates) -> tuple:
+        mask = self._alive[:self._size].copy()
+        others = []
+        for predicate in predicates:
+            kind = self.kinds.get(predicate.attribute)
+            column = self._columns.get(predicate.attribute)
+            if kind is None:
+                others.append(predicate)
+            elif kind == "dictionary":
+                if predicate.kind != "string":
+                    raise TypeError(f"{predicate.attribute} can only be searched")
+                matching = np.zeros(len(self._values[predicate.attribute]) + 1, dtype=bool)
+                matching[:-1] = [predicate.value in value for value in self._values[predicate.attribute]]
+                mask &= matching[column[:self._size]]
+            else:
+                if predicate.kind == "string":
+                    # filter_list never matches a string search against a number or date
+                    mask[:] = False
+                    continue
+                value = _column_value(kind, predicate.value)
+                mask &= column[:self._size] >= value if predicate.kind == "min" else column[:self._size] <= value
+        return mask, others
+
+    # Runs a query against the columns. records is the table, used for predicates and sorts on attributes that aren't columns
+    # Results are in the same order as Tracker.query gives them: table order, or sorted with ties kept in table order
+    def run(self, query: Query, records: dict) -> "RecordView":
+        mask, others = self.mask(query.predicates)
+        rows = np.flatnonzero(mask)
+        if others:
+            keys = self._keys[rows]
+            rows = rows[np.fromiter((all(predicate.matches(records[key]) for predicate in others) for key in keys), dtype=bool, count=len(rows))]
+        if query.sort is not None:
+            rows = rows[self._sort_order(rows, query.sort, records)]
+        stop = None if query.limit is None else query.offset + query.limit
+        return RecordView(self._keys[rows[query.offset:stop]].tolist(), records)
+
+    # Positions in rows that would sort them. A stable sort of the negated values keeps ties in table order when sorting highest first, as sorted(reverse=True) does
+    def _sort_order(self, rows, sort, records):
+        attribute = sort.lstrip("-")
+        descending = sort.startswith("-")
+        kind = self.kinds.get(attribute)
+        if kind is None:
+            keys = self._keys[rows]
+            return np.array(sorted(range(len(rows)), key=lambda i: getattr(records[keys[i]], attribute), reverse=descending), dtype=np.intp)
+        if kind == "dictionary":
+            values = self._values[attribute]
+            ranks = np.empty(len(values), dtype=np.int64)
+            ranks[sorted(range(len(values)), key=values.__getitem__)] = np.arange(len(values))
+            sort_keys = ranks[self._columns[attribute][rows]]
+        else:
+            sort_keys = self._columns[attribute][rows].view(np.int64)
+        return np.argsort(-sort_keys if descending else sort_keys, kind="stable")
+
+def _grown(array, capacity):
+    grown = np.zeros(capacity, dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+# Checks a record's value fits its column, and returns it as the column holds it
+def _check_value(kind, value):
+    if kind == "int64" and (isinstance(value, bool) or not isinstance(value, int)):
+        raise TypeError("int64 columns can only hold integers")
+    if kind == "date":
+        if not isinstance(value, date):
+            raise TypeError("date columns can only hold dates")
+        return np.datetime64(value, "D")
+    return value
+
+# A predicate's value as something its column can be compared with. Raises TypeError where filter_list's comparison would
+def _column_value(kind, value):
+    if kind == "date":
+        if isinstance(value, datetime) or not isinstance(value, date):
+            raise TypeError(f"can't compare a date with {type(value).__name__}")
+        return np.datetime64(value, "D")
+    if not isinstance(value, int):
+        raise TypeError(f"can't compare an integer with {type(value).__name__}")
+    # Values past what int64 holds are brought to its limits, which no salary will reach
+    info = np.iinfo(np.int64)
+    return min(max(value, info.min), info.max)
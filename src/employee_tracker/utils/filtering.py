@@ -2,8 +2,27 @@ from datetime import date
 
 # List filtering to be used across multiple classes, these are currently not used in the GUI
 def filter_list(list,search_parameter,value="",parameter_type="string"):
+    check_filter_value(value,parameter_type)
+    filtered = []
+    for item in list:
+        if matches_filter(getattr(item, search_parameter),value,parameter_type):
+            filtered.append(item)
+    return filtered
+
+# Whether one attribute value passes a filter, as filter_list decides it. Also used by the query executor (see utils/query.py)
+def matches_filter(attr,value,parameter_type):
+    if isinstance(attr, str) and isinstance(value, str):
+        return value in attr
+    if parameter_type == "min":
+        return attr >= value
+    if parameter_type == "max":
+        return attr <= value
+    return False
+
+# The checks filter_list makes on what it is given, also used when a filter is answered from an index instead (see Tracker.list_employees)
+def check_filter_value(value,parameter_type):
     match parameter_type:
-        # filtering is simple string, or can include ranges of numbers (max/min) 
+        # filtering is simple string, or can include ranges of numbers (max/min)
         case "string":
             if not isinstance(value,str):
                 raise TypeError("String expected, please try again")
@@ -12,17 +31,3 @@ def filter_list(list,search_parameter,value="",parameter_type="string"):
                 raise TypeError("Integer or date expected, please try again")
         case __:
             raise TypeError("Parameter type should be string, max or min")
-    filtered = []
-    for item in list:
-        attr = getattr(item, search_parameter)
-        if isinstance(attr, str) and isinstance(value, str):
-            if value in attr:
-                filtered.append(item)
-        else:
-            if parameter_type == "min":
-                if attr >= value:
-                    filtered.append(item)
-            elif parameter_type == "max":
-                if attr <= value:
-                    filtered.append(item)
-    return filtered
\ No newline at end of file
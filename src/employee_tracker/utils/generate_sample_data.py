@@ -2,6 +2,7 @@ from datetime import date
 
 from employee_tracker.domain.tracker import Tracker
 from employee_tracker.storage.storage import DATA_DIR
+from employee_tracker.utils.passwords import hashing_cost
 
 # Simple utility that prepopulates any missing csv files so that program can be run easily without error
 ### AI DECLARATION - the content in this function was AI generated, in order to have a meaningful number of assets to work with in testing
@@ -17,256 +18,236 @@ def generate_sample_data() -> Tracker:
     tracker.create_permission("hr_write")
     tracker.create_permission("it_admin")
 
-    e1 = tracker.create_employee(
-        name="Alice Johnson",
-        role="HR Manager",
-        start_date=date(2021, 4, 12),
-        salary=52000,
-        address="10 King Street, London",
-        permissions=["hr_read","hr_write"],
-        password="Alice@123"
-    )
-
-    e2 = tracker.create_employee(
-        name="Ben Carter",
-        role="Software Engineer",
-        start_date=date(2022, 9, 5),
-        salary=65000,
-        address="22 Baker Street, London",
-        permissions=["it_admin"],
-        password="Ben@123"
-    )
-
-    e3 = tracker.create_employee(
-        name="Chloe Singh",
-        role="Payroll Specialist",
-        start_date=date(2020, 1, 20),
-        salary=48000,
-        address="18 High Road, Croydon",
-        permissions=["payroll", "hr_read"],
-        password="Chloe@123"
-    )
-
-    e4 = tracker.create_employee(
-        name="Daniel Evans",
-        role="Customer Support",
-        start_date=date(2023, 2, 1),
-        salary=32000,
-        address="3 Station Road, Watford",
-        permissions=[],
-        password="Daniel@123"
-    )
-
-    e5 = tracker.create_employee(
-        name="Evelyn Brown",
-        role="Finance Analyst",
-        start_date=date(2021, 11, 15),
-        salary=56000,
-        address="77 Queensway, London",
-        permissions=["payroll"],
-        password="Evelyn@123"
-    )
-
-    e6 = tracker.create_employee(
-        name="Frank Mitchell",
-        role="Backend Developer",
-        start_date=date(2020, 6, 8),
-        salary=68000,
-        address="14 Elm Street, Manchester",
-        permissions=["it_admin"],
-        password="Frank@123"
-    )
-
-    e7 = tracker.create_employee(
-        name="Grace Turner",
-        role="Recruitment Officer",
-        start_date=date(2022, 3, 14),
-        salary=45000,
-        address="22 Victoria Road, Birmingham",
-        permissions=["hr_read"],
-        password="Grace@123"
-    )
-
-    e8 = tracker.create_employee(
-        name="Hannah Patel",
-        role="Data Analyst",
-        start_date=date(2021, 9, 30),
-        salary=59000,
-        address="5 Riverside Drive, Leeds",
-        permissions=["it_admin"],
-        password="Hannah@123"
-    )
-
-    e9 = tracker.create_employee(
-        name="Ian Robertson",
-        role="Systems Administrator",
-        start_date=date(2019, 11, 18),
-        salary=72000,
-        address="31 Hill Lane, Bristol",
-        permissions=["it_admin"],
-        password="Ian@123"
-    )
-
-    e10 = tracker.create_employee(
-        name="Jasmine Clark",
-        role="Payroll Assistant",
-        start_date=date(2023, 1, 9),
-        salary=40000,
-        address="9 Oak Avenue, Liverpool",
-        permissions=["payroll"],
-        password="Jasmine@123"
-    )
-
-    e11 = tracker.create_employee(
-        name="Kevin O'Neill",
-        role="DevOps Engineer",
-        start_date=date(2020, 8, 3),
-        salary=70000,
-        address="18 Park Crescent, Nottingham",
-        permissions=["it_admin"],
-        password="Kevin@123"
-    )
-
-    e12 = tracker.create_employee(
-        name="Laura Simmons",
-        role="HR Advisor",
-        start_date=date(2021, 5, 21),
-        salary=48000,
-        address="44 Maple Street, Sheffield",
-        permissions=["hr_read", "hr_write"],
-        password="Laura@123"
-    )
-
-    e13 = tracker.create_employee(
-        name="Marcus Reed",
-        role="Frontend Developer",
-        start_date=date(2022, 7, 12),
-        salary=63000,
-        address="7 Grove Lane, Oxford",
-        permissions=["it_admin"],
-        password="Marcus@123"
-    )
-
-    e14 = tracker.create_employee(
-        name="Natalie Hughes",
-        role="Financial Controller",
-        start_date=date(2018, 4, 2),
-        salary=82000,
-        address="11 Harbour Road, Southampton",
-        permissions=["finance_edit"],
-        password="Natalie@123"
-    )
-
-    e15 = tracker.create_employee(
-        name="Oliver Grant",
-        role="IT Support Technician",
-        start_date=date(2023, 6, 5),
-        salary=35000,
-        address="62 Brook Street, Leicester",
-        permissions=["it_admin"],
-        password="Oliver@123"
-    )
-
-    e16 = tracker.create_employee(
-        name="Priya Shah",
-        role="Business Analyst",
-        start_date=date(2020, 2, 17),
-        salary=61000,
-        address="27 Station Road, Reading",
-        permissions=["hr_read"],
-        password="Priya@123"
-    )
-
-    e17 = tracker.create_employee(
-        name="Quentin Moore",
-        role="Security Engineer",
-        start_date=date(2019, 10, 28),
-        salary=75000,
-        address="3 Mill Lane, Cambridge",
-        permissions=["it_admin"],
-        password="Quentin@123"
-    )
-
-    e18 = tracker.create_employee(
-        name="Rachel Adams",
-        role="Customer Success Manager",
-        start_date=date(2021, 12, 1),
-        salary=54000,
-        address="88 Market Street, York",
-        permissions=[],
-        password="Rachel@123"
-    )
-
-    e19 = tracker.create_employee(
-        name="Samuel Davies",
-        role="Accountant",
-        start_date=date(2017, 9, 19),
-        salary=60000,
-        address="16 Bridge Road, Cardiff",
-        permissions=["payroll"],
-        password="Samuel@123"
-    )
-
-    e20 = tracker.create_employee(
-        name="Tara Wilson",
-        role="UX Designer",
-        start_date=date(2022, 4, 25),
-        salary=58000,
-        address="29 Queen Street, Newcastle",
-        permissions=[],
-        password="Tara@123"
-    )
-
-    e21 = tracker.create_employee(
-        name="Umar Khan",
-        role="Technical Architect",
-        start_date=date(2016, 3, 7),
-        salary=90000,
-        address="2 Kingsway, Edinburgh",
-        permissions=[],
-        password="Umar@123"
-    )
-
-    e22 = tracker.create_employee(
-        name="Victoria Lewis",
-        role="HR Administrator",
-        start_date=date(2023, 8, 14),
-        salary=38000,
-        address="13 Chapel Street, Coventry",
-        permissions=["hr_read"],
-        password="Victoria@123"
-    )
-
-    e23 = tracker.create_employee(
-        name="William Scott",
-        role="Product Manager",
-        start_date=date(2020, 11, 23),
-        salary=77000,
-        address="40 City Road, Glasgow",
-        permissions=[],
-        password="William@123"
-    )
-
-    e24 = tracker.create_employee(
-        name="Xenia Brooks",
-        role="Compliance Officer",
-        start_date=date(2019, 1, 15),
-        salary=62000,
-        address="6 Manor Close, Plymouth",
-        permissions=["hr_read", "payroll"],
-        password="Xenia@123"
-    )
-
-    e25 = tracker.create_employee(
-        name="Yusuf Ali",
-        role="Network Engineer",
-        start_date=date(2021, 7, 6),
-        salary=69000,
-        address="55 Green Lane, Derby",
-        permissions=["it_admin"],
-        password="Yusuf@123"
-    )
-    
+    # Created together so the passwords are hashed across every core, rather than one at a time
+    # The sample passwords are public anyway, so they are hashed cheaply. Each is upgraded to the full cost the first time it is used to log in
+    with hashing_cost("fast"):
+        e1, e2, e3, e4, e5, e6, e7, e8, e9, e10, e11, e12, e13, e14, e15, e16, e17, e18, e19, e20, e21, e22, e23, e24, e25 = tracker.create_employees([
+            dict(
+                name="Alice Johnson",
+                role="HR Manager",
+                start_date=date(2021, 4, 12),
+                salary=52000,
+                address="10 King Street, London",
+                permissions=["hr_read","hr_write"],
+                password="Alice@123"
+            ),
+            dict(
+                name="Ben Carter",
+                role="Software Engineer",
+                start_date=date(2022, 9, 5),
+                salary=65000,
+                address="22 Baker Street, London",
+                permissions=["it_admin"],
+                password="Ben@123"
+            ),
+            dict(
+                name="Chloe Singh",
+                role="Payroll Specialist",
+                start_date=date(2020, 1, 20),
+                salary=48000,
+                address="18 High Road, Croydon",
+                permissions=["payroll", "hr_read"],
+                password="Chloe@123"
+            ),
+            dict(
+                name="Daniel Evans",
+                role="Customer Support",
+                start_date=date(2023, 2, 1),
+                salary=32000,
+                address="3 Station Road, Watford",
+                permissions=[],
+                password="Daniel@123"
+            ),
+            dict(
+                name="Evelyn Brown",
+                role="Finance Analyst",
+                start_date=date(2021, 11, 15),
+                salary=56000,
+                address="77 Queensway, London",
+                permissions=["payroll"],
+                password="Evelyn@123"
+            ),
+            dict(
+                name="Frank Mitchell",
+                role="Backend Developer",
+                start_date=date(2020, 6, 8),
+                salary=68000,
+                address="14 Elm Street, Manchester",
+                permissions=["it_admin"],
+                password="Frank@123"
+            ),
+            dict(
+                name="Grace Turner",
+                role="Recruitment Officer",
+                start_date=date(2022, 3, 14),
+                salary=45000,
+                address="22 Victoria Road, Birmingham",
+                permissions=["hr_read"],
+                password="Grace@123"
+            ),
+            dict(
+                name="Hannah Patel",
+                role="Data Analyst",
+                start_date=date(2021, 9, 30),
+                salary=59000,
+                address="5 Riverside Drive, Leeds",
+                permissions=["it_admin"],
+                password="Hannah@123"
+            ),
+            dict(
+                name="Ian Robertson",
+                role="Systems Administrator",
+                start_date=date(2019, 11, 18),
+                salary=72000,
+                address="31 Hill Lane, Bristol",
+                permissions=["it_admin"],
+                password="Ian@123"
+            ),
+            dict(
+                name="Jasmine Clark",
+                role="Payroll Assistant",
+                start_date=date(2023, 1, 9),
+                salary=40000,
+                address="9 Oak Avenue, Liverpool",
+                permissions=["payroll"],
+                password="Jasmine@123"
+            ),
+            dict(
+                name="Kevin O'Neill",
+                role="DevOps Engineer",
+                start_date=date(2020, 8, 3),
+                salary=70000,
+                address="18 Park Crescent, Nottingham",
+                permissions=["it_admin"],
+                password="Kevin@123"
+            ),
+            dict(
+                name="Laura Simmons",
+                role="HR Advisor",
+                start_date=date(2021, 5, 21),
+                salary=48000,
+                address="44 Maple Street, Sheffield",
+                permissions=["hr_read", "hr_write"],
+                password="Laura@123"
+            ),
+            dict(
+                name="Marcus Reed",
+                role="Frontend Developer",
+                start_date=date(2022, 7, 12),
+                salary=63000,
+                address="7 Grove Lane, Oxford",
+                permissions=["it_admin"],
+                password="Marcus@123"
+            ),
+            dict(
+                name="Natalie Hughes",
+                role="Financial Controller",
+                start_date=date(2018, 4, 2),
+                salary=82000,
+                address="11 Harbour Road, Southampton",
+                permissions=["finance_edit"],
+                password="Natalie@123"
+            ),
+            dict(
+                name="Oliver Grant",
+                role="IT Support Technician",
+                start_date=date(2023, 6, 5),
+                salary=35000,
+                address="62 Brook Street, Leicester",
+                permissions=["it_admin"],
+                password="Oliver@123"
+            ),
+            dict(
+                name="Priya Shah",
+                role="Business Analyst",
+                start_date=date(2020, 2, 17),
+                salary=61000,
+                address="27 Station Road, Reading",
+                permissions=["hr_read"],
+                password="Priya@123"
+            ),
+            dict(
+                name="Quentin Moore",
+                role="Security Engineer",
+                start_date=date(2019, 10, 28),
+                salary=75000,
+                address="3 Mill Lane, Cambridge",
+                permissions=["it_admin"],
+                password="Quentin@123"
+            ),
+            dict(
+                name="Rachel Adams",
+                role="Customer Success Manager",
+                start_date=date(2021, 12, 1),
+                salary=54000,
+                address="88 Market Street, York",
+                permissions=[],
+                password="Rachel@123"
+            ),
+            dict(
+                name="Samuel Davies",
+                role="Accountant",
+                start_date=date(2017, 9, 19),
+                salary=60000,
+                address="16 Bridge Road, Cardiff",
+                permissions=["payroll"],
+                password="Samuel@123"
+            ),
+            dict(
+                name="Tara Wilson",
+                role="UX Designer",
+                start_date=date(2022, 4, 25),
+                salary=58000,
+                address="29 Queen Street, Newcastle",
+                permissions=[],
+                password="Tara@123"
+            ),
+            dict(
+                name="Umar Khan",
+                role="Technical Architect",
+                start_date=date(2016, 3, 7),
+                salary=90000,
+                address="2 Kingsway, Edinburgh",
+                permissions=[],
+                password="Umar@123"
+            ),
+            dict(
+                name="Victoria Lewis",
+                role="HR Administrator",
+                start_date=date(2023, 8, 14),
+                salary=38000,
+                address="13 Chapel Street, Coventry",
+                permissions=["hr_read"],
+                password="Victoria@123"
+            ),
+            dict(
+                name="William Scott",
+                role="Product Manager",
+                start_date=date(2020, 11, 23),
+                salary=77000,
+                address="40 City Road, Glasgow",
+                permissions=[],
+                password="William@123"
+            ),
+            dict(
+                name="Xenia Brooks",
+                role="Compliance Officer",
+                start_date=date(2019, 1, 15),
+                salary=62000,
+                address="6 Manor Close, Plymouth",
+                permissions=["hr_read", "payroll"],
+                password="Xenia@123"
+            ),
+            dict(
+                name="Yusuf Ali",
+                role="Network Engineer",
+                start_date=date(2021, 7, 6),
+                salary=69000,
+                address="55 Green Lane, Derby",
+                permissions=["it_admin"],
+                password="Yusuf@123"
+            ),
+        ])
 
     d1 = tracker.create_department(
         name="Human Resources",
@@ -0,0 +1,242 @@
+from bisect import bisect_left, bisect_right
+from operator import itemgetter
+
+# Indexes over one attribute of the records in a table, so queries don't have to check every record
+# They are kept up to date a record at a time (see TableIndexes.update), rather than rebuilt after every change
+
+# Keeps the records' values sorted, so the keys with a value in a range are found by bisecting rather than scanning
+# Entries are ordered by value and then by key, so a record's entry can be found again to remove it
+# They are held as a list of chunks, each a pair of parallel lists of values and keys, with the last entry of each chunk kept in _maxes
+# A single sorted list would need a million pointers moved for each change at 1M records. With chunks only one chunk's worth is moved
+# A range query costs O(log n + k) for k results, and adding or removing a record O(log n) plus a move within one chunk
+CHUNK_SIZE = 1000
+
+class SortedIndex:
+    def __init__(self, attribute: str):
+        self.attribute = attribute
+        self._chunks = []
+        self._maxes = []
+        # The value each key was indexed under, so it can still be found after the record has changed
+        self._indexed = {}
+
+    def __len__(self):
+        return len(self._indexed)
+
+    # Sorting everything at once is much quicker than adding records one at a time
+    def build(self, records: dict):
+        entries = sorted((getattr(record, self.attribute), key) for key, record in records.items())
+        self._chunks = []
+        for start in range(0, len(entries), CHUNK_SIZE):
+            chunk = entries[start:start + CHUNK_SIZE]
+            self._chunks.append(([value for value, _ in chunk], [key for _, key in chunk]))
+        self._maxes = [(values[-1], keys[-1]) for values, keys in self._chunks]
+        self._indexed = {key: value for value, key in entries}
+
+    # Whether the record is indexed under its current value
+    def holds(self, key, record) -> bool:
+        return key in self._indexed and self._indexed[key] == getattr(record, self.attribute)
+
+    def add(self, key, record):
+        value = getattr(record, self.attribute)
+        if not self._chunks:
+            self._chunks.append(([value], [key]))
+            self._maxes.append((value, key))
+            self._indexed[key] = value
+            return
+        # The first chunk whose last entry comes after this one, or the last chunk if none does
+        number = min(bisect_left(self._maxes, (value, key)), len(self._chunks) - 1)
+        values, keys = self._chunks[number]
+        position = self._position(values, keys, value, key)
+        values.insert(position, value)
+        keys.insert(position, key)
+        self._indexed[key] = value
+        if position == len(values) - 1:
+            self._maxes[number] = (value, key)
+        # Full chunks are split in two, so no chunk grows much past CHUNK_SIZE
+        if len(values) > 2 * CHUNK_SIZE:
+            self._chunks[number:number + 1] = [(values[:CHUNK_SIZE], keys[:CHUNK_SIZE]), (values[CHUNK_SIZE:], keys[CHUNK_SIZE:])]
+            self._maxes[number:number + 1] = [(values[CHUNK_SIZE - 1], keys[CHUNK_SIZE - 1]), (values[-1], keys[-1])]
+
+    def remove(self, key):
+        if key not in self._indexed:
+            return
+        value = self._indexed.pop(key)
+        number = bisect_left(self._maxes, (value, key))
+        values, keys = self._chunks[number]
+        position = self._position(values, keys, value, key)
+        del values[position]
+        del keys[position]
+        if not values:
+            del self._chunks[number]
+            del self._maxes[number]
+        elif position == len(values):
+            self._maxes[number] = (values[-1], keys[-1])
+
+    # Where (value, key) is, or would go, within a chunk. Equal values are ordered by key, so the keys are bisected between them
+    @staticmethod
+    def _position(values, keys, value, key) -> int:
+        low = bisect_left(values, value)
+        high = bisect_right(values, value, low)
+        return bisect_left(keys, key, low, high)
+
+    # The chunk and position of the first entry with a value of at least low, and of the first with a value above high
+    def _bounds(self, low, high):
+        if low is None:
+            start = (0, 0)
+        else:
+            number = bisect_left(self._maxes, low, key=itemgetter(0))
+            start = (number, bisect_left(self._chunks[number][0], low) if number < len(self._chunks) else 0)
+        if high is None:
+            end = (len(self._chunks), 0)
+        else:
+            number = bisect_right(self._maxes, high, key=itemgetter(0))
+            end = (number, bisect_right(self._chunks[number][0], high) if number < len(self._chunks) else 0)
+        return start, end
+
+    # Keys of the records with low <= value <= high, in order of value. Either end can be None for no limit
+    def range(self, low=None, high=None) -> list:
+        (first, start), (last, end) = self._bounds(low, high)
+        if (first, start) >= (last, end):
+            return []
+        if first == last:
+            return self._chunks[first][1][start:end]
+        found = self._chunks[first][1][start:]
+        for number in range(first + 1, last):
+            found.extend(self._chunks[number][1])
+        if last < len(self._chunks):
+            found.extend(self._chunks[last][1][:end])
+        return found
+
+    # How many records range(low, high) would return, without building the list
+    def count(self, low=None, high=None) -> int:
+        (first, start), (last, end) = self._bounds(low, high)
+        if (first, start) >= (last, end):
+            return 0
+        return sum(len(keys) for _, keys in self._chunks[first:last]) - start + end
+
+# Finds the records whose text contains a search, ignoring case, without checking every record
+# The text is one or more string attributes joined with spaces, lowercased. Every three character run in it (trigram) maps to the keys whose text has it
+# Any text containing the search must have all of the search's trigrams, so only the keys in every one of their postings are checked
+class TrigramIndex:
+    def __init__(self, attributes: tuple):
+        self.attributes = attributes
+        self._postings = {}
+        # The text each key was indexed under, to check candidates against and to find its postings again when it is removed
+        self._indexed = {}
+
+    def __len__(self):
+        return len(self._indexed)
+
+    # Missing values (None) are indexed as empty, anything else that isn't a string can't be searched
+    def _text(self, record) -> str:
+        values = [getattr(record, attribute) or "" for attribute in self.attributes]
+        if not all(isinstance(value, str) for value in values):
+            raise TypeError(f"{', '.join(self.attributes)} must be strings to be searched")
+        return " ".join(values).lower()
+
+    @staticmethod
+    def _trigrams(text: str) -> set:
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+
+    def build(self, records: dict):
+        self._postings = {}
+        self._indexed = {}
+        for key, record in records.items():
+            self._insert(key, self._text(record))
+
+    def holds(self, key, record) -> bool:
+        return key in self._indexed and self._indexed[key] == self._text(record)
+
+    def add(self, key, record):
+        self._insert(key, self._text(record))
+
+    def _insert(self, key, text):
+        self._indexed[key] = text
+        for trigram in self._trigrams(text):
+            self._postings.setdefault(trigram, set()).add(key)
+
+    def remove(self, key):
+        if key not in self._indexed:
+            return
+        for trigram in self._trigrams(self._indexed.pop(key)):
+            postings = self._postings[trigram]
+            postings.discard(key)
+            if not postings:
+                del self._postings[trigram]
+
+    # Whether a search is long enough to have a trigram, and so can be answered by search()
+    @staticmethod
+    def can_search(text: str) -> bool:
+        return len(text) >= 3
+
+    # At most how many keys search() could return: the size of the smallest posting among the search's trigrams
+    # Cheap enough to work out for every search when planning a query (see utils/query.py)
+    def estimate(self, text: str) -> int:
+        if not self.can_search(text):
+            raise ValueError("searches need at least 3 characters to use the index")
+        return min(len(self._postings.get(trigram, ())) for trigram in self._trigrams(text.lower()))
+
+    # The keys whose text contains the search, ignoring case, as a set in no particular order
+    # The postings are intersected smallest first, so the work depends on the rarest trigram in the search rather than the number of records
+    def search(self, text: str) -> set:
+        if not self.can_search(text):
+            raise ValueError("searches need at least 3 characters to use the index")
+        text = text.lower()
+        postings = sorted((self._postings.get(trigram, set()) for trigram in self._trigrams(text)), key=len)
+        candidates = postings[0].intersection(*postings[1:])
+        return {key for key in candidates if text in self._indexed[key]}
+
+# The indexes over one table, by name, kept up to date together
+# Each index is only built the first time a query asks for it (see build), so e.g. a salary range doesn't pay to build the trigram index
+# Also remembers the order records were added in, so results found through an index can be put back in table order
+class TableIndexes:
+    def __init__(self, indexes: dict):
+        self.indexes = indexes
+        self._built = set()
+        self._positions = None
+        self._next_position = 0
+
+    def __getitem__(self, name):
+        return self.indexes[name]
+
+    # The indexes that have been built, by name. Only these are kept up to date, and only these can answer queries
+    def built(self) -> dict:
+        return {name: index for name, index in self.indexes.items() if name in self._built}
+
+    # Builds the named indexes (all of them if none are named) that aren't built already
+    # An index that fails to build (e.g. values that can't be sorted) raises, and is tried again next time it is asked for
+    def build(self, records: dict, names=None):
+        if self._positions is None:
+            self._positions = {key: position for position, key in enumerate(records)}
+            self._next_position = len(self._positions)
+        for name in self.indexes if names is None else names:
+            if name not in self._built:
+                self.indexes[name].build(records)
+                self._built.add(name)
+
+    # Called after a record is added, changed or removed. record is None if it has been removed
+    # Indexes whose attribute hasn't changed are left alone, so e.g. a change of name doesn't move anything in the salary index
+    def update(self, key, record):
+        if self._positions is None:
+            return
+        built = [self.indexes[name] for name in self._built]
+        if record is None:
+            self._positions.pop(key, None)
+            for index in built:
+                index.remove(key)
+            return
+        if key not in self._positions:
+            self._positions[key] = self._next_position
+            self._next_position += 1
+        for index in built:
+            if not index.holds(key, record):
+                index.remove(key)
+                index.add(key, record)
+
+    # Puts keys found through the indexes back in the order of the table
+    # Sorting costs O(k log k), so once there are many keys it is quicker to walk the table (passed as records) and keep the ones found
+    def in_table_order(self, keys, records=None) -> list:
+        if records is not None and len(keys) * 8 > len(records):
+            wanted = set(keys)
+            return [key for key in records if key in wanted]
+        return sorted(keys, key=self._positions.__getitem__)
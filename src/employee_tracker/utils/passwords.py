@@ -3,49 +3,126 @@ import os
 import base64
 import hmac
 import binascii
+import re
+import time
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 
-def hash_password(password: str) -> str:
+# Hashes are stored as "pbkdf2_sha256$<iterations>$<salt>$<key>", with the salt and key in base64
+# Each hash records its own cost, so the number of iterations can be raised without breaking passwords that are already stored
+# Hashes from before this format (base64 of salt + key, always 200,000 iterations) still verify, and are upgraded at the next login (see auth.login)
+ALGORITHM = "pbkdf2_sha256"
+SALT_LEN = 16
+KEY_LEN = 32
+LEGACY_ITERATIONS = 200_000
+# "fast" is far too cheap to protect real passwords. It is for tests and sample data, whose hashes are upgraded when someone logs in
+PROFILES = {"default": 200_000, "fast": 1_000}
+ITERATIONS = PROFILES["default"]
+HASH_PATTERN = re.compile(rf"{ALGORITHM}\$([1-9][0-9]{{0,9}})\$([A-Za-z0-9+/]{{22}}==)\$([A-Za-z0-9+/]{{43}}=)")
+
+# Sets the cost of new hashes. Either a number of iterations or the name of one of PROFILES
+def set_iterations(iterations):
+    global ITERATIONS
+    iterations = PROFILES.get(iterations, iterations)
+    if not isinstance(iterations, int) or isinstance(iterations, bool) or iterations < 1:
+        raise ValueError(f"iterations must be a whole number of at least 1 or one of {', '.join(PROFILES)}")
+    ITERATIONS = iterations
+
+# Hashes with a different cost inside a with block, e.g. with hashing_cost("fast"): ...
+@contextmanager
+def hashing_cost(iterations):
+    previous = ITERATIONS
+    set_iterations(iterations)
+    try:
+        yield
+    finally:
+        set_iterations(previous)
+
+# Times PBKDF2 on this machine and returns the iterations that take about target_seconds, for set_iterations
+# Never goes below minimum, so slow hardware still gets a reasonable cost
+def calibrate(target_seconds: float = 0.25, minimum: int = 100_000) -> int:
+    iterations = 10_000
+    # Doubled until the run is long enough to time reliably
+    while True:
+        started = time.perf_counter()
+        hashlib.pbkdf2_hmac("sha256", b"calibration", os.urandom(SALT_LEN), iterations)
+        elapsed = time.perf_counter() - started
+        if elapsed >= 0.05:
+            break
+        iterations *= 2
+    # Rounded to the thousand, so hashes made on similar machines share a cost
+    scaled = round(iterations * target_seconds / elapsed, -3)
+    return max(int(scaled), minimum)
+
+def hash_password(password: str, iterations: int = None) -> str:
+    iterations = iterations or ITERATIONS
     # password salt created
-    salt = os.urandom(16)
+    salt = os.urandom(SALT_LEN)
 
     # password hashed
     key = hashlib.pbkdf2_hmac(
         "sha256",
         password.encode("utf-8"),
         salt,
-        200_000
+        iterations
     )
-    # resultant value needs decoding in order to be stored
-    return base64.b64encode(salt + key).decode("utf-8")
+    # resultant values need encoding in order to be stored
+    return f"{ALGORITHM}${iterations}${_b64(salt)}${_b64(key)}"
+
+def _b64(value: bytes) -> str:
+    return base64.b64encode(value).decode("utf-8")
+
+# Splits a stored hash into its iterations, salt and key. Raises ValueError if it isn't in either format
+def _parse(stored_hash: str):
+    if not isinstance(stored_hash, str) or not stored_hash:
+        raise ValueError("not a valid password hash")
+    match = HASH_PATTERN.fullmatch(stored_hash)
+    if match:
+        return int(match.group(1)), base64.b64decode(match.group(2)), base64.b64decode(match.group(3))
+    try:
+        decoded = base64.b64decode(stored_hash, validate=True)
+    except (binascii.Error, ValueError):
+        raise ValueError("not a valid password hash")
+    if len(decoded) != SALT_LEN + KEY_LEN:
+        raise ValueError("not a valid password hash")
+    return LEGACY_ITERATIONS, decoded[:SALT_LEN], decoded[SALT_LEN:]
 
-# password is checked, by splitting stored hash, and using salt value to hash check value.
+# Hashes many passwords at once, returning the hashes in the same order
+# PBKDF2 releases the GIL while it runs, so a thread pool spreads the work over every core without the cost of starting processes
+def hash_passwords(passwords: list, workers: int = None) -> list:
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(passwords) < 2:
+        return [hash_password(password) for password in passwords]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(hash_password, passwords))
+
+# password is checked, by splitting stored hash, and using its salt and iterations to hash check value.
 ### AI DECLARATION - this hashing function was originally created by AI, the developer implemented once learnings had been sought on implementation of hashing and salts
 def verify_password(password:str, stored_hash: str) -> bool:
-    decoded = base64.b64decode(stored_hash.encode("utf-8"))
-    salt = decoded[:16]
-    stored_key = decoded[16:]
+    try:
+        iterations, salt, stored_key = _parse(stored_hash)
+    except ValueError:
+        return False
     new_key = hashlib.pbkdf2_hmac(
         "sha256",
         password.encode("utf-8"),
         salt,
-        200_000
+        iterations
     )
     # stored hash and computed hash are compared and the result returned
     return hmac.compare_digest(new_key, stored_key)
 
-# for validation, hash value is checked to validate that it follows the pattern used in above methods
-def is_valid_stored_password_hash(value:str) -> bool:
-
-    SALT_LEN = 16
-    KEY_LEN = 32
-    TOTAL_LEN = SALT_LEN + KEY_LEN
+# True when a stored hash is cheaper than new hashes would be, or is in the old format, so should be replaced once the password is known
+def needs_rehash(stored_hash: str) -> bool:
+    if not HASH_PATTERN.fullmatch(stored_hash):
+        return True
+    iterations, _, _ = _parse(stored_hash)
+    return iterations < ITERATIONS
 
-    if not isinstance(value,str) or not value:
-        return False
-    
+# for validation, hash value is checked to validate that it follows one of the formats above
+def is_valid_stored_password_hash(value:str) -> bool:
     try:
-        decoded = base64.b64decode(value, validate= True)
-    except (binascii.Error, ValueError):
+        _parse(value)
+    except ValueError:
         return False
-    
-    return len(decoded) == TOTAL_LEN
\ No newline at end of file
+    return True
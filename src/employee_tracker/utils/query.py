@@ -0,0 +1,301 @@
+import heapq
+from itertools import islice
+from operator import attrgetter
+
+from employee_tracker.utils.filtering import check_filter_value, matches_filter
+from employee_tracker.utils.indexes import SortedIndex, TrigramIndex
+
+# A small query engine for the tracker's tables (see Tracker.query)
+# A Query says what is wanted, plan_query decides how to find it using the table's indexes, and Plan.matches finds it
+# Tracker.query hands back a QueryResult, which only runs the plan when its records are used, and only as far as they are used
+# Tracker.list_employees and list_departments build a Query from their arguments, so they work as they always have
+
+# An index is only intersected with the candidates from the most selective one when it is at most this many times bigger
+# Past that, reading its keys costs more than checking its predicate against each candidate
+INTERSECT_RATIO = 4
+
+# One filter on one attribute, matching as filter_list does: "string" (the attribute contains the value), "min" or "max" (inclusive)
+class Predicate:
+    def __init__(self, attribute: str, kind: str, value):
+        if not isinstance(attribute, str):
+            raise TypeError("attribute must be a string")
+        check_filter_value(value, kind)
+        self.attribute = attribute
+        self.kind = kind
+        self.value = value
+
+    def matches(self, record) -> bool:
+        return matches_filter(getattr(record, self.attribute), self.value, self.kind)
+
+    def __repr__(self):
+        return f"Predicate({self.attribute!r}, {self.kind!r}, {self.value!r})"
+
+# The records of a table passing every predicate
+# They come in table order unless sort names an attribute to sort by ("-salary" for highest first), then offset records are skipped and at most limit returned
+class Query:
+    def __init__(self, table: str, predicates=(), sort: str = None, limit: int = None, offset: int = 0):
+        predicates = list(predicates)
+        if not all(isinstance(predicate, Predicate) for predicate in predicates):
+            raise TypeError("predicates must be Predicate objects")
+        if sort is not None and not isinstance(sort, str):
+            raise TypeError("sort must be the name of an attribute")
+        for name, value in (("limit", limit), ("offset", offset)):
+            if value is None and name == "limit":
+                continue
+            if isinstance(value, bool) or not isinstance(value, int):
+                raise TypeError(f"{name} must be an integer")
+            if value < 0:
+                raise ValueError(f"{name} can't be negative")
+        self.table = table
+        self.predicates = predicates
+        self.sort = sort
+        self.limit = limit
+        self.offset = offset
+
+    # The same query, narrowed to limit records starting offset records into its own results
+    def window(self, offset: int = 0, limit: int = None) -> "Query":
+        start = self.offset + offset
+        end = None if self.limit is None else max(self.offset + self.limit, start)
+        if limit is not None:
+            end = start + limit if end is None else min(end, start + limit)
+        return Query(self.table, self.predicates, self.sort, None if end is None else end - start, start)
+
+    def __repr__(self):
+        return f"Query({self.table!r}, {self.predicates!r}, sort={self.sort!r}, limit={self.limit!r}, offset={self.offset!r})"
+
+# One way of narrowing a table down with one of its indexes. estimate is at most how many keys it gives
+# Ranges from a sorted index are exact, so their predicates don't need checking again. Trigram searches ignore case and can match across attributes, so theirs do
+class IndexStep:
+    def __init__(self, name: str, index, predicates: list, estimate: int):
+        self.name = name
+        self.index = index
+        self.predicates = predicates
+        self.estimate = estimate
+        self.exact = isinstance(index, SortedIndex)
+
+    def keys(self):
+        if self.exact:
+            return self.index.range(*_range(self.predicates))
+        return self.index.search(self.predicates[0].value)
+
+    def __repr__(self):
+        return f"IndexStep({self.name!r}, {self.predicates!r}, estimate={self.estimate})"
+
+# How a query is run: the keys from the first step, intersected with the keys from the rest, then each record found checked against checks
+# With no steps every record in the table is checked
+class Plan:
+    def __init__(self, steps: list, checks: list):
+        self.steps = steps
+        self.checks = checks
+
+    def __repr__(self):
+        return f"Plan(steps={self.steps!r}, checks={self.checks!r})"
+
+    # The query's records, found as they are iterated over. indexes are the table's TableIndexes, only needed if there are steps
+    # Without a sort, records are checked only until enough have been found. With a sort and a limit only the first offset + limit are kept in order
+    def matches(self, query: Query, records: dict, indexes=None):
+        found = self._found(records, indexes)
+        stop = None if query.limit is None else query.offset + query.limit
+        if query.sort is not None:
+            key = attrgetter(query.sort.lstrip("-"))
+            descending = query.sort.startswith("-")
+            # nsmallest and nlargest give the same records in the same order as sorted(...)[:stop], ties included
+            if stop is None:
+                found = sorted(found, key=key, reverse=descending)
+            else:
+                found = (heapq.nlargest if descending else heapq.nsmallest)(stop, found, key=key)
+        return islice(found, query.offset, stop)
+
+    def run(self, query: Query, records: dict, indexes=None) -> list:
+        return list(self.matches(query, records, indexes))
+
+    # How many records the query gives, without building any of them into a list
+    # When every predicate is met exactly by at most one index, the count comes from the index (or the table) without looking at any records
+    def count(self, query: Query, records: dict, indexes=None) -> int:
+        if self.checks or len(self.steps) > 1 or (self.steps and not self.steps[0].exact):
+            total = sum(1 for _ in self._found(records, indexes))
+        else:
+            total = self.steps[0].estimate if self.steps else len(records)
+        total = max(total - query.offset, 0)
+        return total if query.limit is None else min(total, query.limit)
+
+    # The records passing every predicate, in table order, checked one at a time as they are asked for
+    def _found(self, records: dict, indexes=None):
+        if self.steps:
+            keys = self.steps[0].keys()
+            if len(self.steps) > 1:
+                keys = set(keys)
+                for step in self.steps[1:]:
+                    keys.intersection_update(step.keys())
+            found = map(records.__getitem__, indexes.in_table_order(keys, records))
+        else:
+            found = iter(records.values())
+        for predicate in self.checks:
+            found = filter(predicate.matches, found)
+        return found
+
+# The records a query finds, found only when they're used
+# Iterating runs the query lazily, so stopping early (e.g. after the first page) never looks at the rest of the table
+# Each use runs the query again, against the table as it is then, so a result kept by a window stays current
+# prepare is called with a query and returns the Plan to run it with, the table, and the table's indexes (see Tracker.query)
+# It also works as a read only list, so code that was given a list by list_employees still works
+# list(result) asks for len() first, which is a count of the whole result, so list(iter(result)) is used here to build lists in one pass
+class QueryResult:
+    def __init__(self, query: Query, prepare):
+        self.query = query
+        self._prepare = prepare
+
+    def __iter__(self):
+        plan, records, indexes = self._prepare(self.query)
+        return plan.matches(self.query, records, indexes)
+
+    # How many records there are, counted without building them into a list
+    def count(self) -> int:
+        plan, records, indexes = self._prepare(self.query)
+        return plan.count(self.query, records, indexes)
+
+    def __len__(self):
+        return self.count()
+
+    def __bool__(self):
+        for _ in self:
+            return True
+        return False
+
+    def limit(self, limit: int) -> "QueryResult":
+        return QueryResult(self.query.window(limit=limit), self._prepare)
+
+    def offset(self, offset: int) -> "QueryResult":
+        return QueryResult(self.query.window(offset=offset), self._prepare)
+
+    def first(self):
+        return next(iter(self.limit(1)), None)
+
+    # One page of size records. cursor is where the page starts, None for the first page, or the next_cursor of the page before
+    def page(self, size: int, cursor: int = None) -> "Page":
+        if isinstance(size, bool) or not isinstance(size, int) or size < 1:
+            raise ValueError("size must be a whole number of at least 1")
+        cursor = cursor or 0
+        # One record more than the page is found, to tell whether there is a page after it
+        records = list(iter(self.offset(cursor).limit(size + 1)))
+        return Page(records[:size], cursor, cursor + size if len(records) > size else None)
+
+    # Every page in turn, found from one run of the query, so later pages carry on from where the page before stopped
+    def pages(self, size: int):
+        if isinstance(size, bool) or not isinstance(size, int) or size < 1:
+            raise ValueError("size must be a whole number of at least 1")
+        found = iter(self)
+        cursor = 0
+        records = list(islice(found, size))
+        while records:
+            following = list(islice(found, size))
+            yield Page(records, cursor, cursor + size if following else None)
+            cursor += size
+            records = following
+
+    # Whole numbers from the start and slices with no step are found lazily. Anything else needs every record, so is worked out from a list
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            if position.step in (None, 1) and (position.start or 0) >= 0 and (position.stop is None or position.stop >= 0):
+                start = position.start or 0
+                return self.offset(start) if position.stop is None else self.offset(start).limit(max(position.stop - start, 0))
+            return list(iter(self))[position]
+        if isinstance(position, int) and position >= 0:
+            for record in self.offset(position).limit(1):
+                return record
+            raise IndexError("query result index out of range")
+        return list(iter(self))[position]
+
+    def __contains__(self, item):
+        return any(record is item or record == item for record in self)
+
+    def __eq__(self, other):
+        if isinstance(other, (QueryResult, list, tuple)):
+            return list(iter(self)) == list(iter(other))
+        return NotImplemented
+
+    def __repr__(self):
+        return f"QueryResult({self.query!r})"
+
+# One page of a QueryResult: its records, where it started, and where the next page starts (None if this is the last)
+class Page:
+    def __init__(self, records: list, cursor: int, next_cursor: int = None):
+        self.records = records
+        self.cursor = cursor
+        self.next_cursor = next_cursor
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def __len__(self):
+        return len(self.records)
+
+# Records found by a query, looked up in the table only as they are used
+# ids are the keys, so a report that only needs to count or export ids never touches the records themselves
+class RecordView:
+    def __init__(self, ids: list, records: dict):
+        self.ids = ids
+        self._records = records
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return RecordView(self.ids[position], self._records)
+        return self._records[self.ids[position]]
+
+    def __iter__(self):
+        return map(self._records.__getitem__, self.ids)
+
+    def __repr__(self):
+        return f"RecordView({len(self.ids)} records)"
+
+# The lowest and highest value allowed by min and max predicates on one attribute, None where there is no limit
+def _range(predicates: list):
+    lows = [predicate.value for predicate in predicates if predicate.kind == "min"]
+    highs = [predicate.value for predicate in predicates if predicate.kind == "max"]
+    return (max(lows) if lows else None), (min(highs) if highs else None)
+
+# The steps each of a table's built indexes could answer for a query, with their estimates
+def _possible_steps(query: Query, indexes) -> list:
+    steps = []
+    for name, index in indexes.built().items():
+        if isinstance(index, SortedIndex):
+            predicates = [predicate for predicate in query.predicates if predicate.kind != "string" and predicate.attribute == index.attribute]
+            if predicates:
+                steps.append(IndexStep(name, index, predicates, index.count(*_range(predicates))))
+        elif isinstance(index, TrigramIndex):
+            for predicate in query.predicates:
+                if predicate.kind == "string" and predicate.attribute in index.attributes and index.can_search(predicate.value):
+                    steps.append(IndexStep(name, index, [predicate], index.estimate(predicate.value)))
+    return steps
+
+# The names of a table's indexes that could help with a query, so only those need building. candidates maps index names to their (unbuilt) indexes
+def useful_indexes(query: Query, candidates: dict) -> list:
+    names = []
+    for name, index in candidates.items():
+        for predicate in query.predicates:
+            if isinstance(index, SortedIndex) and predicate.kind != "string" and predicate.attribute == index.attribute:
+                names.append(name)
+                break
+            if isinstance(index, TrigramIndex) and predicate.kind == "string" and predicate.attribute in index.attributes and index.can_search(predicate.value):
+                names.append(name)
+                break
+    return names
+
+# Picks the most selective index first, by the estimates each index gives for the query, then any others close enough in size to be worth intersecting
+# Predicates not met exactly by a step are checked on each record, most selective first as far as the indexes can tell
+# size is how many records the table has. With it, a query for the first few records of a common match (e.g. a page) checks the table from the start instead
+# An index has to find every match to put them in table order, while checking from the start stops after about stop * size / matches records
+def plan_query(query: Query, indexes=None, size: int = None) -> Plan:
+    possible = sorted(_possible_steps(query, indexes), key=attrgetter("estimate")) if indexes is not None else []
+    steps = [step for step in possible if step is possible[0] or step.estimate <= INTERSECT_RATIO * possible[0].estimate]
+    if steps and size is not None and query.limit is not None and query.sort is None:
+        if (query.offset + query.limit) * size < steps[0].estimate ** 2:
+            steps = []
+    met = {id(predicate) for step in steps if step.exact for predicate in step.predicates}
+    estimates = {id(predicate): step.estimate for step in possible for predicate in step.predicates}
+    checks = [predicate for predicate in query.predicates if id(predicate) not in met]
+    checks.sort(key=lambda predicate: estimates.get(id(predicate), float("inf")))
+    return Plan(steps, checks)
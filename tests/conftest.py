@@ -0,0 +1,114 @@
+import pytest
+import time
+from datetime import date
+
+import employee_tracker.storage.storage as storage_module
+from employee_tracker.domain.tracker import Tracker
+from employee_tracker.utils.passwords import hashing_cost, hash_password
+
+# Hashing at the full cost makes every test that creates an employee slow, so tests use the cheap profile
+# Tests of the cost itself set it explicitly
+@pytest.fixture(autouse=True)
+def fast_password_hashing():
+    with hashing_cost("fast"):
+        yield
+
+# Stands in for the Tk root. Callbacks only run when the test calls run_due, in the order they are due
+class FakeRoot:
+    def __init__(self):
+        self.now = 0
+        self.callbacks = {}
+        self.next_id = 0
+    def after(self, ms, func):
+        self.next_id += 1
+        self.callbacks[self.next_id] = (self.now + ms, func)
+        return self.next_id
+    def after_cancel(self, id):
+        self.callbacks.pop(id, None)
+    def run_due(self, advance_ms):
+        self.now += advance_ms
+        while True:
+            due = [(when, id) for id, (when, _) in self.callbacks.items() if when <= self.now]
+            if not due:
+                return
+            _, id = min(due)
+            self.callbacks.pop(id)[1]()
+    # Background saves take real time, so this sleeps a little between steps
+    def run_until_idle(self):
+        for _ in range(500):
+            time.sleep(0.01)
+            self.run_due(100)
+            if not self.callbacks:
+                return
+
+@pytest.fixture
+def root():
+    return FakeRoot()
+
+# Stands in for a Tk listbox
+class FakeListbox:
+    def __init__(self, items=()):
+        self.items = list(items)
+    def delete(self, index):
+        self.items.pop(index)
+    def insert(self, index, text):
+        if index == "end":
+            self.items.append(text)
+        else:
+            self.items.insert(index, text)
+
+@pytest.fixture
+def listbox():
+    return FakeListbox()
+
+HASH = hash_password("password")
+
+# Arguments for create_employee, with the hash of "password" so nothing needs hashing
+def make_employee_kwargs(name="James", role="Creator", start_date=date(2024, 10, 2), salary=30000):
+    return dict(
+        name=name,
+        role=role,
+        start_date=start_date,
+        salary=salary,
+        address="123 Lane, Town, County",
+        password_hash=HASH
+    )
+
+@pytest.fixture
+def employee_kwargs():
+    return make_employee_kwargs
+
+# Three employees, two departments and two permissions saved to a backend (the csvs if it is None), as the backend tests use
+# Returns the tracker and its employees
+def make_example_tracker(backend=None):
+    trk = Tracker(backend=backend)
+    trk.create_permission("payroll")
+    trk.create_permission("hr_read")
+    e1 = trk.create_employee(**make_employee_kwargs("Steve", "Boss", date(2020, 1, 1), 90000), permissions=["payroll", "hr_read"])
+    e2 = trk.create_employee(**make_employee_kwargs("Stella", "Clerk", date(2024, 6, 1), 25000))
+    e3 = trk.create_employee(**make_employee_kwargs("Zoë", "Bossman", date(1965, 6, 1), 50000))
+    dep = trk.create_department("IT", "Computers", e1.id, members=[e1.id, e2.id])
+    trk.create_department("Help desk", "Tickets", e3.id, parent_department=dep.id)
+    trk.save_to_storage()
+    return trk, [e1, e2, e3]
+
+@pytest.fixture
+def example_tracker():
+    return make_example_tracker
+
+# A data folder of the test's own so the real csvs are left alone
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage_module, "DATA_DIR", tmp_path)
+    return tmp_path
+
+# A tracker with one employee, department and permission, saved to the test's data folder
+# Returns the tracker and the employee
+@pytest.fixture
+def saved_tracker(data_dir):
+    trk = Tracker()
+    trk.create_permission("payroll")
+    emp = trk.create_employee(**make_employee_kwargs())
+    trk.create_department("IT", "Computers", emp.id)
+    trk.save_to_storage()
+    return trk, emp
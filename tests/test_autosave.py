@@ -0,0 +1,68 @@
+import threading
+
+import employee_tracker.domain.tracker as tracker_module
+from employee_tracker.domain.tracker import Tracker
+from employee_tracker.gui.autosave import Autosave
+
+class TestAutosave:
+    def test_saves_after_changes_stop(self, saved_tracker, root):
+        trk, emp = saved_tracker
+        statuses = []
+        Autosave(root, trk, delay=5, on_status=statuses.append)
+        emp.salary = 40000
+        root.run_due(3000)
+        emp.salary = 50000
+        root.run_due(3000)
+        assert trk.has_unsaved_changes()
+        root.run_due(2000)
+        root.run_until_idle()
+        assert not trk.has_unsaved_changes()
+        assert Tracker.load_from_storage().employees[emp.id].salary == 50000
+        assert statuses[0] == "Saving..." and statuses[-1].startswith("Saved at")
+    def test_constant_changes_still_save_after_max_delay(self, saved_tracker, root):
+        trk, emp = saved_tracker
+        Autosave(root, trk, delay=5, max_delay=10)
+        for salary in range(40000, 40012):
+            emp.salary = salary
+            root.run_due(1000)
+        trk.wait_for_save()
+        assert Tracker.load_from_storage().employees[emp.id].salary >= 40009
+    def test_failed_save_is_reported_and_retried(self, saved_tracker, root, monkeypatch):
+        trk, emp = saved_tracker
+        statuses = []
+        Autosave(root, trk, delay=5, on_status=statuses.append)
+        write_csv = tracker_module.write_csv
+        def failing_write(table, df):
+            raise OSError("disk full")
+        monkeypatch.setattr(tracker_module, "write_csv", failing_write)
+        emp.salary = 40000
+        root.run_due(5000)
+        trk.wait_for_save()
+        root.run_due(100)
+        assert statuses[-1] == "Autosave failed: disk full"
+        assert trk.has_unsaved_changes()
+        monkeypatch.setattr(tracker_module, "write_csv", write_csv)
+        root.run_until_idle()
+        assert not trk.has_unsaved_changes()
+    def test_writes_happen_off_the_calling_thread(self, saved_tracker, root, monkeypatch):
+        trk, emp = saved_tracker
+        Autosave(root, trk, delay=1)
+        release = threading.Event()
+        write_csv = tracker_module.write_csv
+        def slow_write(table, df):
+            release.wait(5)
+            write_csv(table, df)
+        monkeypatch.setattr(tracker_module, "write_csv", slow_write)
+        emp.salary = 40000
+        root.run_due(1000)
+        assert trk.is_saving()
+        release.set()
+        root.run_until_idle()
+        assert not trk.is_saving()
+    def test_stop_ends_autosaving(self, saved_tracker, root):
+        trk, emp = saved_tracker
+        autosave = Autosave(root, trk, delay=1)
+        autosave.stop()
+        emp.salary = 40000
+        root.run_until_idle()
+        assert trk.has_unsaved_changes()
@@ -0,0 +1,103 @@
+import os
+import pytest
+import zipfile
+import numpy as np
+from datetime import date
+
+from employee_tracker.domain.tracker import Tracker
+from employee_tracker.domain.employee import Employee
+from employee_tracker.storage.storage import create_dataframe
+from employee_tracker.storage.columnar_backend import ColumnarBackend, HAS_PYARROW, convert, main
+import employee_tracker.storage.storage as storage_module
+
+# Missing values (a department with no parent) come back as empty strings, as they do from the csvs
+def rows(trk):
+    return {table: [{k: "" if v is None else v for k, v in r.to_row().items()} for r in getattr(trk, table).values()] for table in ("employees", "departments", "permissions", "users")}
+
+FORMATS = [pytest.param("parquet", marks=pytest.mark.skipif(not HAS_PYARROW, reason="needs pyarrow")), "npz"]
+
+@pytest.fixture(params=FORMATS)
+def backend(request, tmp_path, monkeypatch):
+    monkeypatch.setattr(storage_module, "DATA_DIR", tmp_path)
+    return ColumnarBackend(request.param)
+
+class TestColumnarBackend:
+    def test_missing_file_raises_file_not_found(self, backend):
+        with pytest.raises(FileNotFoundError):
+            Tracker.load_from_storage(backend=backend)
+    def test_round_trip(self, backend, example_tracker):
+        trk, emps = example_tracker(backend)
+        assert rows(Tracker.load_from_storage(backend=backend)) == rows(trk)
+    def test_one_file_per_table(self, backend, tmp_path, example_tracker):
+        example_tracker(backend)
+        assert sorted(p.name for p in tmp_path.iterdir()) == sorted(f"{t}.{backend.format}" for t in ("employees", "departments", "permissions", "users"))
+    @pytest.mark.skipif(os.name != "posix", reason="file modes are only kept on posix")
+    def test_save_keeps_file_mode(self, backend, tmp_path, example_tracker):
+        trk, emps = example_tracker(backend)
+        path = tmp_path / f"employees.{backend.format}"
+        path.chmod(0o664)
+        next(iter(trk.employees.values())).salary = 1
+        trk.save_to_storage()
+        assert path.stat().st_mode & 0o777 == 0o664
+    def test_columns_are_typed(self, backend, example_tracker):
+        example_tracker(backend)
+        df = backend.read_table("employees")
+        assert df["salary"].dtype == "int64"
+        assert str(df["start_date"].dtype).startswith("datetime64")
+        assert backend.read_table("permissions")["active"].dtype == bool
+    def test_unicode_and_empty_strings(self, backend, employee_kwargs):
+        trk = Tracker(backend=backend)
+        trk.create_employee(**employee_kwargs("Zoë", "", date(2020, 1, 1), 1))
+        trk.create_employee(**employee_kwargs("", "Façade", date(2020, 1, 1), 1))
+        backend.write_table("employees", create_dataframe(trk.employees.values()))
+        loaded = Employee.from_frame(backend.read_table("employees"))
+        assert [(e.name, e.role) for e in loaded] == [("Zoë", ""), ("", "Façade")]
+    def test_unknown_format_is_refused(self):
+        with pytest.raises(ValueError):
+            ColumnarBackend("xlsx")
+
+class TestNpzLayout:
+    def test_repeated_values_are_dictionary_encoded(self, tmp_path, monkeypatch, example_tracker):
+        monkeypatch.setattr(storage_module, "DATA_DIR", tmp_path)
+        example_tracker(ColumnarBackend("npz"))
+        with np.load(tmp_path / "employees.npz") as data:
+            assert data["role.text"].tobytes() == b"BossClerkBossman"
+            assert data["role.codes"].tolist() == [0, 1, 2]
+            assert data["salary"].dtype == np.int64
+            assert data["start_date"].dtype == np.dtype("datetime64[D]")
+    def test_arrays_are_compressed(self, tmp_path, monkeypatch, example_tracker):
+        monkeypatch.setattr(storage_module, "DATA_DIR", tmp_path)
+        example_tracker(ColumnarBackend("npz"))
+        with zipfile.ZipFile(tmp_path / "employees.npz") as archive:
+            assert {info.compress_type for info in archive.infolist()} == {zipfile.ZIP_DEFLATED}
+
+@pytest.mark.skipif(not HAS_PYARROW, reason="needs pyarrow")
+class TestParquetLayout:
+    def test_schema(self, tmp_path, monkeypatch, example_tracker):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        monkeypatch.setattr(storage_module, "DATA_DIR", tmp_path)
+        example_tracker(ColumnarBackend("parquet"))
+        schema = pq.read_schema(tmp_path / "employees.parquet")
+        assert schema.field("salary").type == pa.int64()
+        assert schema.field("start_date").type == pa.date32()
+        assert pa.types.is_dictionary(schema.field("role").type)
+        assert pa.types.is_dictionary(schema.field("permissions").type)
+
+class TestConvert:
+    def test_csv_to_columnar_and_back(self, backend, tmp_path, example_tracker):
+        trk, emps = example_tracker()
+        assert convert(None, backend) == ["employees", "departments", "permissions", "users"]
+        assert rows(Tracker.load_from_storage(backend=backend)) == rows(trk)
+        for table in ("employees", "departments", "permissions", "users"):
+            storage_module.table_path(table).unlink()
+        convert(backend, None)
+        assert rows(Tracker.load_from_storage()) == rows(trk)
+    def test_missing_tables_are_skipped(self, backend):
+        assert convert(backend, None) == []
+    def test_command_line(self, tmp_path, monkeypatch, capsys, example_tracker):
+        monkeypatch.setattr(storage_module, "DATA_DIR", tmp_path)
+        trk, emps = example_tracker()
+        main(["csv", "npz"])
+        assert "Converted employees, departments, permissions, users from csv to npz" in capsys.readouterr().out
+        assert rows(Tracker.load_from_storage(backend=ColumnarBackend("npz"))) == rows(trk)
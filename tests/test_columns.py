@@ -0,0 +1,108 @@
+import random
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from employee_tracker.utils.columns import RecordView, TableColumns
+from employee_tracker.utils.query import Predicate, Query, plan_query
+
+KINDS = {"salary": "int64", "start_date": "date", "role": "dictionary", "name": "dictionary"}
+
+def person(rng, i):
+    return SimpleNamespace(name=f"Person {i}", role=f"Role {rng.randrange(5)}", salary=rng.randrange(10) * 1000, start_date=date(2020, 1, 1) + timedelta(days=rng.randrange(30)), address="Town")
+
+@pytest.fixture
+def rng():
+    return random.Random(7)
+
+@pytest.fixture
+def records(rng):
+    return {f"k{i:03}": person(rng, i) for i in range(60)}
+
+@pytest.fixture
+def columns(records):
+    columns = TableColumns(KINDS)
+    columns.build(records)
+    return columns
+
+# What Plan.run gives checking each record, as ids
+def checked(query, records):
+    found = plan_query(query).run(query, records)
+    keys = {id(record): key for key, record in records.items()}
+    return [keys[id(record)] for record in found]
+
+QUERIES = [
+    [Predicate("salary", "min", 4000), Predicate("salary", "max", 7000)],
+    [Predicate("start_date", "max", date(2020, 1, 10)), Predicate("role", "string", "Role 3")],
+    [Predicate("name", "string", "son 1"), Predicate("salary", "min", 0)],
+    [Predicate("role", "string", "4"), Predicate("address", "string", "Town")],
+    [Predicate("salary", "string", "1")],
+    [],
+]
+
+class TestTableColumns:
+    @pytest.mark.parametrize("predicates", QUERIES)
+    def test_matches_checking_each_record(self, columns, records, predicates):
+        query = Query("people", predicates)
+        assert columns.run(query, records).ids == checked(query, records)
+    @pytest.mark.parametrize("sort", ["salary", "-salary", "start_date", "-start_date", "role", "-role", "address"])
+    def test_sorts_match_with_ties_in_table_order(self, columns, records, sort):
+        query = Query("people", [Predicate("salary", "max", 6000)], sort=sort, offset=2, limit=20)
+        assert columns.run(query, records).ids == checked(query, records)
+    def test_kept_up_to_date(self, columns, records, rng):
+        for i in range(200):
+            key = f"k{rng.randrange(80):03}"
+            if rng.random() < 0.3:
+                records.pop(key, None)
+                assert columns.update(key, None)
+            else:
+                records[key] = person(rng, rng.randrange(1000))
+                assert columns.update(key, records[key])
+            # Keys added back after being deleted go to the end of the table, as in a dict
+            if key in records and rng.random() < 0.5:
+                records[key] = records.pop(key)
+                columns.update(key, None)
+                columns.update(key, records[key])
+        assert len(columns) == len(records)
+        for predicates in QUERIES:
+            query = Query("people", predicates)
+            assert columns.run(query, records).ids == checked(query, records)
+    def test_too_much_waste_asks_for_a_rebuild(self, records, monkeypatch):
+        monkeypatch.setattr("employee_tracker.utils.columns.REBUILD_RATIO", 0)
+        columns = TableColumns(KINDS)
+        columns.build({})
+        keep = True
+        for key, record in records.items():
+            keep = columns.update(key, record) and keep
+        assert keep
+        for i in range(1000):
+            keep = columns.update("k000", SimpleNamespace(**{**vars(records["k000"]), "name": f"Renamed {i}"}))
+        assert not keep
+    def test_values_that_dont_fit_raise(self, records):
+        columns = TableColumns(KINDS)
+        with pytest.raises(TypeError):
+            columns.build({**records, "bad": SimpleNamespace(**{**vars(records["k000"]), "start_date": "2020-01-01"})})
+        with pytest.raises(TypeError):
+            columns.build({**records, "big": SimpleNamespace(**{**vars(records["k000"]), "salary": 10 ** 20})})
+        columns.build(records)
+        with pytest.raises(TypeError):
+            columns.update("k000", SimpleNamespace(**{**vars(records["k000"]), "salary": "lots"}))
+    def test_comparisons_filter_list_cant_make_raise(self, columns, records):
+        for predicate in (Predicate("salary", "min", date(2020, 1, 1)), Predicate("start_date", "max", 5), Predicate("start_date", "min", datetime(2020, 1, 1)), Predicate("role", "min", 5)):
+            with pytest.raises(TypeError):
+                columns.run(Query("people", [predicate]), records)
+    def test_unknown_kind(self):
+        with pytest.raises(ValueError):
+            TableColumns({"salary": "float"})
+
+class TestRecordView:
+    def test_records_looked_up_as_used(self):
+        records = {"a": 1, "b": 2, "c": 3}
+        view = RecordView(["c", "a"], records)
+        assert len(view) == 2
+        assert list(view) == [3, 1]
+        assert view[1] == 1
+        assert view[:1].ids == ["c"]
+        records["a"] = 10
+        assert list(view) == [3, 10]
@@ -2,6 +2,7 @@ import pytest
 from unittest.mock import patch
 
 from datetime import date
+import pandas as pd
 from employee_tracker.domain.department import Department
 from employee_tracker.domain.employee import Employee
 from employee_tracker.utils.ids import check_id
@@ -334,6 +335,7 @@ class TestStoragePreparation:
             "head_of_department" : employee_to_use.id,
             "parent_department" : example_dep.id,
             "members": " ".join([emp1.id,emp2.id,emp3.id]),
+            "version": 0,
         }
         assert dep1_row == expected
     def test_members_are_space_separated(self):
@@ -409,3 +411,13 @@ class TestMembersSetter:
             dep.members = [emp1.id,"bad_id",emp2.id]
         assert dep.members == [emp1.id,emp2.id,emp3.id]
 
+
+class TestReturnFromFrame:
+    def test_from_frame_matches_from_row(self):
+        rows = [make_row(), make_row(id="dep_0000aaaa", members="", parent_department="")]
+        deps = Department.from_frame(pd.DataFrame(rows))
+        expected = [Department.from_row(row) for row in rows]
+        assert [d.to_row() for d in deps] == [d.to_row() for d in expected]
+    def test_from_frame_invalid_id_raises(self):
+        with pytest.raises(TypeError, match="Invalid ID"):
+            Department.from_frame(pd.DataFrame([make_row(id="emp_1234abcd")]))
@@ -1,12 +1,14 @@
 import pytest
 from unittest.mock import patch
 from datetime import date
+import pickle
 import pandas as pd
 
 from employee_tracker.domain.employee import Employee
 from employee_tracker.utils.value_checkers import check_new_value
 from employee_tracker.domain.permission import Permission
 from employee_tracker.utils.ids import check_id
+from employee_tracker.utils.passwords import verify_password
 
 
 def valid_employee_kwargs():
@@ -268,11 +270,13 @@ class TestStoragePreparation:
         "start_date",
         "salary", 
         "address", 
-        "password_hash",
         "permissions"
         }
 
         assert expected_keys.issubset(emp1_row.keys())
+    def test_to_row_leaves_out_password_hash(self):
+        # The hash is saved with the employee's user, not in the employee's row
+        assert "password_hash" not in Employee(**valid_employee_kwargs()).to_row()
     def test_values_are_correct(self):
         emp1 = Employee(**valid_employee_kwargs())
 
@@ -285,8 +289,8 @@ class TestStoragePreparation:
             "start_date": date(2024, 10, 2),
             "salary": 30000,
             "address": "123 Lane, Town, County",
-            "password_hash": "zXl7n7B2cF9ZzC6bX5mJ8sQ2k1pLr4vTtYw9aBcDeFgHiJkLmNoPqRsTuVwXyZ12",
             "permissions": " ".join(emp1.permissions),
+            "version": 0,
         }
         assert emp1_row == expected
     def test_permissions_are_space_separated(self):
@@ -332,3 +336,60 @@ class TestReturnFromStorage:
         assert emp.salary == 30000
         assert isinstance(emp.salary, int)
 
+
+class TestReturnFromFrame:
+    def test_employee_has_from_frame_method(self):
+        assert hasattr(Employee,"from_frame")
+    def test_from_frame_matches_from_row(self):
+        rows = [make_row(id="emp_deadbeef"), make_row(id="emp_0000aaaa", permissions="", salary=45000)]
+        emps = Employee.from_frame(pd.DataFrame(rows))
+        expected = [Employee.from_row(row) for row in rows]
+        assert [e.to_row() for e in emps] == [e.to_row() for e in expected]
+    def test_from_frame_converts_timestamps_to_dates(self):
+        emps = Employee.from_frame(pd.DataFrame([make_row()]))
+        assert type(emps[0].start_date) is date
+        assert isinstance(emps[0].salary, int)
+    def test_from_frame_parses_string_columns(self):
+        emps = Employee.from_frame(pd.DataFrame([make_row(start_date="2024-10-02", salary="30000")]))
+        assert emps[0].start_date == date(2024, 10, 2)
+        assert emps[0].salary == 30000
+    def test_from_frame_empty_frame_returns_empty_list(self):
+        assert Employee.from_frame(pd.DataFrame(columns=list(make_row().keys()))) == []
+    def test_from_frame_invalid_id_raises_same_error_as_from_row(self):
+        df = pd.DataFrame([make_row(), make_row(id="emp_nothex!")])
+        with pytest.raises(TypeError, match="Invalid ID"):
+            Employee.from_frame(df)
+    def test_from_frame_invalid_salary_raises(self):
+        df = pd.DataFrame([make_row(salary="lots")])
+        with pytest.raises(ValueError):
+            Employee.from_frame(df)
+
+
+class TestCredentials:
+    def test_new_employee_makes_its_user(self):
+        emp = Employee(**valid_employee_kwargs())
+        assert emp.user.id == emp.id
+        assert emp.user.password_hash == emp.password_hash == valid_employee_kwargs()["password_hash"]
+    def test_password_is_hashed_once_into_user(self):
+        kwargs = valid_employee_kwargs()
+        del kwargs["password_hash"]
+        with patch("employee_tracker.domain.employee.hash_password", wraps=lambda pw: valid_employee_kwargs()["password_hash"]) as hasher:
+            emp = Employee(**kwargs, password="secret")
+        hasher.assert_called_once_with("secret")
+        assert emp.user.password_hash == emp.password_hash
+    def test_setting_password_changes_user_not_employee(self):
+        emp = Employee(**valid_employee_kwargs())
+        changed = []
+        emp._observer = changed.append
+        emp.user._observer = changed.append
+        emp.password_hash = "new-password"
+        assert verify_password("new-password", emp.user.password_hash)
+        assert changed == [emp.user]
+    def test_loaded_employee_has_no_hash_of_its_own(self):
+        emp = Employee.from_row(make_row())
+        assert emp.user is None
+        assert emp.password_hash is None
+    def test_user_lookup_left_out_when_pickled(self):
+        emp = Employee(**valid_employee_kwargs())
+        emp._users = lambda emp_id: None
+        assert "_users" not in pickle.loads(pickle.dumps(emp)).__dict__
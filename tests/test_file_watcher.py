@@ -0,0 +1,211 @@
+import pytest
+import time
+from datetime import date
+
+from employee_tracker.domain.tracker import Tracker, SaveConflictError
+from employee_tracker.gui.file_watcher import FileWatcher, apply_row_changes
+from employee_tracker.storage import journal as journal_module
+from employee_tracker.storage.journal import Journal
+from employee_tracker.utils.passwords import hash_password
+
+HASH = hash_password("password")
+
+def valid_employee_kwargs():
+    return dict(
+        name="James",
+        role="Creator",
+        start_date=date(2024, 10, 2),
+        salary=30000,
+        address="123 Lane, Town, County",
+        password_hash=HASH
+    )
+
+# Two trackers on the same data folder, as two workstations would have
+@pytest.fixture
+def workstations(saved_tracker):
+    _, emp = saved_tracker
+    return Tracker.load_from_storage(), Tracker.load_from_storage(), emp.id
+
+class TestMergeFromStorage:
+    def test_nothing_to_merge_when_unchanged(self, workstations):
+        mine, theirs, emp_id = workstations
+        assert mine.tables_changed_on_disk() == []
+        assert mine.merge_from_storage() == {}
+    def test_row_level_changes_are_merged(self, workstations):
+        mine, theirs, emp_id = workstations
+        theirs.employees[emp_id].name = "Renamed"
+        added = theirs.create_employee(**valid_employee_kwargs())
+        theirs.save_to_storage()
+        assert mine.tables_changed_on_disk() == ["employees", "users"]
+        changes = mine.merge_from_storage()
+        assert changes["employees"] == {"added": [added.id], "updated": [emp_id], "removed": []}
+        assert changes["users"] == {"added": [added.id], "updated": [], "removed": []}
+        assert mine.employees[emp_id].name == "Renamed"
+        assert not mine.has_unsaved_changes()
+    def test_deletions_are_merged(self, workstations):
+        mine, theirs, emp_id = workstations
+        dep_id = next(iter(theirs.departments))
+        theirs.delete_department(dep_id)
+        theirs.create_department("HR", "People", emp_id)
+        theirs.save_to_storage()
+        assert mine.merge_from_storage()["departments"]["removed"] == [dep_id]
+        assert dep_id not in mine.departments
+    def test_local_unsaved_edits_win(self, workstations):
+        mine, theirs, emp_id = workstations
+        mine.employees[emp_id].name = "Mine"
+        theirs.employees[emp_id].name = "Theirs"
+        theirs.create_employee(**valid_employee_kwargs())
+        theirs.save_to_storage()
+        mine.merge_from_storage()
+        assert mine.employees[emp_id].name == "Mine"
+        assert len(mine.employees) == 2
+        assert mine.unsaved_tables() == ["employees"]
+    def test_merged_rows_are_tracked_but_not_journaled(self, workstations):
+        mine, theirs, emp_id = workstations
+        theirs.employees[emp_id].name = "Renamed"
+        theirs.save_to_storage()
+        seen = []
+        mine.add_listener(lambda table, key: seen.append((table, key)))
+        mine.merge_from_storage()
+        assert seen == []
+        mine.employees[emp_id].salary = 1
+        assert seen == [("employees", emp_id)]
+
+    # The file watcher reads on another thread, so a save can finish between its read and its merge
+    def test_read_overtaken_by_a_save_is_not_merged(self, workstations):
+        mine, theirs, emp_id = workstations
+        theirs.create_employee(**valid_employee_kwargs())
+        theirs.save_to_storage()
+        loaded = mine.read_tables(["employees"])
+        mine.employees[emp_id].salary = 999
+        mine.save_to_storage()
+        assert mine.merge_tables(loaded, ["employees"]) == {}
+        assert mine.employees[emp_id].salary == 999
+        assert mine.employees[emp_id].version == 1
+        # Their employee is picked up by the next merge, and later saves of the record don't clash with the one just made
+        assert len(mine.merge_from_storage()["employees"]["added"]) == 1
+        mine.employees[emp_id].salary = 1000
+        mine.save_to_storage()
+        assert Tracker.load_from_storage().employees[emp_id].salary == 1000
+
+class TestJournals:
+    # A journal made on each workstation, as run_app makes them
+    @staticmethod
+    def journal_on(host, monkeypatch):
+        monkeypatch.setattr(journal_module.socket, "gethostname", lambda: host)
+        return Journal()
+    def test_each_instance_keeps_its_own_journal(self, workstations, monkeypatch):
+        _, _, emp_id = workstations
+        mine = Tracker.load_from_storage(journal=self.journal_on("pc1", monkeypatch))
+        theirs = Tracker.load_from_storage(journal=self.journal_on("pc2", monkeypatch))
+        assert mine.journal.path != theirs.journal.path
+        mine.employees[emp_id].salary = 1
+        theirs.departments[next(iter(theirs.departments))].description = "Theirs"
+        theirs.save_to_storage()
+        # Their save doesn't clear this instance's journal, so its unsaved change comes back after a restart
+        mine.journal.close()
+        restarted = Tracker.load_from_storage(journal=self.journal_on("pc1", monkeypatch))
+        assert restarted.employees[emp_id].salary == 1
+        assert restarted.unsaved_tables() == ["employees"]
+        # And their instance never sees it as a change of its own
+        restarted_theirs = Tracker.load_from_storage(journal=self.journal_on("pc2", monkeypatch))
+        assert restarted_theirs.employees[emp_id].salary == 30000
+        assert not restarted_theirs.has_unsaved_changes()
+
+class TestSaveConflicts:
+    def test_changes_to_different_rows_both_survive(self, workstations):
+        mine, theirs, emp_id = workstations
+        added = theirs.create_employee(**valid_employee_kwargs())
+        theirs.save_to_storage()
+        mine.employees[emp_id].name = "Mine"
+        mine.save_to_storage()
+        loaded = Tracker.load_from_storage()
+        assert loaded.employees[emp_id].name == "Mine"
+        assert added.id in loaded.employees
+        assert loaded.employees[emp_id].version == 1
+    def test_saves_bump_the_version(self, workstations):
+        mine, theirs, emp_id = workstations
+        mine.employees[emp_id].salary = 1
+        mine.save_to_storage()
+        mine.employees[emp_id].salary = 2
+        mine.save_to_storage()
+        assert mine.employees[emp_id].version == 2
+        assert Tracker.load_from_storage().employees[emp_id].salary == 2
+    def test_same_row_changed_by_both_is_a_conflict(self, workstations):
+        mine, theirs, emp_id = workstations
+        theirs.employees[emp_id].name = "Theirs"
+        theirs.save_to_storage()
+        mine.employees[emp_id].name = "Mine"
+        mine.create_permission("hr")
+        with pytest.raises(SaveConflictError) as err:
+            mine.save_to_storage()
+        assert list(err.value.conflicts["employees"]) == [emp_id]
+        assert err.value.conflicts["employees"][emp_id]["name"] == "Theirs"
+        loaded = Tracker.load_from_storage()
+        assert loaded.employees[emp_id].name == "Theirs"
+        assert "hr" in loaded.permissions
+        assert mine.unsaved_tables() == ["employees"]
+    def test_deleting_a_row_changed_elsewhere_is_a_conflict(self, workstations):
+        mine, theirs, emp_id = workstations
+        theirs.employees[emp_id].name = "Theirs"
+        theirs.save_to_storage()
+        mine.delete_employee(emp_id)
+        with pytest.raises(SaveConflictError):
+            mine.save_to_storage()
+        assert emp_id in Tracker.load_from_storage().employees
+    def test_keeping_mine_overwrites_theirs(self, workstations):
+        mine, theirs, emp_id = workstations
+        theirs.employees[emp_id].name = "Theirs"
+        theirs.save_to_storage()
+        mine.employees[emp_id].name = "Mine"
+        with pytest.raises(SaveConflictError):
+            mine.save_to_storage()
+        mine.resolve_conflicts(keep_mine=True)
+        mine.save_to_storage()
+        assert Tracker.load_from_storage().employees[emp_id].name == "Mine"
+        assert not mine.has_unsaved_changes()
+    def test_taking_theirs_drops_mine(self, workstations):
+        mine, theirs, emp_id = workstations
+        theirs.employees[emp_id].name = "Theirs"
+        theirs.save_to_storage()
+        mine.employees[emp_id].name = "Mine"
+        with pytest.raises(SaveConflictError):
+            mine.save_to_storage()
+        mine.resolve_conflicts(keep_mine=False)
+        assert mine.employees[emp_id].name == "Theirs"
+        assert mine.employees[emp_id].version == 1
+        assert not mine.has_unsaved_changes()
+        mine.employees[emp_id].salary = 5
+        mine.save_to_storage()
+        assert Tracker.load_from_storage().employees[emp_id].salary == 5
+
+class TestFileWatcher:
+    def test_changes_are_merged_and_reported(self, workstations, root):
+        mine, theirs, emp_id = workstations
+        reported = []
+        FileWatcher(root, mine, interval=1, on_change=reported.append)
+        theirs.employees[emp_id].name = "Renamed"
+        theirs.save_to_storage()
+        for _ in range(50):
+            root.run_due(1000)
+            if reported:
+                break
+            time.sleep(0.01)
+        assert reported == [{"employees": {"added": [], "updated": [emp_id], "removed": []}}]
+        assert mine.employees[emp_id].name == "Renamed"
+    def test_stopped_watcher_does_nothing(self, workstations, root):
+        mine, theirs, emp_id = workstations
+        watcher = FileWatcher(root, mine, interval=1)
+        watcher.stop()
+        theirs.employees[emp_id].name = "Renamed"
+        theirs.save_to_storage()
+        root.run_due(5000)
+        assert mine.employees[emp_id].name == "James"
+
+class TestApplyRowChanges:
+    def test_only_changed_rows_are_redrawn(self, listbox):
+        listbox.items = ["a 1", "b 1", "c 1"]
+        ids = ["a", "b", "c"]
+        apply_row_changes(listbox, ids, {"added": ["d"], "updated": ["c"], "removed": ["a"]}, {"c": 2, "d": 1}, lambda n: f"? {n}")
+        assert ids == ["b", "c", "d"]
+        assert listbox.items == ["b 1", "? 2", "? 1"]
@@ -4,6 +4,7 @@ import tkinter as tk
 from datetime import date
 from types import SimpleNamespace
 from unittest.mock import MagicMock
+from concurrent.futures import Future
 
 def _tk_available() -> bool:
     try:
@@ -83,6 +84,15 @@ class TestGUIFunctions:
             dw.parse_department_form("IT", "Tech", "bad", "")
 
 
+# Stands in for login_async, with the login already checked
+def finished_future(result=None, error=None):
+    future = Future()
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+    return future
+
 class TestLoginWindow:
     def test_login_window_success_callback_and_closes(self, tk_root, monkeypatch):
         from employee_tracker.gui.login_window import LoginWindow
@@ -95,8 +105,8 @@ class TestLoginWindow:
             called["emp_id"] = emp_id
 
         monkeypatch.setattr(
-            "employee_tracker.gui.login_window.login",
-            lambda tr, emp, pw: ["it_admin"]
+            "employee_tracker.gui.login_window.login_async",
+            lambda tr, emp, pw: finished_future(result=(["it_admin"], None))
         )
 
         win = LoginWindow(tk_root, tracker, on_success)
@@ -123,9 +133,9 @@ class TestLoginWindow:
             called["success"] = True
 
         def bad_login(tr, emp, pw):
-            raise LookupError("No such user")
+            return finished_future(error=LookupError("No such user"))
 
-        monkeypatch.setattr("employee_tracker.gui.login_window.login", bad_login)
+        monkeypatch.setattr("employee_tracker.gui.login_window.login_async", bad_login)
 
         showerror = MagicMock()
         monkeypatch.setattr("employee_tracker.gui.login_window.messagebox.showerror", showerror)
@@ -145,6 +155,26 @@ class TestLoginWindow:
                 win.destroy()
 
 
+    def test_login_window_load_failure_shows_error(self, tk_root, monkeypatch):
+        from employee_tracker.gui.login_window import LoginWindow
+
+        monkeypatch.setattr("employee_tracker.gui.login_window.login_async", lambda tr, emp, pw: finished_future(error=ValueError("bad csv")))
+        showerror = MagicMock()
+        monkeypatch.setattr("employee_tracker.gui.login_window.messagebox.showerror", showerror)
+
+        win = LoginWindow(tk_root, MagicMock(), MagicMock())
+        win.withdraw()
+        try:
+            win.emp_id_var.set("emp9999")
+            win.password_var.set("pw")
+            win.do_login()
+
+            assert "bad csv" in showerror.call_args.args[1]
+            assert win.winfo_exists()
+        finally:
+            if win.winfo_exists():
+                win.destroy()
+
 class TestMainWindow:
     def test_mainwindow_on_login_success_updates_status(self, monkeypatch):
         from employee_tracker.gui import main_window as mw
@@ -239,6 +269,27 @@ class TestEmployeeWindow:
         finally:
             win.destroy()
 
+    def test_employee_list_shown_a_page_at_a_time(self, tk_root, monkeypatch):
+        from employee_tracker.gui.employee_window import EmployeeWindow
+
+        monkeypatch.setattr("employee_tracker.gui.employee_window.PAGE_SIZE", 2)
+        tracker = MagicMock()
+        tracker.list_employees.return_value = [self.make_fake_employee(f"emp_0000000{i}") for i in range(5)]
+
+        win = EmployeeWindow(tk_root, tracker, permissions=[], logged_in_user=None)
+        win.withdraw()
+        try:
+            assert win.employee_ids == ["emp_00000000", "emp_00000001"]
+            win.show_more()
+            win.show_more()
+            assert len(win.employee_ids) == 5
+            assert win.more_button.instate(["disabled"])
+            # Refreshing keeps as many rows as were shown
+            win.refresh_list()
+            assert len(win.employee_ids) == 5
+        finally:
+            win.destroy()
+
 class TestDepartmentWindow:
     @staticmethod
     def make_fake_department(dep_id="dep_12345678"):
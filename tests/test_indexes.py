@@ -0,0 +1,122 @@
+import random
+
+import pytest
+from datetime import date
+from types import SimpleNamespace
+
+from employee_tracker.utils.indexes import SortedIndex, TableIndexes, TrigramIndex
+
+def records(**salaries):
+    return {key: SimpleNamespace(salary=salary) for key, salary in salaries.items()}
+
+class TestSortedIndex:
+    def test_range_is_inclusive_and_ordered_by_value(self):
+        index = SortedIndex("salary")
+        index.build(records(a=300, b=100, c=200, d=400))
+        assert index.range(200, 300) == ["c", "a"]
+        assert index.range(None, 150) == ["b"]
+        assert index.range(350, None) == ["d"]
+        assert index.range() == ["b", "c", "a", "d"]
+        assert index.range(500, 600) == []
+        assert index.range(300, 200) == []
+    def test_count_matches_range(self):
+        index = SortedIndex("salary")
+        index.build(records(a=1, b=2, c=2, d=3))
+        for low, high in ((None, None), (2, 2), (0, 1), (3, 1), (4, None)):
+            assert index.count(low, high) == len(index.range(low, high))
+    def test_add_and_remove_with_equal_values(self):
+        index = SortedIndex("salary")
+        index.build(records(b=5, d=5))
+        index.add("c", SimpleNamespace(salary=5))
+        index.add("a", SimpleNamespace(salary=5))
+        assert index.range(5, 5) == ["a", "b", "c", "d"]
+        index.remove("c")
+        index.remove("missing")
+        assert index.range(5, 5) == ["a", "b", "d"]
+        assert len(index) == 3
+    def test_removed_by_indexed_value_after_record_changes(self):
+        index = SortedIndex("salary")
+        data = records(a=1, b=2)
+        index.build(data)
+        data["a"].salary = 10
+        index.remove("a")
+        index.add("a", data["a"])
+        assert index.range(None, 5) == ["b"]
+        assert index.range(5, None) == ["a"]
+    def test_dates(self):
+        index = SortedIndex("start_date")
+        index.build({"a": SimpleNamespace(start_date=date(2020, 1, 1)), "b": SimpleNamespace(start_date=date(2010, 1, 1))})
+        assert index.range(date(2015, 1, 1)) == ["a"]
+    # Small chunks, so adding and removing splits and empties them
+    def test_matches_a_scan_across_chunks(self, monkeypatch):
+        monkeypatch.setattr("employee_tracker.utils.indexes.CHUNK_SIZE", 3)
+        rng = random.Random(4)
+        data = {f"k{i:03}": SimpleNamespace(salary=rng.randrange(20)) for i in range(40)}
+        index = SortedIndex("salary")
+        index.build(data)
+        for i in range(300):
+            key = f"k{rng.randrange(60):03}"
+            index.remove(key)
+            if rng.random() < 0.7:
+                data[key] = SimpleNamespace(salary=rng.randrange(20))
+                index.add(key, data[key])
+            else:
+                data.pop(key, None)
+            low, high = rng.choice((None, rng.randrange(20))), rng.choice((None, rng.randrange(20)))
+            expected = sorted((record.salary, key) for key, record in data.items() if (low is None or record.salary >= low) and (high is None or record.salary <= high))
+            assert index.range(low, high) == [key for _, key in expected]
+            assert index.count(low, high) == len(expected)
+        assert all(len(keys) <= 6 for _, keys in index._chunks)
+
+class TestTrigramIndex:
+    @pytest.fixture
+    def index(self):
+        index = TrigramIndex(("name", "role"))
+        index.build({"a": SimpleNamespace(name="Alice Smith", role="Developer"), "b": SimpleNamespace(name="Bob", role="Smithy")})
+        return index
+    def test_search_ignores_case_and_spans_attributes(self, index):
+        assert index.search("SMITH") == {"a", "b"}
+        assert index.search("smith dev") == {"a"}
+        assert index.search("xyz") == set()
+    # Every trigram of "lice dev" is in "alice smith developer", but the text itself isn't
+    def test_candidates_are_checked(self, index):
+        assert index.search("lice dev") == set()
+    def test_short_searches_are_refused(self, index):
+        assert not TrigramIndex.can_search("ab")
+        with pytest.raises(ValueError):
+            index.search("ab")
+    def test_removing_drops_empty_postings(self, index):
+        index.remove("b")
+        index.remove("a")
+        assert len(index) == 0
+        assert index._postings == {}
+    def test_non_strings_raise(self):
+        with pytest.raises(TypeError):
+            TrigramIndex(("name",)).build({"a": SimpleNamespace(name=5)})
+
+class TestTableIndexes:
+    @pytest.fixture
+    def indexes(self):
+        indexes = TableIndexes({"salary": SortedIndex("salary")})
+        indexes.build(records(a=3, b=1, c=2))
+        return indexes
+    def test_keys_put_back_in_table_order(self, indexes):
+        assert indexes.in_table_order(indexes["salary"].range()) == ["a", "b", "c"]
+    def test_update_adds_changes_and_removes(self, indexes):
+        indexes.update("d", SimpleNamespace(salary=0))
+        indexes.update("a", SimpleNamespace(salary=10))
+        indexes.update("b", None)
+        assert indexes["salary"].range() == ["d", "c", "a"]
+        assert indexes.in_table_order(["d", "c", "a"]) == ["a", "c", "d"]
+    def test_indexes_only_built_when_asked_for(self):
+        indexes = TableIndexes({"salary": SortedIndex("salary"), "text": TrigramIndex(("name",))})
+        indexes.build({"a": SimpleNamespace(salary=1, name="Ann")}, ["salary"])
+        indexes.update("b", SimpleNamespace(salary=2, name="Ben"))
+        assert len(indexes["salary"]) == 2
+        assert len(indexes["text"]) == 0
+        indexes.build({"a": SimpleNamespace(salary=1, name="Ann"), "b": SimpleNamespace(salary=2, name="Ben")}, ["text"])
+        assert indexes["text"].search("ben") == {"b"}
+    def test_readded_key_goes_last(self, indexes):
+        indexes.update("a", None)
+        indexes.update("a", SimpleNamespace(salary=3))
+        assert indexes.in_table_order(["a", "b", "c"]) == ["b", "c", "a"]
@@ -0,0 +1,76 @@
+import pytest
+from datetime import date
+
+from employee_tracker.domain.tracker import Tracker
+from employee_tracker.storage.journal import Journal
+
+class TestJournal:
+    def test_append_and_read_back(self, data_dir):
+        journal = Journal()
+        journal.append("employees", "emp_1234abcd", {"start_date": date(2024, 1, 1)})
+        journal.append("employees", "emp_1234abcd", None)
+        assert list(journal.entries()) == [("employees", "emp_1234abcd", {"start_date": "2024-01-01"}), ("employees", "emp_1234abcd", None)]
+    def test_partial_last_line_is_ignored(self, data_dir):
+        journal = Journal()
+        journal.append("users", "emp_1234abcd", None)
+        journal.close()
+        with open(journal.path, "a") as f:
+            f.write('{"table": "users", "ke')
+        assert len(list(Journal().entries())) == 1
+    def test_rotated_entries_are_read_first(self, data_dir):
+        journal = Journal()
+        journal.append("users", "emp_00000001", None)
+        rotated = journal.rotate()
+        journal.append("users", "emp_00000002", None)
+        assert [key for _, key, _ in journal.entries()] == ["emp_00000001", "emp_00000002"]
+        journal.discard(rotated)
+        assert [key for _, key, _ in journal.entries()] == ["emp_00000002"]
+    def test_needs_compaction_after_limit(self, data_dir):
+        journal = Journal(compact_every=2)
+        journal.append("users", "emp_00000001", None)
+        assert not journal.needs_compaction()
+        journal.append("users", "emp_00000001", None)
+        assert journal.needs_compaction()
+
+class TestTrackerJournal:
+    def test_unsaved_changes_are_recovered_on_load(self, saved_tracker, employee_kwargs):
+        trk = Tracker.load_from_storage(journal=Journal())
+        emp = next(iter(trk.employees.values()))
+        trk.update_employee(emp.id, {"salary": 45000, "start_date": date(2020, 5, 5)})
+        new = trk.create_employee(**employee_kwargs())
+        dep = next(iter(trk.departments.values()))
+        trk.delete_department(dep.id)
+
+        # simulate a crash - nothing saved, the tracker is thrown away
+        recovered = Tracker.load_from_storage(journal=Journal())
+        assert recovered.employees[emp.id].salary == 45000
+        assert recovered.employees[emp.id].start_date == date(2020, 5, 5)
+        assert new.id in recovered.employees and new.id in recovered.users
+        assert dep.id not in recovered.departments
+        assert "employees" in recovered.unsaved_tables()
+    def test_save_clears_journal(self, saved_tracker):
+        journal = Journal()
+        trk = Tracker.load_from_storage(journal=journal)
+        emp = next(iter(trk.employees.values()))
+        emp.name = "Someone"
+        trk.save_to_storage()
+        assert list(journal.entries()) == []
+        assert Tracker.load_from_storage().employees[emp.id].name == "Someone"
+    def test_background_compaction_folds_journal_into_csvs(self, saved_tracker):
+        journal = Journal(compact_every=3)
+        trk = Tracker.load_from_storage(journal=journal)
+        emp = next(iter(trk.employees.values()))
+        for salary in (1, 2, 3):
+            emp.salary = salary
+        trk._wait_for_compaction()
+        assert list(journal.entries()) == []
+        assert Tracker.load_from_storage().employees[emp.id].salary == 3
+    def test_changes_after_compaction_are_kept(self, saved_tracker):
+        journal = Journal(compact_every=1)
+        trk = Tracker.load_from_storage(journal=journal)
+        emp = next(iter(trk.employees.values()))
+        emp.salary = 1
+        trk._wait_for_compaction()
+        journal.compact_every = 100
+        emp.salary = 2
+        assert Tracker.load_from_storage(journal=Journal()).employees[emp.id].salary == 2
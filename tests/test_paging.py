@@ -0,0 +1,28 @@
+from types import SimpleNamespace
+
+from employee_tracker.gui.paging import show_more_rows
+
+# Only the rows asked for are taken from the results, plus one to tell whether there are more
+class CountingResults:
+    def __init__(self, records):
+        self.records = records
+        self.taken = 0
+    def __getitem__(self, position):
+        rows = self.records[position]
+        self.taken += len(rows)
+        return rows
+
+class TestShowMoreRows:
+    def test_pages_carry_on_from_the_rows_shown(self, listbox):
+        results = CountingResults([SimpleNamespace(id=f"k{i}") for i in range(5)])
+        ids = []
+        assert show_more_rows(listbox, ids, results, lambda record: record.id.upper(), 2)
+        assert ids == ["k0", "k1"]
+        assert results.taken == 3
+        assert show_more_rows(listbox, ids, results, lambda record: record.id.upper(), 2)
+        assert not show_more_rows(listbox, ids, results, lambda record: record.id.upper(), 2)
+        assert listbox.items == ["K0", "K1", "K2", "K3", "K4"]
+    def test_plain_lists(self, listbox):
+        ids = []
+        assert not show_more_rows(listbox, ids, [SimpleNamespace(id="a")], str, 10)
+        assert ids == ["a"]
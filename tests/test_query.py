@@ -0,0 +1,165 @@
+import pytest
+from types import SimpleNamespace
+
+from employee_tracker.utils.indexes import SortedIndex, TableIndexes, TrigramIndex
+from employee_tracker.utils.query import Predicate, Query, QueryResult, plan_query, useful_indexes
+
+def people():
+    rows = [("Ann Lee", "Clerk", 100), ("Ben Lee", "Manager", 300), ("Cat Ray", "clerk", 200), ("Dan Ray", "Driver", 300), ("Eve Lee", "Clerk", 400)]
+    return {f"k{i}": SimpleNamespace(name=name, role=role, salary=salary) for i, (name, role, salary) in enumerate(rows)}
+
+def names(records):
+    return [record.name for record in records]
+
+@pytest.fixture
+def records():
+    return people()
+
+@pytest.fixture
+def indexes(records):
+    indexes = TableIndexes({"salary": SortedIndex("salary"), "text": TrigramIndex(("name", "role"))})
+    indexes.build(records)
+    return indexes
+
+def run(query, records, indexes=None):
+    return plan_query(query, indexes).run(query, records, indexes)
+
+class TestPredicateAndQuery:
+    def test_predicate_matches_as_filter_list_does(self):
+        record = SimpleNamespace(name="Ann", salary=5)
+        assert Predicate("name", "string", "An").matches(record)
+        assert not Predicate("name", "string", "an").matches(record)
+        assert Predicate("salary", "min", 5).matches(record)
+        assert not Predicate("salary", "max", 4).matches(record)
+    def test_predicate_values_are_checked(self):
+        with pytest.raises(TypeError, match="String expected"):
+            Predicate("name", "string", 5)
+        with pytest.raises(TypeError, match="Integer or date expected"):
+            Predicate("salary", "min", "lots")
+        with pytest.raises(TypeError, match="Parameter type"):
+            Predicate("salary", "between", 5)
+    def test_query_arguments_are_checked(self):
+        with pytest.raises(TypeError):
+            Query("employees", [("salary", "min", 5)])
+        with pytest.raises(TypeError):
+            Query("employees", sort=1)
+        with pytest.raises(ValueError):
+            Query("employees", limit=-1)
+        with pytest.raises(TypeError):
+            Query("employees", offset=None)
+
+class TestPlanning:
+    def test_most_selective_index_goes_first(self, indexes, monkeypatch):
+        monkeypatch.setattr("employee_tracker.utils.query.INTERSECT_RATIO", 2)
+        query = Query("people", [Predicate("name", "string", "Lee"), Predicate("salary", "min", 400)])
+        plan = plan_query(query, indexes)
+        assert [step.name for step in plan.steps] == ["salary"]
+        # The salary range is met exactly, the name is still checked
+        assert [predicate.attribute for predicate in plan.checks] == ["name"]
+    def test_similar_sized_indexes_are_intersected(self, indexes, records):
+        query = Query("people", [Predicate("salary", "min", 300), Predicate("name", "string", "Lee")])
+        plan = plan_query(query, indexes)
+        assert sorted(step.name for step in plan.steps) == ["salary", "text"]
+        assert names(plan.run(query, records, indexes)) == ["Ben Lee", "Eve Lee"]
+    def test_min_and_max_on_one_attribute_are_one_range(self, indexes):
+        query = Query("people", [Predicate("salary", "min", 150), Predicate("salary", "max", 300), Predicate("salary", "max", 250)])
+        plan = plan_query(query, indexes)
+        assert len(plan.steps) == 1
+        assert plan.steps[0].estimate == 1
+        assert plan.checks == []
+    def test_no_indexes_checks_every_record(self, records):
+        query = Query("people", [Predicate("role", "string", "Clerk")])
+        plan = plan_query(query)
+        assert plan.steps == []
+        assert names(plan.run(query, records)) == ["Ann Lee", "Eve Lee"]
+    def test_short_searches_and_unindexed_attributes_are_checked(self, indexes):
+        query = Query("people", [Predicate("name", "string", "Le"), Predicate("address", "string", "Town")])
+        assert plan_query(query, indexes).steps == []
+        assert useful_indexes(query, indexes.indexes) == []
+    # Three of five match, so the first one is quicker to find by checking from the start than through the index
+    def test_first_few_of_a_common_match_are_found_by_checking(self, indexes):
+        query = Query("people", [Predicate("salary", "min", 200)], limit=1)
+        assert plan_query(query, indexes, 5).steps == []
+        assert [predicate.attribute for predicate in plan_query(query, indexes, 5).checks] == ["salary"]
+        assert len(plan_query(Query("people", query.predicates), indexes, 5).steps) == 1
+        assert len(plan_query(Query("people", [Predicate("salary", "min", 400)], limit=1), indexes, 5).steps) == 1
+    def test_useful_indexes(self, indexes):
+        query = Query("people", [Predicate("salary", "max", 100), Predicate("role", "string", "Clerk")])
+        assert useful_indexes(query, indexes.indexes) == ["salary", "text"]
+
+class TestRunning:
+    @pytest.mark.parametrize("with_indexes", [False, True])
+    def test_same_results_with_or_without_indexes(self, records, indexes, with_indexes):
+        query = Query("people", [Predicate("role", "string", "lerk"), Predicate("salary", "max", 300)])
+        assert names(run(query, records, indexes if with_indexes else None)) == ["Ann Lee", "Cat Ray"]
+    def test_sort_limit_and_offset(self, records, indexes):
+        query = Query("people", [Predicate("salary", "min", 200)], sort="-salary", limit=2, offset=1)
+        assert names(run(query, records, indexes)) == ["Ben Lee", "Dan Ray"]
+        assert names(run(Query("people", sort="name", offset=3), records)) == ["Dan Ray", "Eve Lee"]
+        assert run(Query("people", limit=0), records) == []
+    # Without a sort, records after the last one wanted aren't checked
+    def test_stops_once_enough_are_found(self, records):
+        checked = []
+        predicate = Predicate("salary", "min", 0)
+        predicate.matches = lambda record: checked.append(record) or True
+        assert names(run(Query("people", [predicate], limit=2), records)) == ["Ann Lee", "Ben Lee"]
+        assert len(checked) == 2
+
+class TestQueryResult:
+    @pytest.fixture
+    def result(self, records, indexes):
+        return QueryResult(Query("people"), lambda query: (plan_query(query, indexes), records, indexes))
+    # A predicate that records every record it is asked about
+    @staticmethod
+    def counting(attribute, kind, value, checked):
+        predicate = Predicate(attribute, kind, value)
+        matches = predicate.matches
+        predicate.matches = lambda record: checked.append(record) or matches(record)
+        return predicate
+    def test_reads_like_a_list(self, result, records):
+        assert result == list(records.values())
+        assert len(result) == 5
+        assert result[1].name == "Ben Lee"
+        assert result[-1].name == "Eve Lee"
+        assert names(result[1:3]) == ["Ben Lee", "Cat Ray"]
+        assert names(result[::2]) == ["Ann Lee", "Cat Ray", "Eve Lee"]
+        assert records["k2"] in result
+        with pytest.raises(IndexError):
+            result[5]
+        assert result and not result.offset(5)
+    def test_limit_and_offset_narrow_the_window(self, result):
+        assert names(result.offset(1).limit(3).offset(1)) == ["Cat Ray", "Dan Ray"]
+        assert names(result.limit(2).offset(1).limit(5)) == ["Ben Lee"]
+        assert result.offset(4).limit(10).count() == 1
+        assert result.first().name == "Ann Lee"
+    def test_pages_and_cursors(self, result):
+        page = result.page(2)
+        assert names(page) == ["Ann Lee", "Ben Lee"]
+        assert page.next_cursor == 2
+        page = result.page(2, page.next_cursor)
+        page = result.page(2, page.next_cursor)
+        assert names(page) == ["Eve Lee"]
+        assert page.next_cursor is None
+        assert [(page.cursor, names(page), page.next_cursor) for page in result.pages(3)] == [(0, ["Ann Lee", "Ben Lee", "Cat Ray"], 3), (3, ["Dan Ray", "Eve Lee"], None)]
+        with pytest.raises(ValueError):
+            result.page(0)
+    def test_stops_as_soon_as_enough_are_found(self, records, indexes):
+        checked = []
+        query = Query("people", [self.counting("role", "string", "e", checked)])
+        result = QueryResult(query, lambda query: (plan_query(query), records, None))
+        assert next(iter(result)).name == "Ann Lee"
+        assert len(checked) == 1
+        checked.clear()
+        assert names(result.page(1)) == ["Ann Lee"]
+        assert len(checked) == 2
+    def test_counted_from_the_index_when_it_is_exact(self, records, indexes):
+        result = QueryResult(Query("people", [Predicate("salary", "min", 300)]), lambda query: (plan_query(query, indexes), {}, indexes))
+        assert result.count() == 3
+    def test_sorted_and_limited(self, records, indexes):
+        result = QueryResult(Query("people", sort="-salary"), lambda query: (plan_query(query, indexes), records, indexes))
+        assert names(result.limit(3)) == ["Eve Lee", "Ben Lee", "Dan Ray"]
+        assert names(result.offset(1).limit(2)) == ["Ben Lee", "Dan Ray"]
+        assert names(result) == names(sorted(records.values(), key=lambda record: record.salary, reverse=True))
+    def test_sees_the_table_as_it_is_when_used(self, result, records):
+        records["k5"] = SimpleNamespace(name="Fay Ray", role="Clerk", salary=100)
+        assert len(result) == 6
@@ -0,0 +1,156 @@
+import gc
+import os
+import pytest
+from datetime import date
+
+from employee_tracker.domain.tracker import Tracker, SaveConflictError
+from employee_tracker.domain.employee import Employee
+from employee_tracker.auth.login import login
+from employee_tracker.storage.record_file import LazyTable, RecordFile, RecordFileBackend, write_record_file, update_record_file
+import employee_tracker.storage.storage as storage_module
+
+@pytest.fixture
+def backend(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage_module, "DATA_DIR", tmp_path)
+    return RecordFileBackend()
+
+def rows(employees):
+    return [emp.to_row() for emp in employees.values()]
+
+class TestRecordFile:
+    def test_lookup_by_id(self, tmp_path):
+        ids = [f"emp_{i:08x}" for i in (5, 1, 9, 3)]
+        write_record_file(tmp_path / "e.rec", {"id": ids, "name": ["a", "bb", "", "dddd"], "role": ["r"] * 4, "start_date": [date(2000, 1, i) for i in range(1, 5)], "salary": [1, 2, 3, 4], "address": ["x"] * 4, "permissions": [""] * 4})
+        file = RecordFile(tmp_path / "e.rec")
+        assert list(file.ids()) == ids
+        assert file.get_row(ids[3]) == {"id": ids[3], "name": "dddd", "role": "r", "start_date": date(2000, 1, 4), "salary": 4, "address": "x", "permissions": "", "version": 0}
+        assert file.get_row("emp_00000002") is None
+        assert file.get_row("emp_000000000000000") is None
+        file.close()
+    def test_not_a_record_file(self, tmp_path):
+        (tmp_path / "e.rec").write_bytes(b"id,name\n")
+        with pytest.raises(ValueError):
+            RecordFile(tmp_path / "e.rec")
+    def test_update_keeps_order_and_widens_columns(self, tmp_path):
+        write_record_file(tmp_path / "e.rec", {"id": ["emp_00000001", "emp_00000002"], "name": ["a", "b"], "role": ["r", "r"], "start_date": [date(2000, 1, 1)] * 2, "salary": [1, 2], "address": ["x", "x"], "permissions": ["", ""]})
+        new = {"id": "emp_00000000", "name": "new", "role": "r", "start_date": date(2001, 1, 1), "salary": 3, "address": "x", "permissions": "", "version": 0}
+        changed = {**new, "id": "emp_00000002", "name": "a much longer name"}
+        update_record_file(tmp_path / "e.rec", [changed, new], ["emp_00000001"])
+        file = RecordFile(tmp_path / "e.rec")
+        assert list(file.ids()) == ["emp_00000002", "emp_00000000"]
+        assert file.get_row("emp_00000002")["name"] == "a much longer name"
+        assert file.get_row("emp_00000000") == new
+        assert file.get_row("emp_00000001") is None
+        file.close()
+
+class TestRecordFileBackend:
+    def test_missing_file_raises_file_not_found(self, backend):
+        with pytest.raises(FileNotFoundError):
+            Tracker.load_from_storage(backend=backend)
+    def test_round_trip(self, backend, example_tracker):
+        trk, emps = example_tracker(backend)
+        loaded = Tracker.load_from_storage(backend=backend)
+        assert isinstance(loaded.employees, LazyTable)
+        assert rows(loaded.employees) == rows(trk.employees)
+        assert list(loaded.departments) == list(trk.departments)
+    @pytest.mark.skipif(os.name != "posix", reason="file modes are only kept on posix")
+    def test_save_keeps_file_mode(self, backend, tmp_path, example_tracker):
+        trk, emps = example_tracker(backend)
+        (tmp_path / "employees.rec").chmod(0o664)
+        emps[0].salary = 1
+        trk.save_to_storage()
+        assert (tmp_path / "employees.rec").stat().st_mode & 0o777 == 0o664
+    def test_other_tables_stay_csvs(self, backend, tmp_path, example_tracker):
+        example_tracker(backend)
+        assert sorted(p.name for p in tmp_path.iterdir() if not p.name.startswith(".")) == ["departments.csv", "employees.rec", "permissions.csv", "users.csv"]
+    # Two instances saving the csv tables merge into them under the lock, as they do without a backend
+    def test_csv_tables_merge_other_instances_rows(self, backend, example_tracker):
+        trk, emps = example_tracker(backend)
+        mine = Tracker.load_from_storage(backend=backend)
+        theirs = Tracker.load_from_storage(backend=backend)
+        dep_id = next(iter(mine.departments))
+        theirs.create_department("HR", "People", emps[2].id)
+        theirs.save_to_storage()
+        mine.create_department("Sales", "Selling", emps[0].id)
+        mine.save_to_storage()
+        assert [dep.name for dep in Tracker.load_from_storage(backend=backend).departments.values()] == ["IT", "Help desk", "HR", "Sales"]
+        theirs.departments[dep_id].description = "Theirs"
+        theirs.save_to_storage()
+        mine.departments[dep_id].description = "Mine"
+        with pytest.raises(SaveConflictError) as err:
+            mine.save_to_storage()
+        assert list(err.value.conflicts) == ["departments"]
+        assert Tracker.load_from_storage(backend=backend).departments[dep_id].description == "Theirs"
+    def test_read_table(self, backend, example_tracker):
+        trk, emps = example_tracker(backend)
+        assert [emp.to_row() for emp in Employee.from_frame(backend.read_table("employees"))] == rows(trk.employees)
+    def test_changes_are_saved(self, backend, example_tracker, employee_kwargs):
+        trk, emps = example_tracker(backend)
+        loaded = Tracker.load_from_storage(backend=backend)
+        loaded.employees[emps[0].id].name = "Steven"
+        loaded.delete_employee(emps[1].id)
+        added = loaded.create_employee(**employee_kwargs("New"))
+        loaded.save_to_storage()
+        again = Tracker.load_from_storage(backend=backend)
+        assert [emp.name for emp in again.employees.values()] == ["Steven", "Zoë", "New"]
+        assert added.id in again.employees
+    def test_login_reads_one_employee(self, backend, example_tracker):
+        trk, emps = example_tracker(backend)
+        loaded = Tracker.load_from_storage(backend=backend)
+        assert login(loaded, emps[0].id, "password") == ["payroll", "hr_read"]
+    def test_lazy_employees_find_their_user(self, backend, example_tracker):
+        trk, emps = example_tracker(backend)
+        loaded = Tracker.load_from_storage(backend=backend)
+        assert loaded.employees[emps[0].id].password_hash == loaded.users[emps[0].id].password_hash == emps[0].password_hash
+    def test_reloaded_lazy_table_belongs_to_tracker(self, backend, example_tracker):
+        trk, emps = example_tracker(backend)
+        loaded = Tracker.load_from_storage(backend=backend)
+        loaded.reload_from_storage()
+        loaded.employees[emps[0].id].name = "Steven"
+        assert loaded._dirty["employees"] == {emps[0].id}
+        assert loaded.employees[emps[0].id].user is loaded.users[emps[0].id]
+
+class TestLazyTable:
+    @pytest.fixture
+    def table(self, backend, example_tracker):
+        trk, emps = example_tracker(backend)
+        built = []
+        def build(row):
+            built.append(row["id"])
+            return Employee.from_row(row)
+        changed = []
+        return LazyTable(RecordFile(backend.path), build, changed.append), emps, built, changed
+    def test_only_used_records_are_built(self, table):
+        lazy, emps, built, changed = table
+        assert emps[2].id in lazy
+        assert lazy[emps[2].id].name == "Zoë"
+        assert built == [emps[2].id]
+        assert len(lazy) == 3
+    def test_unknown_keys(self, table):
+        lazy, emps, built, changed = table
+        assert "emp_00000000" not in lazy
+        assert lazy.get("emp_00000000") is None
+        with pytest.raises(KeyError):
+            del lazy["emp_00000000"]
+    def test_changed_records_are_kept(self, table):
+        lazy, emps, built, changed = table
+        lazy[emps[0].id].salary = 1
+        gc.collect()
+        assert lazy[emps[0].id].salary == 1
+        assert [emp.id for emp in changed] == [emps[0].id]
+    def test_unchanged_records_are_let_go(self, table):
+        lazy, emps, built, changed = table
+        lazy[emps[0].id].name
+        gc.collect()
+        lazy[emps[0].id].name
+        assert built == [emps[0].id, emps[0].id]
+    def test_adds_and_deletes(self, table, employee_kwargs):
+        lazy, emps, built, changed = table
+        new = Employee(**employee_kwargs("New"))
+        lazy[new.id] = new
+        del lazy[emps[1].id]
+        assert list(lazy) == [emps[0].id, emps[2].id, new.id]
+        assert len(lazy) == 3
+        assert emps[1].id not in lazy
+        lazy[emps[1].id] = emps[1]
+        assert lazy[emps[1].id] is emps[1]
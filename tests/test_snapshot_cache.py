@@ -0,0 +1,87 @@
+import os
+import pytest
+from unittest.mock import MagicMock
+
+import employee_tracker.storage.storage as storage_module
+import employee_tracker.domain.tracker as tracker_module
+from employee_tracker.domain.tracker import Tracker
+from employee_tracker.domain.employee import Employee
+from employee_tracker.storage import snapshot_cache
+
+class TestSnapshotCache:
+    def test_cache_not_used_unless_asked(self, saved_tracker):
+        Tracker.load_from_storage()
+        assert not snapshot_cache.cache_path("employees").exists()
+    def test_first_load_writes_cache(self, saved_tracker):
+        Tracker.load_from_storage(cache=True)
+        for table in ("employees", "departments", "permissions", "users"):
+            assert snapshot_cache.cache_path(table).exists()
+    def test_second_load_skips_parsing(self, saved_tracker, monkeypatch):
+        first = Tracker.load_from_storage(cache=True)
+        monkeypatch.setattr(Employee, "from_frame", MagicMock(side_effect=AssertionError("csv was parsed")))
+        second = Tracker.load_from_storage(cache=True)
+        for table in ("employees", "departments", "permissions", "users"):
+            assert [r.to_row() for r in getattr(second, table).values()] == [r.to_row() for r in getattr(first, table).values()]
+    def test_cached_objects_are_tracked(self, saved_tracker):
+        Tracker.load_from_storage(cache=True)
+        trk = Tracker.load_from_storage(cache=True)
+        emp = next(iter(trk.employees.values()))
+        emp.salary = 1
+        assert trk.unsaved_tables() == ["employees"]
+    def test_stale_cache_is_rebuilt(self, saved_tracker):
+        trk = Tracker.load_from_storage(cache=True)
+        emp = next(iter(trk.employees.values()))
+        emp.name = "Changed"
+        trk.save_to_storage()
+        assert Tracker.load_from_storage(cache=True).employees[emp.id].name == "Changed"
+        assert snapshot_cache.load_table("employees")[1][0].name == "Changed"
+    # Deleting the last department can't be written to the csv, so the csv's snapshot mustn't be replaced with an empty table
+    def test_tables_left_unsaved_keep_their_snapshot(self, saved_tracker):
+        trk = Tracker.load_from_storage(cache=True)
+        trk.delete_department(next(iter(trk.departments)))
+        trk.save_to_storage()
+        assert trk.unsaved_tables() == ["departments"]
+        assert len(Tracker.load_from_storage(cache=True).departments) == 1
+    def test_touched_file_still_matches(self, saved_tracker):
+        Tracker.load_from_storage(cache=True)
+        path = storage_module.table_path("employees")
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10_000_000_000))
+        assert snapshot_cache.load_table("employees") is not None
+    # A failed cache write (e.g. another instance replacing the same file) mustn't look like a missing csv, or sample data would be written over it
+    def test_failed_cache_write_is_ignored(self, data_dir, saved_tracker, monkeypatch, caplog):
+        def clashing_replace(src, dst):
+            raise FileNotFoundError(src)
+        monkeypatch.setattr(snapshot_cache.os, "replace", clashing_replace)
+        trk = Tracker.load_or_create_sample(cache=True)
+        assert [emp.name for emp in trk.employees.values()] == ["James"]
+        assert "couldn't write the employees snapshot cache" in caplog.text
+        assert not list((data_dir / ".cache").iterdir())
+    def test_each_write_has_its_own_temporary_file(self, saved_tracker, monkeypatch):
+        temps = []
+        replace = os.replace
+        monkeypatch.setattr(snapshot_cache.os, "replace", lambda src, dst: temps.append(src) or replace(src, dst))
+        Tracker.load_from_storage(cache=True)
+        snapshot_cache.save_table("employees", None, [])
+        snapshot_cache.save_table("employees", None, [])
+        assert len(set(temps)) == len(temps)
+    # Hashing reads the whole csv, which a cached load is there to avoid
+    def test_cached_load_does_not_hash_the_csvs(self, saved_tracker, monkeypatch):
+        Tracker.load_from_storage(cache=True)
+        hashed = MagicMock(side_effect=AssertionError("csv was hashed"))
+        monkeypatch.setattr(storage_module, "fingerprint", hashed)
+        monkeypatch.setattr(tracker_module, "storage_fingerprint", hashed)
+        trk = Tracker.load_from_storage(cache=True)
+        assert len(trk.employees) == 1
+        assert not trk.tables_changed_on_disk()
+    def test_corrupt_cache_is_ignored(self, saved_tracker):
+        Tracker.load_from_storage(cache=True)
+        snapshot_cache.cache_path("employees").write_bytes(b"not a pickle")
+        assert len(Tracker.load_from_storage(cache=True).employees) == 1
+    def test_save_refreshes_cache(self, saved_tracker, monkeypatch):
+        trk = Tracker.load_from_storage(cache=True)
+        emp = next(iter(trk.employees.values()))
+        emp.name = "Saved"
+        trk.save_to_storage()
+        monkeypatch.setattr(Employee, "from_frame", MagicMock(side_effect=AssertionError("csv was parsed")))
+        assert Tracker.load_from_storage(cache=True).employees[emp.id].name == "Saved"
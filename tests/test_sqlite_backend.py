@@ -0,0 +1,129 @@
+import pytest
+import sqlite3
+from datetime import date
+
+from employee_tracker.domain.tracker import Tracker
+from employee_tracker.storage.sqlite_backend import SQLiteBackend
+from employee_tracker.gui.paging import show_more_rows
+from employee_tracker.utils.query import QueryResult
+
+@pytest.fixture
+def backend(tmp_path):
+    return SQLiteBackend(tmp_path / "tracker.db")
+
+class TestSQLiteBackend:
+    def test_missing_database_raises_file_not_found(self, backend):
+        with pytest.raises(FileNotFoundError):
+            Tracker.load_from_storage(backend=backend)
+    def test_round_trip(self, backend, example_tracker):
+        trk, emps = example_tracker(backend)
+        loaded = Tracker.load_from_storage(backend=backend)
+        for table in ("employees", "departments", "permissions", "users"):
+            original = [r.to_row() for r in getattr(trk, table).values()]
+            assert [r.to_row() for r in getattr(loaded, table).values()] == original
+    def test_uses_wal_mode(self, backend, example_tracker):
+        example_tracker(backend)
+        conn = sqlite3.connect(backend.path)
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        conn.close()
+    def test_indexes_exist(self, backend, example_tracker):
+        example_tracker(backend)
+        conn = sqlite3.connect(backend.path)
+        indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        conn.close()
+        assert {"idx_employees_name", "idx_employees_role", "idx_employees_salary", "idx_employees_start_date"} <= indexes
+    def test_membership_is_normalised(self, backend, example_tracker):
+        trk, emps = example_tracker(backend)
+        conn = sqlite3.connect(backend.path)
+        members = conn.execute("SELECT employee_id FROM department_members ORDER BY position").fetchall()
+        conn.close()
+        assert [m[0] for m in members] == [emps[0].id, emps[1].id]
+
+class TestRowLevelSave:
+    def test_only_changed_rows_are_written(self, backend, monkeypatch, example_tracker):
+        example_tracker(backend)
+        trk = Tracker.load_from_storage(backend=backend)
+        emp = next(iter(trk.employees.values()))
+        emp.salary = 12345
+        calls = []
+        original = backend.write_rows
+        monkeypatch.setattr(backend, "write_rows", lambda table, rows, deleted: calls.append((table, rows, deleted)) or original(table, rows, deleted))
+        trk.save_to_storage()
+        assert calls == [("employees", [emp.to_row()], [])]
+        assert Tracker.load_from_storage(backend=backend).employees[emp.id].salary == 12345
+    def test_deletes_are_written(self, backend, example_tracker):
+        example_tracker(backend)
+        trk = Tracker.load_from_storage(backend=backend)
+        dep = next(iter(trk.departments.values()))
+        trk.delete_department(dep.id)
+        trk.save_to_storage()
+        assert dep.id not in Tracker.load_from_storage(backend=backend).departments
+    def test_order_is_kept_after_update(self, backend, example_tracker):
+        example_tracker(backend)
+        trk = Tracker.load_from_storage(backend=backend)
+        first = next(iter(trk.employees.values()))
+        first.name = "Renamed"
+        trk.save_to_storage()
+        assert list(Tracker.load_from_storage(backend=backend).employees) == list(trk.employees)
+
+class TestQueryPushDown:
+    @pytest.mark.parametrize(
+        "filters",
+        [
+            dict(name_search="Ste"),
+            dict(role_search="Boss"),
+            dict(min_date=date(2023, 1, 1)),
+            dict(max_date=date(2023, 3, 3)),
+            dict(min_salary=50000),
+            dict(max_salary=50000, role_search="Boss"),
+            dict(name_search="ste"),
+        ],
+    )
+    def test_matches_in_memory_filtering(self, backend, filters, example_tracker):
+        example_tracker(backend)
+        trk = Tracker.load_from_storage(backend=backend)
+        in_memory = Tracker()
+        in_memory.employees = trk.employees
+        assert trk.list_employees(**filters) == in_memory.list_employees(**filters)
+    def test_query_goes_to_backend_when_saved(self, backend, monkeypatch, example_tracker):
+        example_tracker(backend)
+        trk = Tracker.load_from_storage(backend=backend)
+        monkeypatch.setattr(backend, "query_employee_ids", lambda **filters: [])
+        assert trk.list_employees(name_search="Ste") == []
+    def test_unsaved_changes_are_filtered_in_memory(self, backend, example_tracker, employee_kwargs):
+        example_tracker(backend)
+        trk = Tracker.load_from_storage(backend=backend)
+        emp = trk.create_employee(**employee_kwargs("Stephanie"))
+        assert emp in trk.list_employees(name_search="Ste")
+
+# Results pushed down to SQLite page like any other query result (see utils/query.py and gui/paging.py)
+class TestPagingPushedDown:
+    @pytest.fixture
+    def trk(self, backend, example_tracker):
+        example_tracker(backend)
+        return Tracker.load_from_storage(backend=backend)
+
+    def test_results_page_and_count(self, trk, backend, monkeypatch):
+        asked = []
+        query_employee_ids = backend.query_employee_ids
+        monkeypatch.setattr(backend, "query_employee_ids", lambda **filters: asked.append(filters) or query_employee_ids(**filters))
+        result = trk.list_employees(min_salary=30000)
+        assert isinstance(result, QueryResult)
+        assert result.count() == len(result) == 2
+        page = result.page(1)
+        assert [emp.name for emp in page] == ["Steve"]
+        assert [emp.name for emp in result.page(1, page.next_cursor)] == ["Zoë"]
+        assert [[emp.name for emp in page] for page in result.pages(1)] == [["Steve"], ["Zoë"]]
+        assert result.first().name == "Steve"
+        assert asked and all(filters["min_salary"] == 30000 for filters in asked)
+    def test_shown_a_page_at_a_time(self, trk, listbox):
+        ids = []
+        result = trk.list_employees(role_search="Boss")
+        assert show_more_rows(listbox, ids, result, lambda emp: emp.name, 1)
+        assert not show_more_rows(listbox, ids, result, lambda emp: emp.name, 1)
+        assert listbox.items == ["Steve", "Zoë"]
+    def test_result_sees_later_changes(self, trk, employee_kwargs):
+        result = trk.list_employees(name_search="Ste")
+        assert len(result) == 2
+        trk.create_employee(**employee_kwargs("Stephanie"))
+        assert [emp.name for emp in result] == ["Steve", "Stella", "Stephanie"]
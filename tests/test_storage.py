@@ -1,4 +1,8 @@
+import os
+import subprocess
+import sys
 import pytest
+import tracemalloc
 import pandas as pd
 from datetime import date
 from datetime import date
@@ -11,6 +15,9 @@ from employee_tracker.domain.permission import Permission
 from employee_tracker.storage.storage import create_dataframe
 from employee_tracker.storage.storage import write_csv
 from employee_tracker.storage.storage import read_csv
+from employee_tracker.storage.storage import read_csv_chunks
+from employee_tracker.storage.storage import read_csv_rows
+import employee_tracker.storage.storage as storage_module
 
 def valid_employee_kwargs():
     return dict(
@@ -84,4 +91,221 @@ class TestCSVManagement:
 
         loaded = loaded[original.columns]
 
-        assert_frame_equal(loaded, original, check_dtype=False) 
\ No newline at end of file
+        assert_frame_equal(loaded, original, check_dtype=False) 
+
+    def test_failed_write_keeps_old_csv(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(storage_module, "DATA_DIR", tmp_path)
+        (tmp_path / "users.csv").write_text("id,password_hash\nemp_aaaa1111,x\n")
+        class Broken:
+            def to_csv(self, path, index):
+                with open(path, "w") as f:
+                    f.write("half writ")
+                raise OSError("disk full")
+        with pytest.raises(OSError):
+            write_csv("users", Broken())
+        assert (tmp_path / "users.csv").read_text() == "id,password_hash\nemp_aaaa1111,x\n"
+        assert os.listdir(tmp_path) == ["users.csv"]
+
+    # The temporary file is only readable by its owner, which mustn't lock others out of a shared data folder
+    @pytest.mark.skipif(os.name != "posix", reason="file modes are only kept on posix")
+    @pytest.mark.parametrize("rows", [[{"id": "emp_aaaa1111", "password_hash": "x"}], pd.DataFrame({"id": ["emp_aaaa1111"], "password_hash": ["x"]})], ids=["rows", "dataframe"])
+    def test_save_keeps_file_mode(self, tmp_path, monkeypatch, rows):
+        monkeypatch.setattr(storage_module, "DATA_DIR", tmp_path)
+        write_csv("users", rows)
+        umask = os.umask(0)
+        os.umask(umask)
+        assert (tmp_path / "users.csv").stat().st_mode & 0o777 == 0o666 & ~umask
+        (tmp_path / "users.csv").chmod(0o664)
+        write_csv("users", rows)
+        assert (tmp_path / "users.csv").stat().st_mode & 0o777 == 0o664
+
+HASH = valid_employee_kwargs()["password_hash"]
+
+def write_employees_csv(path, rows):
+    with open(path, "w") as f:
+        f.write("id,name,role,start_date,salary,address,password_hash,permissions\n")
+        for i in range(rows):
+            f.write(f'emp_{i:08x},Person {i},Role,2024-10-02,{30000 + i},"{i} Lane, Town",{HASH},\n')
+
+class TestChunkedLoad:
+    def test_chunks_are_bounded(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(storage_module, "DATA_DIR", tmp_path)
+        write_employees_csv(tmp_path / "employees.csv", 25)
+        sizes = [len(chunk) for chunk in read_csv_chunks("employees", 10)]
+        assert sizes == [10, 10, 5]
+    def test_rejects_bad_chunksize(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(storage_module, "DATA_DIR", tmp_path)
+        write_employees_csv(tmp_path / "employees.csv", 1)
+        with pytest.raises(ValueError):
+            next(read_csv_chunks("employees", 0))
+    def test_chunked_load_matches_full_load(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(storage_module, "DATA_DIR", tmp_path)
+        trk = example_tracker_creation()
+        trk.create_permission("payroll")
+        trk.save_to_storage()
+        full = Tracker.load_from_storage()
+        chunked = Tracker.load_from_storage(chunk_size=1)
+        for table in ("employees", "departments", "permissions", "users"):
+            assert [r.to_row() for r in getattr(chunked, table).values()] == [r.to_row() for r in getattr(full, table).values()]
+    # Streaming through ten times as many rows shouldn't need much more memory, as each chunk is dropped before the next
+    def test_streaming_memory_is_bounded(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(storage_module, "DATA_DIR", tmp_path)
+        def peak(rows):
+            write_employees_csv(tmp_path / "employees.csv", rows)
+            tracemalloc.start()
+            for chunk in read_csv_chunks("employees", 1000):
+                Employee.from_frame(chunk)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            return peak
+        assert peak(50_000) < 2 * peak(5_000)
+
+class TestWithoutPandas:
+    def saved_tracker(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(storage_module, "DATA_DIR", tmp_path)
+        trk = example_tracker_creation()
+        trk.create_permission("payroll")
+        trk.save_to_storage()
+        return trk
+
+    def test_importing_tracker_does_not_import_pandas(self):
+        code = "import sys, employee_tracker.domain.tracker; print('pandas' in sys.modules, 'numpy' in sys.modules)"
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, env={**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)})
+        assert result.stdout.strip() == "False False"
+    # Setting a module to None in sys.modules makes importing it fail, as if it wasn't installed
+    def test_works_without_pandas_or_numpy_installed(self, tmp_path):
+        code = "\n".join([
+            "import sys",
+            "sys.modules['pandas'] = sys.modules['numpy'] = None",
+            "import employee_tracker.storage.storage as storage",
+            f"storage.DATA_DIR = storage.Path({str(tmp_path)!r})",
+            "from employee_tracker.domain.tracker import Tracker",
+            "from employee_tracker.utils.query import Predicate, Query",
+            "from employee_tracker.utils.generate_sample_data import generate_sample_data",
+            "generate_sample_data()",
+            "trk = Tracker.load_from_storage()",
+            "query = Query('employees', [Predicate('salary', 'min', 0)])",
+            "print(storage.USE_PANDAS, len(trk.query_columns(query).ids) == len(trk.employees) > 0)",
+        ])
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, env={**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)})
+        assert result.stdout.strip().splitlines()[-1] == "False True"
+    def test_csv_module_writes_same_files_as_pandas(self, tmp_path, monkeypatch):
+        self.saved_tracker(tmp_path, monkeypatch)
+        written_by_pandas = {path.name: path.read_bytes() for path in tmp_path.glob("*.csv")}
+        monkeypatch.setattr(storage_module, "USE_PANDAS", False)
+        trk = Tracker.load_from_storage()
+        trk._synced = set()
+        trk.save_to_storage()
+        assert {path.name: path.read_bytes() for path in tmp_path.glob("*.csv")} == written_by_pandas
+    def test_load_matches_pandas_load(self, tmp_path, monkeypatch):
+        self.saved_tracker(tmp_path, monkeypatch)
+        with_pandas = Tracker.load_from_storage()
+        monkeypatch.setattr(storage_module, "USE_PANDAS", False)
+        without = Tracker.load_from_storage()
+        for table in ("employees", "departments", "permissions", "users"):
+            assert [r.to_row() for r in getattr(without, table).values()] == [r.to_row() for r in getattr(with_pandas, table).values()]
+    def test_rows_are_converted(self, tmp_path, monkeypatch):
+        self.saved_tracker(tmp_path, monkeypatch)
+        assert next(read_csv_rows("permissions")) == {"name": "payroll", "active": False}
+
+CODECS = ["gzip", pytest.param("zstd", marks=pytest.mark.skipif(not storage_module.HAS_ZSTD, reason="needs zstandard"))]
+
+class TestCompression:
+    @pytest.fixture(params=CODECS)
+    def codec(self, request, tmp_path, monkeypatch):
+        monkeypatch.setattr(storage_module, "DATA_DIR", tmp_path)
+        monkeypatch.setattr(storage_module, "COMPRESSION", request.param)
+        return request.param
+    def rows(self, trk):
+        return {table: [r.to_row() for r in getattr(trk, table).values()] for table in ("employees", "departments", "permissions", "users")}
+
+    def test_tables_are_compressed(self, codec, tmp_path):
+        trk = example_tracker_creation()
+        trk.create_permission("payroll")
+        trk.save_to_storage()
+        suffix = storage_module.SUFFIXES[codec]
+        assert sorted(path.name for path in tmp_path.glob("*.csv*")) == sorted(f"{table}{suffix}" for table in ("departments", "employees", "permissions", "users"))
+        assert self.rows(Tracker.load_from_storage()) == self.rows(Tracker.load_from_storage(chunk_size=1))
+    def test_csv_module_reads_and_writes_the_same(self, codec, tmp_path, monkeypatch):
+        trk = example_tracker_creation()
+        trk.create_permission("payroll")
+        trk.save_to_storage()
+        with_pandas = self.rows(Tracker.load_from_storage())
+        monkeypatch.setattr(storage_module, "USE_PANDAS", False)
+        without = Tracker.load_from_storage()
+        assert self.rows(without) == with_pandas
+        without._synced = set()
+        without.save_to_storage()
+        monkeypatch.setattr(storage_module, "USE_PANDAS", True)
+        assert self.rows(Tracker.load_from_storage()) == with_pandas
+    def test_changing_compression_converts_on_save(self, codec, tmp_path, monkeypatch):
+        monkeypatch.setattr(storage_module, "COMPRESSION", None)
+        trk = example_tracker_creation()
+        trk.create_permission("payroll")
+        trk.save_to_storage()
+        plain = self.rows(Tracker.load_from_storage())
+        monkeypatch.setattr(storage_module, "COMPRESSION", codec)
+        # Tables that haven't been saved compressed yet are still read from the plain csvs
+        trk = Tracker.load_from_storage()
+        assert self.rows(trk) == plain
+        trk._synced = set()
+        trk.save_to_storage()
+        assert not list(tmp_path.glob("*.csv"))
+        assert storage_module.table_path("employees").name == f"employees{storage_module.SUFFIXES[codec]}"
+        assert self.rows(Tracker.load_from_storage()) == plain
+    def test_fingerprints_see_compressed_files(self, codec):
+        trk = example_tracker_creation()
+        trk.create_permission("payroll")
+        trk.save_to_storage()
+        loaded = Tracker.load_from_storage()
+        assert loaded.tables_changed_on_disk() == []
+        trk.employees[next(iter(trk.employees))].name = "Renamed"
+        trk.save_to_storage()
+        assert loaded.tables_changed_on_disk() == ["employees"]
+
+    def test_unknown_compression_is_refused(self):
+        with pytest.raises(ValueError):
+            storage_module.set_compression("rar")
+
+class TestMergeRows:
+    def test_rows_are_merged_by_key(self):
+        existing = [{"id": "a", "v": 1, "version": "0"}, {"id": "b", "v": 1, "version": "3"}]
+        merged, conflicts = storage_module.merge_rows(existing, "id", [{"id": "a", "v": 2, "version": 0}, {"id": "c", "v": 1, "version": 0}], [])
+        assert merged == [{"id": "a", "v": 2, "version": 1}, {"id": "b", "v": 1, "version": "3"}, {"id": "c", "v": 1, "version": 1}]
+        assert conflicts == {}
+    def test_stale_versions_conflict(self):
+        existing = [{"id": "a", "v": 1, "version": "2"}]
+        merged, conflicts = storage_module.merge_rows(existing, "id", [{"id": "a", "v": 2, "version": 1}, {"id": "gone", "v": 1, "version": 1}], [])
+        assert merged == existing
+        assert conflicts == {"a": existing[0], "gone": None}
+    def test_deletions_check_versions(self):
+        existing = [{"id": "a", "version": "1"}, {"id": "b", "version": "1"}]
+        merged, conflicts = storage_module.merge_rows(existing, "id", [], [("a", 1), ("b", 0), ("c", 0)])
+        assert merged == [{"id": "b", "version": "1"}]
+        assert list(conflicts) == ["b"]
+    def test_tables_without_versions_never_conflict(self):
+        merged, conflicts = storage_module.merge_rows([{"name": "hr", "active": True}], "name", [{"name": "hr", "active": False}], [])
+        assert merged == [{"name": "hr", "active": False}]
+        assert conflicts == {}
+
+class TestTableLock:
+    def test_lock_file_is_made_in_the_data_folder(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(storage_module, "DATA_DIR", tmp_path)
+        with storage_module.table_lock("employees"):
+            assert (tmp_path / ".employees.lock").exists()
+    @pytest.mark.skipif(storage_module.fcntl is None, reason="needs fcntl")
+    def test_other_processes_wait_for_the_lock(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(storage_module, "DATA_DIR", tmp_path)
+        script = (
+            "import fcntl, sys\n"
+            "f = open(sys.argv[1], 'a')\n"
+            "try:\n"
+            "    fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)\n"
+            "    print('free')\n"
+            "except BlockingIOError:\n"
+            "    print('held')\n"
+        )
+        check = lambda: subprocess.run([sys.executable, "-c", script, str(tmp_path / ".employees.lock")], capture_output=True, text=True).stdout.strip()
+        with storage_module.table_lock("employees"):
+            assert check() == "held"
+        assert check() == "free"
@@ -1,15 +1,22 @@
+import os
 import pytest
+import threading
 from datetime import date
 from unittest.mock import patch, MagicMock
 import pandas as pd
 
 from employee_tracker.domain.tracker import Tracker
+from employee_tracker.utils.filtering import filter_list
+from employee_tracker.utils.query import Predicate, Query, QueryResult
 from employee_tracker.domain.employee import Employee
 from employee_tracker.domain.department import Department
 from employee_tracker.domain.permission import Permission
 from employee_tracker.storage.storage import create_dataframe, write_csv, read_csv
 import employee_tracker.domain.tracker as tracker_module
-from employee_tracker.utils.passwords import hash_password
+import employee_tracker.storage.storage as storage_module
+from employee_tracker.storage.journal import Journal
+from employee_tracker.auth.login import login, login_async, check_login
+from employee_tracker.utils.passwords import hash_password, hashing_cost, verify_password
 
 
 def valid_employee_kwargs():
@@ -88,6 +95,168 @@ class TestCreateEmployee:
         emp = trk.create_employee("John","Boss",date(2024, 10, 2),50000,"My Address",None,"password")
         assert isinstance(trk.employees[emp.id],Employee)
 
+class TestLoginAsync:
+    def test_result_is_permissions(self):
+        trk = Tracker()
+        trk.create_permission("payroll")
+        emp = trk.create_employee("John","Boss",date(2024, 10, 2),50000,"My Address",["payroll"],"password")
+        assert login_async(trk, emp.id, "password").result(timeout=10) == (["payroll"], None)
+    def test_wrong_password_raises_from_result(self):
+        trk = Tracker()
+        emp = trk.create_employee("John","Boss",date(2024, 10, 2),50000,"My Address",None,"password")
+        with pytest.raises(PermissionError, match="Incorrect password"):
+            login_async(trk, emp.id, "wrong").result(timeout=10)
+    def test_missing_user_raises_from_result(self):
+        with pytest.raises(LookupError, match="No such user"):
+            login_async(Tracker(), "emp_missing", "password").result(timeout=10)
+    def test_runs_on_a_worker_thread(self, monkeypatch):
+        threads = []
+        monkeypatch.setattr("employee_tracker.auth.login.check_login", lambda tr, emp, pw: threads.append(threading.current_thread()))
+        login_async(Tracker(), "emp_1", "password").result(timeout=10)
+        assert threads[0] is not threading.current_thread()
+
+class TestPasswordUpgrade:
+    @pytest.fixture
+    def trk(self):
+        trk = Tracker()
+        trk.create_permission("payroll")
+        trk.create_employee("John","Boss",date(2024, 10, 2),50000,"My Address",["payroll"],"password")
+        trk._dirty = {table: set() for table in trk._dirty}
+        return trk
+    def test_cheaper_hash_upgraded_on_login(self, trk):
+        emp_id = next(iter(trk.employees))
+        with hashing_cost(2000):
+            assert login(trk, emp_id, "password") == ["payroll"]
+        new_hash = trk.users[emp_id].password_hash
+        assert new_hash.split("$")[1] == "2000"
+        assert trk.employees[emp_id].password_hash == new_hash
+        assert verify_password("password", new_hash)
+        assert trk._dirty["users"] == {emp_id}
+        assert not trk._dirty["employees"]
+    def test_hash_kept_when_cost_is_current(self, trk):
+        emp_id = next(iter(trk.employees))
+        old_hash = trk.users[emp_id].password_hash
+        login(trk, emp_id, "password")
+        assert trk.users[emp_id].password_hash == old_hash
+        assert not trk._dirty["users"]
+    def test_failed_login_does_not_upgrade(self, trk):
+        emp_id = next(iter(trk.employees))
+        old_hash = trk.users[emp_id].password_hash
+        with hashing_cost(2000):
+            with pytest.raises(PermissionError):
+                login(trk, emp_id, "wrong")
+        assert trk.users[emp_id].password_hash == old_hash
+    def test_check_login_leaves_tracker_unchanged(self, trk):
+        emp_id = next(iter(trk.employees))
+        with hashing_cost(2000):
+            permissions, new_hash = check_login(trk, emp_id, "password")
+        assert permissions == ["payroll"] and verify_password("password", new_hash)
+        assert trk.users[emp_id].password_hash != new_hash
+        assert not trk._dirty["users"]
+
+class TestSingleCredentialStore:
+    def test_employee_and_user_share_one_hash(self):
+        trk = Tracker()
+        emp = trk.create_employee(**valid_employee_kwargs())
+        assert emp.user is trk.users[emp.id]
+        assert emp._user is None
+        assert emp.password_hash is trk.users[emp.id].password_hash
+    def test_password_change_hashes_once(self):
+        trk = Tracker()
+        emp = trk.create_employee(**valid_employee_kwargs())
+        trk._dirty = {table: set() for table in trk._dirty}
+        with patch("employee_tracker.domain.tracker.hash_password", wraps=hash_password) as hasher:
+            trk.update_employee_password(emp.id, "new-password")
+        hasher.assert_called_once_with("new-password")
+        assert emp.password_hash == trk.users[emp.id].password_hash
+        assert verify_password("new-password", emp.password_hash)
+        assert trk._dirty["users"] == {emp.id}
+        assert not trk._dirty["employees"]
+    def test_password_change_for_missing_employee(self):
+        with pytest.raises(KeyError, match="not found"):
+            Tracker().update_employee_password("emp_00000000", "new-password")
+    def test_employee_without_credentials_is_not_added(self):
+        trk = Tracker()
+        kwargs = valid_employee_kwargs()
+        del kwargs["password"]
+        with pytest.raises(ValueError, match="needs a password"):
+            trk.create_employee(**kwargs)
+        assert not trk.employees and not trk.users
+    # Every table needs a row to be saved
+    @pytest.fixture
+    def saved(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(storage_module, "DATA_DIR", tmp_path)
+        trk = Tracker()
+        trk.create_permission("payroll")
+        emp = trk.create_employee(**valid_employee_kwargs())
+        trk.create_department("IT", "Computers", emp.id)
+        trk.save_to_storage()
+        return emp
+    def test_hash_only_saved_with_users(self, saved, tmp_path):
+        emp = saved
+        assert "password_hash" not in (tmp_path / "employees.csv").read_text()
+        loaded = Tracker.load_from_storage()
+        assert loaded.employees[emp.id].password_hash == emp.password_hash
+        assert login(loaded, emp.id, "password") == []
+    def test_old_hash_column_dropped_on_save(self, saved, tmp_path):
+        emp = saved
+        lines = (tmp_path / "employees.csv").read_text().splitlines()
+        lines = [lines[0] + ",password_hash"] + [line + "," + emp.password_hash for line in lines[1:]]
+        (tmp_path / "employees.csv").write_text("\n".join(lines) + "\n")
+        loaded = Tracker.load_from_storage()
+        loaded.employees[emp.id].name = "Changed"
+        added = loaded.create_employee(**valid_employee_kwargs())
+        loaded.save_to_storage()
+        assert "password_hash" not in (tmp_path / "employees.csv").read_text()
+        again = Tracker.load_from_storage()
+        assert again.employees[emp.id].name == "Changed"
+        assert again.employees[added.id].password_hash == added.password_hash
+    def test_employees_see_reloaded_users(self, saved):
+        emp = saved
+        loaded = Tracker.load_from_storage()
+        other = Tracker.load_from_storage()
+        other.update_employee_password(emp.id, "changed elsewhere")
+        other.save_to_storage()
+        assert loaded.reload_from_storage() == ["users"]
+        assert verify_password("changed elsewhere", loaded.employees[emp.id].password_hash)
+
+class TestCreateEmployees:
+    def test_employees_and_users_are_created_in_order(self):
+        trk = Tracker()
+        trk.create_permission("payroll")
+        emps = trk.create_employees([{**valid_employee_kwargs(), "name": "A", "permissions": ["payroll"]}, {**valid_employee_kwargs(), "name": "B", "password": "other"}])
+        assert [emp.name for emp in trk.employees.values()] == ["A", "B"]
+        assert list(trk.users) == [emp.id for emp in emps]
+        assert trk.users[emps[1].id].password_hash == emps[1].password_hash
+        assert login(trk, emps[0].id, "password") == ["payroll"]
+        assert login(trk, emps[1].id, "other") == []
+        assert trk._dirty["employees"] == trk._dirty["users"] == {emp.id for emp in emps}
+    def test_existing_hashes_are_kept(self):
+        trk = Tracker()
+        hash = hash_password("password")
+        kwargs = valid_employee_kwargs()
+        del kwargs["password"]
+        emp, = trk.create_employees([{**kwargs, "password_hash": hash}])
+        assert emp.password_hash == hash
+    def test_nothing_is_added_if_one_is_invalid(self):
+        trk = Tracker()
+        with pytest.raises(TypeError):
+            trk.create_employees([valid_employee_kwargs(), {**valid_employee_kwargs(), "salary": "lots"}])
+        with pytest.raises(TypeError):
+            trk.create_employees([valid_employee_kwargs(), {**valid_employee_kwargs(), "permissions": ["missing"]}])
+        assert trk.employees == {} and trk.users == {}
+        assert trk._dirty["employees"] == trk._dirty["users"] == set()
+    def test_nothing_is_added_if_one_has_no_usable_password(self):
+        trk = Tracker()
+        kwargs = valid_employee_kwargs()
+        del kwargs["password"]
+        with pytest.raises(ValueError, match="employee 1 has an invalid password_hash"):
+            trk.create_employees([valid_employee_kwargs(), {**kwargs, "password_hash": "not a hash"}])
+        with pytest.raises(ValueError, match="employee 1 needs a password"):
+            trk.create_employees([valid_employee_kwargs(), kwargs])
+        assert trk.employees == {} and trk.users == {}
+        assert trk._dirty["employees"] == trk._dirty["users"] == set()
+
 class TestCreateEmployeeTypeValidation:
     @pytest.mark.parametrize(
         "field,value,error",
@@ -114,6 +283,7 @@ class TestCreateEmployeeTypeValidation:
 class TestListEmployees:
     def test_tracker_has_list_employees_method(self):
         assert hasattr(Tracker,"list_employees")
+    # A lazy result, which still reads like a list
     def test_list_employees_returns_list(self):
         trk = Tracker()
         kwargs = valid_employee_kwargs()
@@ -122,7 +292,8 @@ class TestListEmployees:
         trk.create_employee(**kwargs)
         trk.create_employee(**kwargs)
         employee_list = trk.list_employees()
-        assert isinstance(employee_list,list)
+        assert isinstance(employee_list,QueryResult)
+        assert employee_list == list(trk.employees.values())
     def test_list_employees_returns_all_employees_when_called_with_no_arguments(self):
         trk = Tracker()
         kwargs = valid_employee_kwargs()
@@ -231,6 +402,177 @@ class TestListEmployees:
         assert len(employee_list) == 1
         assert employee_list[0].salary == 40000
 
+class TestEmployeeIndexes:
+    @pytest.fixture
+    def trk(self):
+        trk = Tracker()
+        for i, (salary, start) in enumerate([(30000, date(2020, 1, 1)), (50000, date(2021, 6, 1)), (40000, date(2019, 3, 1)), (50000, date(2022, 2, 2))]):
+            trk.create_employee(**{**valid_employee_kwargs(), "name": f"Person {i}", "salary": salary, "start_date": start})
+        return trk
+    # What the original filtering gives, checking every employee
+    @staticmethod
+    def scanned(trk, min_salary=None, max_salary=None, min_date=None, max_date=None):
+        found = list(trk.employees.values())
+        for value, attribute, kind in ((min_salary, "salary", "min"), (max_salary, "salary", "max"), (min_date, "start_date", "min"), (max_date, "start_date", "max")):
+            if value is not None:
+                found = filter_list(found, attribute, value, kind)
+        return found
+    def check(self, trk):
+        for query in (dict(min_salary=40000), dict(max_salary=45000), dict(min_salary=50000, max_salary=50000), dict(min_date=date(2020, 1, 1), max_salary=50000), dict(max_date=date(2021, 1, 1))):
+            assert trk.list_employees(**query) == self.scanned(trk, **query)
+    def test_ranges_match_scanning(self, trk):
+        self.check(trk)
+        assert "employees" in trk._indexes
+    def test_kept_up_to_date_through_changes(self, trk):
+        self.check(trk)
+        indexes = trk._indexes["employees"]
+        emps = list(trk.employees.values())
+        emps[0].salary = 60000
+        trk.update_employee(emps[1].id, {"start_date": date(2018, 1, 1), "salary": 20000})
+        trk.delete_employee(emps[2].id)
+        trk.create_employee(**{**valid_employee_kwargs(), "salary": 45000, "start_date": date(2023, 1, 1)})
+        assert trk._indexes["employees"] is indexes
+        self.check(trk)
+    def test_results_in_table_order(self, trk):
+        assert [emp.name for emp in trk.list_employees(min_salary=0)] == ["Person 0", "Person 1", "Person 2", "Person 3"]
+    def test_combined_with_name_search(self, trk):
+        assert [emp.name for emp in trk.list_employees(name_search="1", min_salary=50000)] == ["Person 1"]
+    def test_invalid_values_raise_as_before(self, trk):
+        with pytest.raises(TypeError, match="Integer or date expected"):
+            trk.list_employees(min_salary="lots")
+        with pytest.raises(TypeError, match="Integer or date expected"):
+            trk.list_employees(max_date=True)
+    def test_values_that_cant_be_sorted_fall_back_to_scanning(self, trk):
+        self.check(trk)
+        emp = next(iter(trk.employees.values()))
+        emp.start_date = "2020-01-01"
+        assert "employees" not in trk._indexes
+        assert len(trk.list_employees(min_salary=40000)) == 3
+        # Only the salary index was needed, the start date index still can't be built
+        assert trk._table_indexes("employees", "start_date") is None
+    def test_merged_rows_are_indexed(self, tmp_path, monkeypatch, trk):
+        monkeypatch.setattr(storage_module, "DATA_DIR", tmp_path)
+        trk.create_permission("payroll")
+        trk.create_department("IT", "Computers", next(iter(trk.employees)))
+        trk.save_to_storage()
+        loaded = Tracker.load_from_storage()
+        assert len(loaded.list_employees(min_salary=50000)) == 2
+        other = Tracker.load_from_storage()
+        emp = next(iter(other.employees.values()))
+        emp.salary = 99000
+        other.delete_employee(list(other.employees)[1])
+        other.save_to_storage()
+        assert loaded.merge_from_storage()
+        self.check(loaded)
+        assert [e.salary for e in loaded.list_employees(min_salary=50000)] == [99000, 50000]
+
+class TestTextIndexes:
+    @pytest.fixture
+    def trk(self):
+        trk = Tracker()
+        for name, role in [("Alice Smith", "Developer"), ("Bob Smithson", "Manager"), ("Carol Jones", "developer"), ("Dave Brown", "Tester")]:
+            trk.create_employee(**{**valid_employee_kwargs(), "name": name, "role": role})
+        return trk
+    def test_name_and_role_searches_match_scanning(self, trk):
+        for name_search, role_search in (("Smith", None), ("smith", None), (None, "eloper"), ("Smith", "Dev"), ("es", None), ("Nobody", None), ("", None)):
+            scanned = list(trk.employees.values())
+            for value, attribute in ((name_search, "name"), (role_search, "role")):
+                if value is not None:
+                    scanned = filter_list(scanned, attribute, value, "string")
+            assert trk.list_employees(name_search=name_search, role_search=role_search) == scanned
+    # The index ignores case and covers name and role together, but list_employees still matches as filter_list does
+    def test_searches_stay_case_sensitive_and_per_attribute(self, trk):
+        assert [emp.name for emp in trk.list_employees(role_search="Developer")] == ["Alice Smith"]
+        assert trk.list_employees(name_search="Developer") == []
+    def test_combined_with_ranges(self, trk):
+        emps = list(trk.employees.values())
+        emps[1].salary = 90000
+        assert [emp.name for emp in trk.list_employees(name_search="Smith", min_salary=80000)] == ["Bob Smithson"]
+    def test_kept_up_to_date_through_changes(self, trk):
+        assert len(trk.list_employees(name_search="Smith")) == 2
+        emps = list(trk.employees.values())
+        emps[0].name = "Alice Jones"
+        trk.delete_employee(emps[1].id)
+        trk.create_employee(**{**valid_employee_kwargs(), "name": "Eve Smith"})
+        assert [emp.name for emp in trk.list_employees(name_search="Smith")] == ["Eve Smith"]
+        assert [emp.name for emp in trk.list_employees(name_search="Jones")] == ["Alice Jones", "Carol Jones"]
+    def test_search_employees_matches_name_and_role_ignoring_case(self, trk):
+        assert [emp.name for emp in trk.search_employees("DEVELOPER")] == ["Alice Smith", "Carol Jones"]
+        assert [emp.name for emp in trk.search_employees("smith dev")] == ["Alice Smith"]
+        assert [emp.name for emp in trk.search_employees("ow")] == ["Dave Brown"]
+    def test_department_searches(self, trk):
+        head = next(iter(trk.employees))
+        trk.create_department("Engineering", "Builds things", head)
+        trk.create_department("Sales", "Sells the things we engineer", head)
+        assert [dep.name for dep in trk.list_departments(name_search="Engine")] == ["Engineering"]
+        assert [dep.name for dep in trk.list_departments(description_search="things")] == ["Engineering", "Sales"]
+        assert [dep.name for dep in trk.list_departments(description_search="things", head_of_department_search=head)] == ["Engineering", "Sales"]
+        trk.update_department(list(trk.departments)[0], {"description": "Makes stuff"})
+        assert [dep.name for dep in trk.list_departments(description_search="things")] == ["Sales"]
+
+class TestQuery:
+    @pytest.fixture
+    def trk(self):
+        trk = Tracker()
+        for name, salary in [("Ann", 30000), ("Ben", 50000), ("Cat", 40000), ("Dan", 50000)]:
+            trk.create_employee(**{**valid_employee_kwargs(), "name": name, "salary": salary})
+        return trk
+    def test_sorted_and_paged(self, trk):
+        query = Query("employees", [Predicate("salary", "min", 40000)], sort="-salary", limit=2)
+        assert [emp.name for emp in trk.query(query)] == ["Ben", "Dan"]
+        assert [emp.name for emp in trk.query(Query("employees", sort="salary", offset=1, limit=2))] == ["Cat", "Ben"]
+    def test_plan_uses_built_indexes(self, trk):
+        plan = trk.plan(Query("employees", [Predicate("name", "string", "Ben"), Predicate("salary", "max", 35000)]))
+        assert [step.name for step in plan.steps][0] == "salary"
+        assert sorted(trk._indexes["employees"].built()) == ["salary", "text"]
+    def test_list_employees_only_builds_the_indexes_it_needs(self, trk):
+        trk.list_employees(min_salary=40000)
+        assert list(trk._indexes["employees"].built()) == ["salary"]
+    def test_unknown_table(self, trk):
+        with pytest.raises(ValueError):
+            trk.query(Query("projects"))
+
+class TestQueryColumns:
+    @pytest.fixture
+    def trk(self):
+        trk = Tracker()
+        for name, role, salary in [("Ann", "Clerk", 30000), ("Ben", "Manager", 50000), ("Cat", "Clerk", 40000), ("Dan", "Driver", 50000)]:
+            trk.create_employee(**{**valid_employee_kwargs(), "name": name, "role": role, "salary": salary})
+        return trk
+    QUERIES = [
+        Query("employees", [Predicate("salary", "min", 40000), Predicate("role", "string", "er")]),
+        Query("employees", [Predicate("start_date", "max", date(2030, 1, 1)), Predicate("name", "string", "a")], sort="-salary"),
+        Query("employees", [Predicate("address", "string", "Lane")], limit=2, offset=1),
+    ]
+    def check(self, trk):
+        for query in self.QUERIES:
+            assert list(trk.query_columns(query)) == trk.query(query)
+    def test_same_as_query(self, trk):
+        self.check(trk)
+        assert trk.query_columns(self.QUERIES[0]).ids == [emp.id for emp in trk.query(self.QUERIES[0])]
+    def test_kept_up_to_date_through_changes(self, trk):
+        self.check(trk)
+        columns = trk._columns["employees"]
+        emps = list(trk.employees.values())
+        emps[0].role = "Manager"
+        trk.update_employee(emps[1].id, {"salary": 20000, "name": "Benjamin"})
+        trk.delete_employee(emps[2].id)
+        trk.create_employee(**{**valid_employee_kwargs(), "name": "Eve", "role": "Driver", "salary": 60000})
+        assert trk._columns["employees"] is columns
+        self.check(trk)
+    def test_dropped_when_values_dont_fit(self, trk):
+        self.check(trk)
+        next(iter(trk.employees.values())).start_date = "2020-01-01"
+        assert "employees" not in trk._columns
+        query = Query("employees", [Predicate("salary", "min", 40000)])
+        assert list(trk.query_columns(query)) == trk.query(query)
+        assert "employees" not in trk._columns
+    def test_tables_without_columns_are_queried_as_normal(self, trk):
+        trk.create_department("IT", "Computers", next(iter(trk.employees)))
+        view = trk.query_columns(Query("departments", [Predicate("name", "string", "IT")]))
+        assert [dep.name for dep in view] == ["IT"]
+        assert view.ids == list(trk.departments)
+
 class TestDeleteEmployee:
     def test_tracker_has_delete_employee_method(self):
         assert hasattr(Tracker,"delete_employee")
@@ -345,7 +687,8 @@ class TestListDepartments:
         trk.create_department(**kwargs)
         trk.create_department(**kwargs)
         department_list = trk.list_departments()
-        assert isinstance(department_list,list)
+        assert isinstance(department_list,QueryResult)
+        assert department_list == list(trk.departments.values())
     def test_list_departments_returns_all_departments_when_called_with_no_arguments(self):
         trk = Tracker()
         kwargs = valid_department_kwargs()
@@ -580,7 +923,7 @@ class TestStorageManagement:
         create_df_mock.assert_called_once()
         write_mock.assert_called_once()
     
-    def test_load_calls_from_row(self, monkeypatch):
+    def test_load_calls_from_frame(self, monkeypatch):
         emp_df = pd.DataFrame([{
             "id": "emp_aaaa1111",
             "name": "James",
@@ -607,13 +950,192 @@ class TestStorageManagement:
         fake_emp = MagicMock()
         fake_emp.id = "emp_aaaa1111"
 
-        emp_from_row = MagicMock(return_value=fake_emp)
-        monkeypatch.setattr(tracker_module.Employee, "from_row", emp_from_row)
+        emp_from_frame = MagicMock(return_value=[fake_emp])
+        monkeypatch.setattr(tracker_module.Employee, "from_frame", emp_from_frame)
         
-        monkeypatch.setattr(tracker_module.Department, "from_row", MagicMock())
+        monkeypatch.setattr(tracker_module.Department, "from_frame", MagicMock(return_value=[]))
         monkeypatch.setattr(tracker_module.Permission, "from_row", MagicMock())
 
         tracker = Tracker.load_from_storage()
 
-        emp_from_row.assert_called_once_with(emp_df.to_dict(orient="records")[0])
+        emp_from_frame.assert_called_once_with(emp_df)
         assert tracker.employees["emp_aaaa1111"] is fake_emp
+
+class TestIncrementalSave:
+    def saved_tables(self, tracker, monkeypatch):
+        written = []
+        monkeypatch.setattr(tracker_module, "write_csv", lambda table, df: written.append(table))
+        tracker.save_to_storage()
+        return written
+
+    def synced_tracker(self):
+        trk = Tracker()
+        trk.create_permission("payroll")
+        emp = trk.create_employee(**valid_employee_kwargs())
+        trk.create_department("IT", "Computers", emp.id)
+        trk._mark_synced()
+        return trk, emp
+
+    def test_new_tracker_saves_every_table(self, monkeypatch):
+        trk, emp = self.synced_tracker()
+        trk._synced = set()
+        assert sorted(self.saved_tables(trk, monkeypatch)) == sorted(["employees", "departments", "permissions", "users"])
+    def test_nothing_saved_when_unchanged(self, monkeypatch):
+        trk, emp = self.synced_tracker()
+        assert not trk.has_unsaved_changes()
+        assert self.saved_tables(trk, monkeypatch) == []
+    def test_setter_marks_only_its_table(self, monkeypatch):
+        trk, emp = self.synced_tracker()
+        emp.salary = 99999
+        assert trk.unsaved_tables() == ["employees"]
+        assert self.saved_tables(trk, monkeypatch) == ["employees"]
+        assert self.saved_tables(trk, monkeypatch) == []
+    def test_failed_write_leaves_every_table_unsaved(self, monkeypatch):
+        trk, emp = self.synced_tracker()
+        trk._synced = set()
+        def write(table, df):
+            if table == "users":
+                raise OSError("disk full")
+        monkeypatch.setattr(tracker_module, "write_csv", write)
+        with pytest.raises(OSError):
+            trk.save_to_storage()
+        assert trk.unsaved_tables() == ["employees", "departments", "permissions", "users"]
+    def test_missing_table_is_named_when_loading(self, monkeypatch):
+        def read(table):
+            if table == "departments":
+                raise FileNotFoundError(table)
+            return pd.DataFrame()
+        monkeypatch.setattr(tracker_module, "read_csv", read)
+        monkeypatch.setattr(tracker_module.Employee, "from_frame", MagicMock(return_value=[]))
+        with pytest.raises(FileNotFoundError, match="no departments file found"):
+            Tracker.load_from_storage()
+    def test_update_employee_marks_row_dirty(self):
+        trk, emp = self.synced_tracker()
+        trk.update_employee(emp.id, {"name": "Someone"})
+        assert trk._dirty["employees"] == {emp.id}
+    def test_create_and_delete_mark_tables_dirty(self):
+        trk, emp = self.synced_tracker()
+        dep = trk.create_department("HR", "People", emp.id)
+        trk.delete_department(dep.id)
+        assert trk.unsaved_tables() == ["departments"]
+    def test_department_membership_changes_are_tracked(self):
+        trk, emp = self.synced_tracker()
+        dep = next(iter(trk.departments.values()))
+        trk.add_employee_to_department(dep.id, emp.id)
+        assert trk._dirty["departments"] == {dep.id}
+    def test_deleted_employee_is_no_longer_tracked(self):
+        trk, emp = self.synced_tracker()
+        trk.delete_employee(emp.id)
+        trk._dirty["employees"].clear()
+        emp.salary = 1
+        assert trk._dirty["employees"] == set()
+
+class TestStagedLoad:
+    @pytest.fixture
+    def saved(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(storage_module, "DATA_DIR", tmp_path)
+        trk = Tracker()
+        trk.create_permission("payroll")
+        emp = trk.create_employee(**valid_employee_kwargs(), permissions=["payroll"])
+        trk.create_department("IT", "Computers", emp.id)
+        trk.save_to_storage()
+        return emp
+
+    # Employees is held up until the test releases it, to show what is available before it finishes
+    def hold_employees(self, monkeypatch):
+        release = threading.Event()
+        from_frame = tracker_module.Employee.from_frame
+        def held(df):
+            release.wait(5)
+            return from_frame(df)
+        monkeypatch.setattr(tracker_module.Employee, "from_frame", held)
+        return release
+
+    def test_users_available_before_rest_has_loaded(self, saved, monkeypatch):
+        release = self.hold_employees(monkeypatch)
+        trk = Tracker.load_from_storage(staged=True)
+        assert saved.id in trk.users
+        assert not trk.is_loaded()
+        release.set()
+        trk.wait_until_loaded()
+        assert trk.is_loaded()
+        assert trk.employees[saved.id].permissions == ["payroll"]
+        assert not trk.has_unsaved_changes()
+    def test_login_waits_for_employees(self, saved, monkeypatch):
+        release = self.hold_employees(monkeypatch)
+        trk = Tracker.load_from_storage(staged=True)
+        threading.Timer(0.05, release.set).start()
+        assert login(trk, saved.id, "password") == ["payroll"]
+    def test_login_async_does_not_wait_for_employees(self, saved, monkeypatch):
+        release = self.hold_employees(monkeypatch)
+        trk = Tracker.load_from_storage(staged=True)
+        future = login_async(trk, saved.id, "password")
+        assert not future.done()
+        release.set()
+        assert future.result(timeout=10) == (["payroll"], None)
+    # A password changed since the last save is only in the journal, and must be the one login checks against
+    def test_journaled_password_change_is_used_for_login(self, saved, tmp_path, monkeypatch):
+        trk = Tracker.load_from_storage(journal=Journal(tmp_path / "journal.log"))
+        trk.update_employee_password(saved.id, "changed")
+        trk.journal.close()
+        release = self.hold_employees(monkeypatch)
+        trk = Tracker.load_from_storage(journal=Journal(tmp_path / "journal.log"), staged=True)
+        threading.Timer(0.05, release.set).start()
+        with pytest.raises(PermissionError):
+            login(trk, saved.id, "password")
+        assert login(trk, saved.id, "changed") == ["payroll"]
+        assert verify_password("changed", trk.users[saved.id].password_hash)
+        assert trk.unsaved_tables() == ["users"]
+    def test_missing_csv_raises_before_returning(self, saved, tmp_path):
+        (tmp_path / "departments.csv").unlink()
+        with pytest.raises(FileNotFoundError, match="no departments file found"):
+            Tracker.load_from_storage(staged=True)
+    def test_background_failure_raised_when_waited_on(self, saved, monkeypatch):
+        monkeypatch.setattr(tracker_module.Department, "from_frame", MagicMock(side_effect=ValueError("bad department")))
+        trk = Tracker.load_from_storage(staged=True)
+        with pytest.raises(ValueError, match="bad department"):
+            trk.wait_until_loaded()
+        with pytest.raises(ValueError, match="bad department"):
+            trk.save_to_storage()
+
+class TestReload:
+    @pytest.fixture
+    def trk(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(storage_module, "DATA_DIR", tmp_path)
+        trk = Tracker()
+        trk.create_permission("payroll")
+        emp = trk.create_employee(**valid_employee_kwargs())
+        trk.create_department("IT", "Computers", emp.id)
+        trk.save_to_storage()
+        return Tracker.load_from_storage()
+
+    def test_nothing_reloaded_when_unchanged(self, trk, monkeypatch):
+        monkeypatch.setattr(tracker_module, "read_csv", MagicMock(side_effect=AssertionError("csv was read")))
+        employees = trk.employees
+        assert trk.reload_from_storage() == []
+        assert trk.employees is employees
+    def test_only_changed_table_reloaded(self, trk):
+        other = Tracker.load_from_storage()
+        emp = next(iter(other.employees.values()))
+        emp.name = "Changed elsewhere"
+        other.save_to_storage()
+        departments = trk.departments
+        assert trk.reload_from_storage() == ["employees"]
+        assert trk.employees[emp.id].name == "Changed elsewhere"
+        assert trk.departments is departments
+        assert not trk.has_unsaved_changes()
+    def test_unsaved_changes_are_thrown_away(self, trk):
+        emp = next(iter(trk.employees.values()))
+        emp.name = "Not saved"
+        assert trk.reload_from_storage() == ["employees"]
+        assert trk.employees[emp.id].name == "James"
+    def test_own_save_does_not_trigger_reload(self, trk):
+        emp = next(iter(trk.employees.values()))
+        emp.name = "Saved"
+        trk.save_to_storage()
+        assert trk.reload_from_storage() == []
+    def test_touched_file_is_not_reloaded(self, trk, tmp_path):
+        path = tmp_path / "users.csv"
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10_000_000_000))
+        assert trk.reload_from_storage() == []
@@ -1,4 +1,5 @@
 import pytest
+import pandas as pd
 
 from employee_tracker.domain.user import User
 from employee_tracker.utils.passwords import hash_password, verify_password,is_valid_stored_password_hash
@@ -49,4 +50,13 @@ class TestPasswordUpdate:
         user = User(**valid_user_kwargs())
         new_hash = "bad_hash"
         with pytest.raises(ValueError,match="not a valid password hash"):
-            user.password_hash = new_hash
\ No newline at end of file
+            user.password_hash = new_hash
+class TestReturnFromFrame:
+    def test_from_frame_builds_users(self):
+        hash = hash_password("password")
+        users = User.from_frame(pd.DataFrame([{"id": "emp_1234abcd", "password_hash": hash}]))
+        assert users[0].id == "emp_1234abcd"
+        assert users[0].password_hash == hash
+    def test_from_frame_invalid_hash_raises(self):
+        with pytest.raises(ValueError, match="not a valid password hash"):
+            User.from_frame(pd.DataFrame([{"id": "emp_1234abcd", "password_hash": "bad_hash"}]))
@@ -7,7 +7,12 @@ from employee_tracker.utils.ids import new_id, check_id
 from employee_tracker.utils.value_checkers import check_new_value
 from employee_tracker.utils.filtering import filter_list
 from employee_tracker.domain.employee import Employee
-from employee_tracker.utils.passwords import hash_password, verify_password,is_valid_stored_password_hash
+import hashlib
+import os
+import pandas as pd
+from employee_tracker.utils import passwords
+from employee_tracker.utils.passwords import hash_password, hash_passwords, verify_password,is_valid_stored_password_hash, needs_rehash, set_iterations, hashing_cost, calibrate
+from employee_tracker.utils.column_checkers import check_password_hash_column
 
 def valid_employee_kwargs():
     return dict(
@@ -179,6 +184,22 @@ class TestHashPassword:
         hash2 = hash_password("password")
         assert hash1 != hash2
         assert hash1 and hash2
+    def test_hash_records_algorithm_and_iterations(self):
+        algorithm, iterations, salt, key = hash_password("password", iterations=1234).split("$")
+        assert algorithm == "pbkdf2_sha256"
+        assert iterations == "1234"
+        assert len(base64.b64decode(salt)) == 16 and len(base64.b64decode(key)) == 32
+    def test_hash_uses_current_cost(self):
+        with hashing_cost(2000):
+            assert hash_password("password").split("$")[1] == "2000"
+class TestHashPasswords:
+    def test_hashes_match_passwords_in_order(self):
+        passwords = [f"password{i}" for i in range(5)]
+        hashes = hash_passwords(passwords, workers=3)
+        assert len(hashes) == 5
+        assert all(verify_password(password, hash) for password, hash in zip(passwords, hashes))
+    def test_empty_list(self):
+        assert hash_passwords([]) == []
 class TestVerifyPassword:
     def test_verify_password_correctly_verifies(self):
         stored = hash_password("password")
@@ -186,6 +207,21 @@ class TestVerifyPassword:
     def test_verify_password_flags_wrong_password(self):
         stored = hash_password("password")
         assert verify_password("other-password",stored) == False
+    def test_verify_uses_stored_cost_not_current(self):
+        stored = hash_password("password", iterations=1500)
+        with hashing_cost(3000):
+            assert verify_password("password", stored) == True
+    def test_verify_legacy_hash(self):
+        legacy = legacy_hash("password")
+        assert verify_password("password", legacy) == True
+        assert verify_password("other-password", legacy) == False
+    def test_verify_invalid_hash_is_false(self):
+        assert verify_password("password", "not a hash") == False
+
+# A hash in the format used before hashes recorded their cost
+def legacy_hash(password):
+    salt = os.urandom(16)
+    return base64.b64encode(salt + hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, 200_000)).decode("utf-8")
 
 class TestHashValidator:
     def test_validator_rejects_empty_and_non_string(self):
@@ -200,3 +236,50 @@ class TestHashValidator:
         assert is_valid_stored_password_hash(bad_hash) is False
         bad_hash2 = base64.b64encode(b"x" * (53)).decode("utf-8")
         assert is_valid_stored_password_hash(bad_hash2) is False
+    def test_validator_accepts_both_formats(self):
+        assert is_valid_stored_password_hash(hash_password("password")) is True
+        assert is_valid_stored_password_hash(legacy_hash("password")) is True
+    def test_validator_rejects_malformed_current_format(self):
+        algorithm, iterations, salt, key = hash_password("password").split("$")
+        assert is_valid_stored_password_hash(f"md5${iterations}${salt}${key}") is False
+        assert is_valid_stored_password_hash(f"{algorithm}$0${salt}${key}") is False
+        assert is_valid_stored_password_hash(f"{algorithm}${iterations}${salt}${key[:-2]}") is False
+    def test_column_checker_matches_validator(self):
+        values = [hash_password("password"), legacy_hash("password"), "not a hash"]
+        assert check_password_hash_column(pd.Series(values)).tolist() == [is_valid_stored_password_hash(v) for v in values]
+
+class TestNeedsRehash:
+    def test_legacy_hash_needs_rehash(self):
+        assert needs_rehash(legacy_hash("password")) is True
+    def test_cheaper_hash_needs_rehash(self):
+        stored = hash_password("password", iterations=1000)
+        with hashing_cost(2000):
+            assert needs_rehash(stored) is True
+    def test_same_or_higher_cost_is_kept(self):
+        with hashing_cost(2000):
+            assert needs_rehash(hash_password("password")) is False
+            assert needs_rehash(hash_password("password", iterations=5000)) is False
+
+class TestHashingCost:
+    def test_profiles_by_name(self):
+        with hashing_cost("default"):
+            assert passwords.ITERATIONS == 200_000
+        with hashing_cost("fast"):
+            assert passwords.ITERATIONS == 1_000
+    def test_cost_restored_after_block(self):
+        before = passwords.ITERATIONS
+        with pytest.raises(RuntimeError):
+            with hashing_cost(5000):
+                raise RuntimeError("boom")
+        assert passwords.ITERATIONS == before
+    def test_invalid_cost_rejected(self):
+        for bad in (0, -5, 1.5, "slow", True):
+            with pytest.raises(ValueError, match="iterations must be"):
+                set_iterations(bad)
+    def test_calibrate_never_below_minimum(self):
+        assert calibrate(0.0001, minimum=50_000) == 50_000
+    def test_calibrate_scales_to_target(self, monkeypatch):
+        # Every timed run takes 0.1 seconds, so 0.5 seconds is five times the iterations that were timed
+        clock = iter(range(1000))
+        monkeypatch.setattr(passwords.time, "perf_counter", lambda: next(clock) / 10)
+        assert calibrate(0.5, minimum=1) == 50_000